@@ -1,4 +1,3 @@
-import itertools
 import os
 import shutil
 import logging
@@ -6,11 +5,12 @@ from util.s3util import S3Util
 from util.bedrock_utils import KnowledgeBaseUtils
 from config.config import get_config
 from decimal import Decimal
-from util.pdf_utils import extract_text_from_pdf_pymudf
 from app.price_calculator import estimate_embedding_model_bedrock_price,estimate_retrieval_model_bedrock_price,estimate_opensearch_price,estimate_sagemaker_price, estimate_fargate_price, estimate_effective_kb_tokens, estimate_times
+from util.price_book import get_price_book
 from .dependencies.database import get_execution_db
 from constants.validation_status import ValidationStatus
 from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 import time 
 
 configs = get_config()
@@ -20,50 +20,97 @@ logger.setLevel(logging.INFO)
 
 
 S3_BUCKET = configs.s3_bucket
-bedrock_price_df = S3Util().read_csv_from_s3(configs.bedrock_limit_csv_path, S3_BUCKET, as_dataframe=True)
 
-def is_valid_combination(config, data):
-    # Define your rules here
-    regions = ["us-east-1", "us-west-2"]
-    if config['bedrock_knowledge_base'] or not config['knowledge_base']:
-        return True
-    if config["region"] not in regions:
-        return False
-    if config["n_shot_prompts"] > 0 and data["n_shot_prompt_guide"] is None:
-        return False
-    if config['embedding']["service"] == "bedrock" and config["embedding"]["model"] == "amazon.titan-embed-image-v1":
-        if config['vector_dimension'] != 1024 and config['vector_dimension'] != 384 and config['vector_dimension'] != 256:
-            return False
-    if config['embedding']["service"] == "bedrock" and config["embedding"]["model"] == "amazon.titan-embed-text-v2:0":
-        if config['vector_dimension'] != 1024 and config['vector_dimension'] != 512 and config['vector_dimension'] != 256:
-            return False
-    if config['embedding']["service"] == "bedrock" and config["embedding"]["model"] == "amazon.titan-embed-text-v1":
-        if config['vector_dimension'] != 1536:
-            return False
-    if (config['embedding']["service"] == "bedrock" and config["embedding"]["model"] == "cohere.embed-english-v3") or (
-            config['embedding']["service"] == "bedrock" and config["embedding"][
-        "model"] == "cohere.embed-multilingual-v3"):
-        if config['vector_dimension'] != 1024:
-            return False
-    if (config['embedding']["service"] == "sagemaker" and config["embedding"]["model"] == "huggingface-sentencesimilarity-bge-large-en-v1-5") or (
-            config['embedding']["service"] == "sagemaker" and config["embedding"]["model"] == "huggingface-sentencesimilarity-bge-m3"):
-        if config['vector_dimension'] != 1024:
-            return False
-    if (config['embedding']["service"] == "sagemaker" and config["embedding"]["model"] == "huggingface-textembedding-gte-qwen2-7b-instruct"):
-        if config['vector_dimension'] != 3584:
-            return False
-    valid_values = {Decimal('0.5'), Decimal('0.3'), Decimal('0.7'), Decimal('0'), Decimal('0.1')}
-    if config['temp_retrieval_llm'] not in valid_values:
-        return False
-    if config['knn_num'] != 3 and config['knn_num'] != 5 and config['knn_num'] != 10 and config['knn_num'] != 15:
-        return False
+# Parameters the inferencing price of a configuration depends on
+INFERENCING_PRICE_KEYS = ("retrieval_model", "region", "chunking_strategy", "chunk_size",
+                          "hierarchical_parent_chunk_size", "n_shot_prompts", "knn_num")
+
+VALID_REGIONS = ["us-east-1", "us-west-2"]
+VALID_TEMPERATURES = {Decimal('0.5'), Decimal('0.3'), Decimal('0.7'), Decimal('0'), Decimal('0.1')}
+VALID_KNN_NUMS = (3, 5, 10, 15)
+# (embedding service, model) -> supported vector dimensions
+VALID_VECTOR_DIMENSIONS = {
+    ("bedrock", "amazon.titan-embed-image-v1"): (1024, 384, 256),
+    ("bedrock", "amazon.titan-embed-text-v2:0"): (1024, 512, 256),
+    ("bedrock", "amazon.titan-embed-text-v1"): (1536,),
+    ("bedrock", "cohere.embed-english-v3"): (1024,),
+    ("bedrock", "cohere.embed-multilingual-v3"): (1024,),
+    ("sagemaker", "huggingface-sentencesimilarity-bge-large-en-v1-5"): (1024,),
+    ("sagemaker", "huggingface-sentencesimilarity-bge-m3"): (1024,),
+    ("sagemaker", "huggingface-textembedding-gte-qwen2-7b-instruct"): (3584,),
+}
+
+
+def _uses_managed_retrieval(config):
+    """Bedrock knowledge bases and experiments without a knowledge base skip the indexing rules."""
+    return config['bedrock_knowledge_base'] or not config['knowledge_base']
+
+
+def _valid_vector_dimension(config, data):
+    dimensions = VALID_VECTOR_DIMENSIONS.get((config['embedding']["service"], config["embedding"]["model"]))
+    return dimensions is None or config['vector_dimension'] in dimensions
+
+
+def _valid_hierarchical_chunks(config, data):
     if config.get('chunking_strategy', None) == "hierarchical":
         # child chunk size should be less than parent chunk size
-        if config.get("hierarchical_child_chunk_size") > config.get("hierarchical_parent_chunk_size"):
-            return False
+        return not config.get("hierarchical_child_chunk_size") > config.get("hierarchical_parent_chunk_size")
     return True
 
 
+# Rules for experiments indexed by FloTorch, with the parameters each one reads
+COMBINATION_RULES = [
+    (("region",), lambda config, data: config["region"] in VALID_REGIONS),
+    (("n_shot_prompts",), lambda config, data: not (config["n_shot_prompts"] > 0 and data["n_shot_prompt_guide"] is None)),
+    (("embedding", "vector_dimension"), _valid_vector_dimension),
+    (("temp_retrieval_llm",), lambda config, data: config['temp_retrieval_llm'] in VALID_TEMPERATURES),
+    (("knn_num",), lambda config, data: config['knn_num'] in VALID_KNN_NUMS),
+    (("chunking_strategy", "hierarchical_child_chunk_size", "hierarchical_parent_chunk_size"), _valid_hierarchical_chunks),
+]
+_RULE_GATE_KEYS = ("bedrock_knowledge_base", "knowledge_base")
+
+
+def is_valid_combination(config, data):
+    if _uses_managed_retrieval(config):
+        return True
+    return all(rule(config, data) for _, rule in COMBINATION_RULES)
+
+
+def iter_valid_combinations(parameters, data):
+    """
+    Lazily yield the valid combinations of `parameters`, in `itertools.product` order.
+
+    Combinations are expanded one parameter at a time and every rule is checked as soon as the
+    parameters it reads are set, so a whole subtree of invalid combinations is skipped at once
+    instead of being materialized and filtered afterwards.
+    """
+    keys = list(parameters)
+    rules_at_depth = [[] for _ in keys]
+    for rule_keys, rule in COMBINATION_RULES:
+        needed = [key for key in (*_RULE_GATE_KEYS, *rule_keys) if key in parameters]
+        # Rules reading a parameter that is not swept run on the complete combination
+        depth = len(keys) - 1 if len(needed) < len(rule_keys) + len(_RULE_GATE_KEYS) else max(keys.index(key) for key in needed)
+        rules_at_depth[depth].append(rule)
+
+    combination = {}
+
+    def expand(depth):
+        if depth == len(keys):
+            yield dict(combination)
+            return
+        key = keys[depth]
+        for value in parameters[key]:
+            combination[key] = value
+            rules = rules_at_depth[depth]
+            if rules and not _uses_managed_retrieval(combination) and not all(rule(combination, data) for rule in rules):
+                continue
+            yield from expand(depth + 1)
+        del combination[key]
+
+    if keys:
+        yield from expand(0)
+
+
 def parse_dynamodb(item):
     if isinstance(item, dict):
         if "M" in item:
@@ -147,6 +194,7 @@ def count_characters_in_file(file_path):
                     content = file.read()
                     character_counts+= len(content)
             elif file.endswith('.pdf'):
+                from util.pdf_utils import extract_text_from_pdf_pymudf
                 with open(full_file, 'rb') as file:
                     text_data = extract_text_from_pdf_pymudf(file)
                     character_counts += len(text_data)
@@ -249,6 +297,18 @@ def add_kb_info(parameters_all):
             parameters_all['kb_data'] = kb_data 
     return parameters_all
     
+def _kb_and_gt_statistics(parameters_all):
+    """Read the ground truth and knowledge base sizes concurrently, they are independent downloads."""
+    gt_data = parameters_all["gt_data"][0]
+    needs_kb_tokens = not (parameters_all["bedrock_knowledge_base"][0] or not parameters_all['knowledge_base'][0])
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        gt_future = executor.submit(read_gt_data, gt_data)
+        kb_future = executor.submit(count_characters_in_file, parameters_all["kb_data"][0]) if needs_kb_tokens else None
+        num_prompts, num_chars = gt_future.result()
+        num_tokens_kb_data = kb_future.result() / 4 if kb_future else 0
+    return num_prompts, num_chars, num_tokens_kb_data
+
+
 def generate_all_combinations(data):
     
     # Parse the DynamoDB-style JSON
@@ -261,111 +321,99 @@ def generate_all_combinations(data):
         parameters_all.update({"guardrails": parsed_data["guardrails"]})
     parameters_all.update(parsed_data["evaluation"])
     parameters_all = add_kb_info(parameters_all)
-    parameters_all = {key: value if isinstance(value, list) else [value] for key, value in parameters_all.items()}
     # Convert single values to lists and replace empty values with [0]
     parameters_all = {key: value if isinstance(value, list) else [value] for key, value in parameters_all.items()}
     parameters_all = {key: value if value else [0] for key, value in parameters_all.items()}
-    
-    keys = parameters_all.keys()
-    combinations = [dict(zip(keys, values)) for values in itertools.product(*parameters_all.values())]
-    combinations = remove_invalid_combinations_keys(combinations)
-    combinations = unpack_guardrails(combinations)
-    combinations = unpack_knowledebases(combinations)
-    
-    gt_data = parameters_all["gt_data"][0]
-    [num_prompts, num_chars] = read_gt_data(gt_data)
 
-    avg_prompt_length = round(num_chars / num_prompts / 4)
-    if parameters_all["bedrock_knowledge_base"][0] or not parameters_all['knowledge_base'][0]:
-        num_tokens_kb_data = 0
-    else:
-        num_tokens_kb_data = count_characters_in_file(parameters_all["kb_data"][0]) / 4
-        
-    configurations = []
-    valid_configurations = []
     MAX_VALID_EXPERIMENTS = 1000
-    experiment_count = 0
+    valid_configurations = []
 
-    for combination in combinations:
-        # Generate a unique GUID
-        
-        if experiment_count >= MAX_VALID_EXPERIMENTS:
+    # Combinations are generated lazily, so a large sweep stops expanding at the experiment limit
+    for combination in iter_valid_combinations(parameters_all, data):
+        if len(valid_configurations) >= MAX_VALID_EXPERIMENTS:
             break  # Exit the loop when the limit is reached
-       
+        [configuration] = unpack_knowledebases(unpack_guardrails(remove_invalid_combinations_keys([combination])))
+
         configuration = {
-            **combination
-        }
-        configurations.append(configuration)
-        if is_valid_combination(configuration, data):
-            
-            configuration = {
-                **{k: v for k, v in configuration.items() if k not in ["embedding", "retrieval", "gt_data", "evaluation"]},
-                "embedding_service": configuration["embedding"]["service"],
-                "embedding_model": configuration["embedding"]["model"],
-                "retrieval_service": configuration["retrieval"]["service"],
-                "retrieval_model": configuration["retrieval"]["model"],
-                "eval_service": configuration["evaluation"]["service"],
-                "eval_embedding_model": configuration["evaluation"]["embedding_model"],
-                "eval_retrieval_model": configuration["evaluation"]["retrieval_model"],
-                }
-            valid_configurations.append(configuration)
-            experiment_count += 1
-
-    if len(valid_configurations) > 0:
-        for configuration in valid_configurations:
-            configuration["is_opensearch"] = True if configs.opensearch_host else False
-            #TODO: Organize the pricing code, break into static methods
-            configuration["directional_pricing"] = 0
-            configuration["indexing_cost_estimate"] = 0 
-            configuration["retrieval_cost_estimate"] = 0
-            configuration["inferencing_cost_estimate"] = 0 
-            configuration["eval_cost_estimate"] = 0
-
-            # kb data tokens would be zero if it is Bedrock knowledge bases
-            effective_num_tokens_kb_data = 0 if configuration["bedrock_knowledge_base"] or not configuration["knowledge_base"] else estimate_effective_kb_tokens(configuration, num_tokens_kb_data)
-
-            indexing_time, retrieval_time, eval_time = estimate_times(effective_num_tokens_kb_data, num_prompts, configuration)
-
-            # Bedrock knowledge bases price not supported at the moment
-            if configuration["bedrock_knowledge_base"] or not configuration["knowledge_base"]:
-                configuration["indexing_cost_estimate"] = 0
-            elif configuration['embedding_service'] == "bedrock" :
-                embedding_price = estimate_embedding_model_bedrock_price(bedrock_price_df, configuration, num_tokens_kb_data)
-                configuration["indexing_cost_estimate"] += embedding_price
-            else:
-                configuration["indexing_cost_estimate"] += estimate_sagemaker_price(indexing_time)
+            **{k: v for k, v in configuration.items() if k not in ["embedding", "retrieval", "gt_data", "evaluation"]},
+            "embedding_service": configuration["embedding"]["service"],
+            "embedding_model": configuration["embedding"]["model"],
+            "retrieval_service": configuration["retrieval"]["service"],
+            "retrieval_model": configuration["retrieval"]["model"],
+            "eval_service": configuration["evaluation"]["service"],
+            "eval_embedding_model": configuration["evaluation"]["embedding_model"],
+            "eval_retrieval_model": configuration["evaluation"]["retrieval_model"],
+            }
+        valid_configurations.append(configuration)
 
-            #Calculate the inferencing price - doesn't include OpenSearch pricing
-            if configuration["retrieval_service"] == "bedrock":
-                inferencing_price = estimate_retrieval_model_bedrock_price(bedrock_price_df, configuration, avg_prompt_length, num_prompts)
-                configuration["inferencing_cost_estimate"] += inferencing_price
-            else:
-                configuration["inferencing_cost_estimate"] += estimate_sagemaker_price(retrieval_time)
-
-            # evaluation price for ragas not added at the moment considering 
-            # tokens information is not being returned
-            # Adding sagemaker endpoint cost as it would be still running for 
-            # the duration of the experiment
-            if configuration['embedding_service'] == "sagemaker":
-                configuration["eval_cost_estimate"] += estimate_sagemaker_price(eval_time)
-            if configuration["retrieval_service"] == "sagemaker":
-                configuration["eval_cost_estimate"] += estimate_sagemaker_price(eval_time)
-            
-            # adding fargate container costs
-            if not configuration["bedrock_knowledge_base"]:
-                configuration["indexing_cost_estimate"] += estimate_fargate_price(indexing_time)
-            configuration["retrieval_cost_estimate"] += estimate_fargate_price(retrieval_time)
-            configuration["eval_cost_estimate"] += estimate_fargate_price(eval_time)
-
-            # add opensearch provisioned costs
-            if not configuration["bedrock_knowledge_base"] or configuration["is_opensearch"]:
-                configuration["indexing_cost_estimate"] += estimate_opensearch_price(indexing_time)
-                configuration["retrieval_cost_estimate"] += estimate_opensearch_price(retrieval_time)
-                configuration["eval_cost_estimate"] += estimate_opensearch_price(eval_time)
-
-            configuration["directional_pricing"] = configuration["indexing_cost_estimate"] + configuration["retrieval_cost_estimate"] + configuration["inferencing_cost_estimate"] + configuration["eval_cost_estimate"]
-            configuration["directional_pricing"] +=configuration["directional_pricing"]*0.05 #extra
-            configuration["directional_pricing"] = round(configuration["directional_pricing"],2)    
+    if not valid_configurations:
+        return valid_configurations
+
+    num_prompts, num_chars, num_tokens_kb_data = _kb_and_gt_statistics(parameters_all)
+    avg_prompt_length = round(num_chars / num_prompts / 4)
+
+    # Many configurations share a model and the parameters its price depends on, price each group once
+    embedding_prices = {}
+    inferencing_prices = {}
+
+    for configuration in valid_configurations:
+        configuration["is_opensearch"] = True if configs.opensearch_host else False
+        #TODO: Organize the pricing code, break into static methods
+        configuration["directional_pricing"] = 0
+        configuration["indexing_cost_estimate"] = 0 
+        configuration["retrieval_cost_estimate"] = 0
+        configuration["inferencing_cost_estimate"] = 0 
+        configuration["eval_cost_estimate"] = 0
+
+        # kb data tokens would be zero if it is Bedrock knowledge bases
+        effective_num_tokens_kb_data = 0 if configuration["bedrock_knowledge_base"] or not configuration["knowledge_base"] else estimate_effective_kb_tokens(configuration, num_tokens_kb_data)
+
+        indexing_time, retrieval_time, eval_time = estimate_times(effective_num_tokens_kb_data, num_prompts, configuration)
+
+        # Bedrock knowledge bases price not supported at the moment
+        if configuration["bedrock_knowledge_base"] or not configuration["knowledge_base"]:
+            configuration["indexing_cost_estimate"] = 0
+        elif configuration['embedding_service'] == "bedrock" :
+            price_key = (configuration["embedding_model"], configuration["region"])
+            if price_key not in embedding_prices:
+                embedding_prices[price_key] = estimate_embedding_model_bedrock_price(get_price_book(), configuration, num_tokens_kb_data)
+            configuration["indexing_cost_estimate"] += embedding_prices[price_key]
+        else:
+            configuration["indexing_cost_estimate"] += estimate_sagemaker_price(indexing_time)
+
+        #Calculate the inferencing price - doesn't include OpenSearch pricing
+        if configuration["retrieval_service"] == "bedrock":
+            price_key = tuple(configuration.get(key) for key in INFERENCING_PRICE_KEYS)
+            if price_key not in inferencing_prices:
+                inferencing_prices[price_key] = estimate_retrieval_model_bedrock_price(get_price_book(), configuration, avg_prompt_length, num_prompts)
+            configuration["inferencing_cost_estimate"] += inferencing_prices[price_key]
+        else:
+            configuration["inferencing_cost_estimate"] += estimate_sagemaker_price(retrieval_time)
+
+        # evaluation price for ragas not added at the moment considering 
+        # tokens information is not being returned
+        # Adding sagemaker endpoint cost as it would be still running for 
+        # the duration of the experiment
+        if configuration['embedding_service'] == "sagemaker":
+            configuration["eval_cost_estimate"] += estimate_sagemaker_price(eval_time)
+        if configuration["retrieval_service"] == "sagemaker":
+            configuration["eval_cost_estimate"] += estimate_sagemaker_price(eval_time)
+        
+        # adding fargate container costs
+        if not configuration["bedrock_knowledge_base"]:
+            configuration["indexing_cost_estimate"] += estimate_fargate_price(indexing_time)
+        configuration["retrieval_cost_estimate"] += estimate_fargate_price(retrieval_time)
+        configuration["eval_cost_estimate"] += estimate_fargate_price(eval_time)
+
+        # add opensearch provisioned costs
+        if not configuration["bedrock_knowledge_base"] or configuration["is_opensearch"]:
+            configuration["indexing_cost_estimate"] += estimate_opensearch_price(indexing_time)
+            configuration["retrieval_cost_estimate"] += estimate_opensearch_price(retrieval_time)
+            configuration["eval_cost_estimate"] += estimate_opensearch_price(eval_time)
+
+        configuration["directional_pricing"] = configuration["indexing_cost_estimate"] + configuration["retrieval_cost_estimate"] + configuration["inferencing_cost_estimate"] + configuration["eval_cost_estimate"]
+        configuration["directional_pricing"] +=configuration["directional_pricing"]*0.05 #extra
+        configuration["directional_pricing"] = round(configuration["directional_pricing"],2)    
 
     return valid_configurations
 
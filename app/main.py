@@ -7,6 +7,7 @@ from app.routes import execution, experiment, health, uploads, bedrock_config, c
 from app.dependencies.database import (
     get_execution_model_invocations_db
 )
+from util.boto3_clients import close_async_clients
 
 def create_app() -> FastAPI:
 
@@ -18,6 +19,11 @@ def create_app() -> FastAPI:
         db.initialize()
         seed_models(get_execution_model_invocations_db())
 
+    # Streaming endpoints keep async clients open on the server's event loop
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        await close_async_clients()
+
     app.add_middleware(
         CORSMiddleware,
         allow_origins=["*"],
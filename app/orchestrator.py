@@ -7,6 +7,7 @@ import os
 from config.config import get_config
 import logging
 from typing import Dict, Any
+from util.boto3_clients import get_client
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -18,7 +19,14 @@ class StepFunctionOrchestrator:
     """
     def __init__(self):
         self.config = get_config()
-        self.step_function_client = self._initialize_step_function_client()
+        self._step_function_client = None
+
+    @property
+    def step_function_client(self) -> boto3.client:
+        """Created on the first execution rather than at API startup."""
+        if self._step_function_client is None:
+            self._step_function_client = self._initialize_step_function_client()
+        return self._step_function_client
 
     def _initialize_step_function_client(self) -> boto3.client:
         """
@@ -28,7 +36,7 @@ class StepFunctionOrchestrator:
             boto3.client: Configured Step Function client
         """
         try:
-            return boto3.client("stepfunctions", region_name=self.config.aws_region)
+            return get_client("stepfunctions", region_name=self.config.aws_region)
         except Exception as e:
             logger.error(f"Failed to initialize Step Function client: {e}")
             raise HTTPException(
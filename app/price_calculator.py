@@ -1,5 +1,5 @@
-import pandas as pd
 import logging
+from util.price_book import PriceBook
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -23,35 +23,27 @@ def estimate_effective_kb_tokens(configuration, num_tokens_kb_data):
 
     return effective_num_tokens
 
-def estimate_embedding_model_bedrock_price(file_path, configuration, effective_kb_tokens):
-    try:
-        df = file_path.copy()
-        # return df
-    except Exception as e:
-        logger.error(f"Error reading the CSV file: {e}")
-        return None
+def estimate_embedding_model_bedrock_price(price_book: PriceBook, configuration, effective_kb_tokens):
     region = configuration["region"]
 
     embed_model = configuration["embedding_model"]
 
-    embed_model_price = df[(df['model'] == embed_model) & (df['Region'] == region)]['input_price']
-    if embed_model_price.empty:
+    try:
+        model_prices = price_book.get(embed_model, region)
+    except Exception as e:
+        logger.error(f"Error reading the price sheet: {e}")
+        return None
+    if model_prices is None:
         logger.warning("Returning price as Zero, as model is not present in Sheet")
         return 0
     else:
-        embed_model_price = float(embed_model_price.values[0])  # this price is in 1000s of tokens not millions
+        embed_model_price = model_prices.input_price  # this price is in 1000s of tokens not millions
         embed_price = embed_model_price * effective_kb_tokens / 1000000
         return embed_price
 
 
-def estimate_retrieval_model_bedrock_price(file_path, configuration, avg_prompt_length,
+def estimate_retrieval_model_bedrock_price(price_book: PriceBook, configuration, avg_prompt_length,
                                            num_prompts):
-    try:
-        df = file_path.copy()
-        # return df
-    except Exception as e:
-        logger.error(f"Error reading the CSV file: {e}")
-        return None
     region = configuration["region"]
     
     chunking_strategy = configuration["chunking_strategy"].lower()
@@ -67,14 +59,17 @@ def estimate_retrieval_model_bedrock_price(file_path, configuration, avg_prompt_
     n_shot_prompts = configuration["n_shot_prompts"]
     k = configuration["knn_num"]
 
-    gen_model_price = df[(df['model'] == gen_model) & (df['Region'] == region)]['input_price']
-    if gen_model_price.empty:
+    try:
+        model_prices = price_book.get(gen_model, region)
+    except Exception as e:
+        logger.error(f"Error reading the price sheet: {e}")
+        return None
+    if model_prices is None:
         logger.warning("Returning price as Zero, as model is not present in Sheet")
         return 0
     else:
-        gen_model_price = float(gen_model_price.values[0])  # this price is in millions of tokens
-        gen_model_out_price = df[(df['model'] == gen_model) & (df['Region'] == region)]['output_price']
-        gen_model_out_price = float(gen_model_out_price.values[0])  # this price is in millions of tokens
+        gen_model_price = model_prices.input_price  # this price is in millions of tokens
+        gen_model_out_price = model_prices.output_price or 0  # this price is in millions of tokens
         context_len = k * chunk_size
         prompt_len = (n_shot_prompts + 1) * avg_prompt_length
         total_input_tokens = (context_len + prompt_len) * num_prompts
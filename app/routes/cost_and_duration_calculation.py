@@ -1,14 +1,13 @@
 from datetime import datetime
-from util.s3util import S3Util
 from config.config import get_config
 from util.date_time_utils import DateTimeUtils
 
 configs = get_config()
 
 S3_BUCKET = configs.s3_bucket
-bedrock_price_df = S3Util().read_csv_from_s3(configs.bedrock_limit_csv_path, S3_BUCKET, as_dataframe=True)
 from app.price_calculator import estimate_opensearch_price, estimate_sagemaker_price, estimate_embedding_model_bedrock_price, estimate_retrieval_model_bedrock_price
 from app.configuration_validation import read_gt_data, count_characters_in_file
+from util.price_book import get_price_book
 
 
 def calculate_experiment_duration(experiment):
@@ -49,14 +48,14 @@ def calculate_experiment_cost(experiment, num_tokens_kb_data, avg_promopt_length
         cost = 0
         if experiment['config']['embedding_service'] == "bedrock":
 
-            embedding_price = estimate_embedding_model_bedrock_price(bedrock_price_df, experiment['config'],
+            embedding_price = estimate_embedding_model_bedrock_price(get_price_book(), experiment['config'],
                                                                      num_tokens_kb_data)
             cost += embedding_price
         else:
             cost += estimate_sagemaker_price()
 
         if experiment['config']["retrieval_service"] == "bedrock":
-            retrical_price = estimate_retrieval_model_bedrock_price(bedrock_price_df, experiment['config'],
+            retrical_price = estimate_retrieval_model_bedrock_price(get_price_book(), experiment['config'],
                                                                     avg_promopt_length,
                                                                     num_prompts)
             cost += retrical_price
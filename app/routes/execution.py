@@ -21,6 +21,9 @@ from util.s3util import S3Util
 router = APIRouter(tags=["execution"])
 config = get_config()
 
+# Global secondary index of the execution table keyed by status
+STATUS_INDEX = "status-index"
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("Execution")
@@ -84,13 +87,9 @@ async def list_executions(
     """
     try:
         if status:
-            response = execution_db.scan(
-                filter_expression="#status = :status",
-                expression_values={":status": status},
-                expression_attribute_names={"#status": "status"}
-            )
+            response = {"Items": execution_db.query_by_index(STATUS_INDEX, {"status": status})}
         else:
-            response = execution_db.scan()
+            response = execution_db.scan_all(total_segments=config.dynamodb_scan_segments)
 
         executions = [
             {
@@ -242,13 +241,7 @@ async def execute_experiments(
         A success message if orchestration is started.
     """
     try:
-        in_progress = execution_db.scan(
-            filter_expression="#status = :status",
-            expression_values={":status": "in_progress"},
-            expression_attribute_names={"#status": "status"}
-        )
-
-        in_progress_items = in_progress.get("Items", [])
+        in_progress_items = execution_db.query_by_index(STATUS_INDEX, {"status": "in_progress"}, projection=["id", "name"])
         if in_progress_items:
             # Fetch the first in-progress item
             in_progress_item = in_progress_items[0]
@@ -1,5 +1,9 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional
+import base64
+import json
 import random
 import string
 import traceback
@@ -10,6 +14,7 @@ from .cost_and_duration_calculation import calculate_duration, calculate_cost
 from ..dependencies.database import (
     get_experiment_db, get_question_metrics_db, get_execution_db
 )
+from ..runtime_cache import invalidate_experiment_runtime
 from util.error_handling import create_error_response
 from constants import ErrorTypes, StatusCodes
 import logging
@@ -19,6 +24,24 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("Execution")
 router = APIRouter(tags=["experiment"])
 
+# Global secondary index of the experiment table keyed by execution_id
+EXECUTION_ID_INDEX = "execution_id-index"
+
+# Global secondary index of the question metrics table keyed by (execution_id, experiment_id)
+QUESTION_METRICS_INDEX = "execution_id-experiment_id-index"
+# Attributes a client can select with `fields`, and those returned when it does not
+QUESTION_METRICS_FIELDS = {
+    "id", "execution_id", "experiment_id", "timestamp", "question", "gt_answer", "generated_answer",
+    "reference_contexts", "query_metadata", "answer_metadata", "eval_metrics", "guardrail_input_assessment",
+    "guardrail_context_assessment", "guardrail_output_assessment", "guardrail_id", "guardrail_blocked"
+}
+DEFAULT_QUESTION_METRICS_FIELDS = [
+    "generated_answer", "gt_answer", "question", "id", "guardrail_input_assessment",
+    "guardrail_context_assessment", "guardrail_output_assessment"
+]
+DEFAULT_QUESTION_METRICS_PAGE_SIZE = 100
+MAX_QUESTION_METRICS_PAGE_SIZE = 1000
+
 @router.post("/execution/{execution_id}/experiment")
 async def post_experiment(
         execution_id: str,
@@ -61,18 +84,13 @@ async def post_experiment(
                 ),
             )
 
-        filter_expression = "#execution_id = :execution_id"
-        expression_values = {":execution_id": execution_id}
-        expression_attribute_names = {"#execution_id": "execution_id"}
-
-        existing_experiments = experiment_db.scan_all(
-            filter_expression=filter_expression,
-            expression_values=expression_values,
-            expression_attribute_names=expression_attribute_names,
+        existing_experiments = experiment_db.query_by_index(
+            EXECUTION_ID_INDEX, {"execution_id": execution_id}, projection=["id"]
         )
         # Delete any existing experiments associated with this execution
-        for experiment in existing_experiments.get("Items", []):
+        for experiment in existing_experiments:
             experiment_db.delete_item({"id": experiment["id"]})
+            invalidate_experiment_runtime(experiment["id"])
             
         experiment_ids = []
         for data in experiments:
@@ -158,21 +176,16 @@ async def get_experiments(
         List[Dict]: A list of experiments matching the criteria.
     """
     try:
-        filter_expression = "#execution_id = :execution_id"
-        expression_values = {":execution_id": execution_id}
-        expression_attribute_names = {"#execution_id": "execution_id"}
-
+        query_params = {}
         if status:
-            filter_expression += " AND #experiment_status = :experiment_status"
-            expression_values[":experiment_status"] = status
-            expression_attribute_names["#experiment_status"] = "experiment_status"
-
-        response = experiment_db.scan_all(
-            filter_expression=filter_expression,
-            expression_values=expression_values,
-            expression_attribute_names=expression_attribute_names,
-        )
-        final_response = response.get("Items", [])
+            query_params = {
+                "filter_expression": "#experiment_status = :experiment_status",
+                "expression_values": {":experiment_status": status},
+                "expression_attribute_names": {"#experiment_status": "experiment_status"},
+            }
+
+        # An indexed query reads only this execution's experiments, whatever the size of the table
+        final_response = experiment_db.query_by_index(EXECUTION_ID_INDEX, {"execution_id": execution_id}, **query_params)
         final_response_with_duration = calculate_duration(final_response)
         # final_response_with_cost = calculate_cost(final_response_with_duration)
         return final_response_with_duration
@@ -217,42 +230,60 @@ async def get_experiment(
 async def get_question_metrics(
     execution_id: str,
     experiment_id: str,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_QUESTION_METRICS_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    response_format: str = Query("json", alias="format"),
     question_metrics_db=Depends(get_question_metrics_db),
 ):
     """
-    Retrieve all question metrics for a specific execution and experiment by iterating over DynamoDB pages.
+    Retrieve the question metrics of a specific execution and experiment.
+
+    Without `limit` or `cursor` every question is returned in one response. With them, one page
+    of up to `limit` questions is returned along with a `next_cursor` to pass back for the next
+    page, null on the last page. With `format=ndjson` the questions from `cursor` onwards are
+    streamed as one JSON object per line, read from DynamoDB `limit` items at a time.
 
     Args:
         execution_id (str): The execution ID.
         experiment_id (str): The experiment ID.
+        limit (Optional[int]): Page size.
+        cursor (Optional[str]): Opaque token of the page to start from.
+        fields (Optional[str]): Comma-separated attributes to return, see QUESTION_METRICS_FIELDS.
+        response_format (str): "json" (default) or "ndjson".
 
     Returns:
-        dict: All question metrics.
+        dict: The question metrics, and the next cursor when paginating.
     """
+    if response_format not in ("json", "ndjson"):
+        raise HTTPException(
+            status_code=StatusCodes.BAD_REQUEST,
+            detail=create_error_response(ErrorTypes.VALIDATION_ERROR, "format must be json or ndjson"),
+        )
+    query_params = _question_metrics_query(execution_id, experiment_id, fields)
+    start_key = _decode_cursor(cursor, execution_id, experiment_id) if cursor else None
+
     try:
-        all_questions = []
-        last_evaluated_key = None
+        if response_format == "ndjson":
+            return StreamingResponse(
+                _stream_question_metrics(question_metrics_db, query_params, start_key, limit or DEFAULT_QUESTION_METRICS_PAGE_SIZE),
+                media_type="application/x-ndjson"
+            )
 
-        while True:
-            # Query parameters
-            
-            query_params = {
-                "key_condition_expression": "execution_id = :execution_id AND experiment_id = :experiment_id",
-                "expression_values": {
-                    ":execution_id": execution_id,
-                    ":experiment_id": experiment_id,
-                },
-                "index_name":"execution_id-experiment_id-index",
-                "projection": "generated_answer, gt_answer, question, id, guardrail_input_assessment, guardrail_context_assessment, guardrail_output_assessment",
+        if limit or cursor:
+            response = question_metrics_db.query(
+                **query_params, exclusive_start_key=start_key, limit=limit or DEFAULT_QUESTION_METRICS_PAGE_SIZE
+            )
+            last_evaluated_key = response.get("LastEvaluatedKey")
+            return {
+                "question_metrics": response.get("Items", []),
+                "next_cursor": _encode_cursor(last_evaluated_key) if last_evaluated_key else None,
             }
 
-            if last_evaluated_key:
-                query_params["exclusive_start_key"] = last_evaluated_key
-
-            # Query DynamoDB
-            response = question_metrics_db.query(**query_params)
-
-            # Append items to the result list
+        all_questions = []
+        last_evaluated_key = None
+        while True:
+            response = question_metrics_db.query(**query_params, exclusive_start_key=last_evaluated_key)
             all_questions.extend(response.get("Items", []))
 
             # Check if there are more items to fetch
@@ -269,3 +300,71 @@ async def get_question_metrics(
                 "There is an issue while retrieving the question metrics, please contact admin",
             ),
         )
+
+
+def _question_metrics_query(execution_id: str, experiment_id: str, fields: Optional[str]) -> Dict[str, Any]:
+    """Query parameters of an experiment's question metrics, projected on the requested fields."""
+    selected = [field.strip() for field in fields.split(",") if field.strip()] if fields else DEFAULT_QUESTION_METRICS_FIELDS
+    unknown = [field for field in selected if field not in QUESTION_METRICS_FIELDS]
+    if unknown or not selected:
+        raise HTTPException(
+            status_code=StatusCodes.BAD_REQUEST,
+            detail=create_error_response(
+                ErrorTypes.VALIDATION_ERROR,
+                f"Unknown fields {unknown}, supported fields are {sorted(QUESTION_METRICS_FIELDS)}",
+            ),
+        )
+    # Some attribute names, e.g. timestamp, are reserved words and must be aliased
+    names = {f"#f{position}": field for position, field in enumerate(selected)}
+    return {
+        "key_condition_expression": "execution_id = :execution_id AND experiment_id = :experiment_id",
+        "expression_values": {
+            ":execution_id": execution_id,
+            ":experiment_id": experiment_id,
+        },
+        "index_name": QUESTION_METRICS_INDEX,
+        "projection": ", ".join(names),
+        "expression_attribute_names": names,
+    }
+
+
+def _encode_cursor(last_evaluated_key: Dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(last_evaluated_key, default=str).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str, execution_id: str, experiment_id: str) -> Dict[str, Any]:
+    """Turn a cursor back into the LastEvaluatedKey it was made from, rejecting tokens of other experiments."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        key = None
+    if not isinstance(key, dict) or key.get("execution_id") != execution_id or key.get("experiment_id") != experiment_id:
+        raise HTTPException(
+            status_code=StatusCodes.BAD_REQUEST,
+            detail=create_error_response(ErrorTypes.VALIDATION_ERROR, "Invalid cursor"),
+        )
+    return key
+
+
+def _stream_question_metrics(question_metrics_db: DynamoDBOperations, query_params: Dict[str, Any],
+                             start_key: Optional[Dict[str, Any]], page_size: int) -> Iterator[str]:
+    """Yield question metrics as NDJSON lines, holding one page of items at a time."""
+    last_evaluated_key = start_key
+    try:
+        while True:
+            response = question_metrics_db.query(**query_params, exclusive_start_key=last_evaluated_key, limit=page_size)
+            for item in response.get("Items", []):
+                yield json.dumps(item, default=_json_number) + "\n"
+            last_evaluated_key = response.get("LastEvaluatedKey")
+            if not last_evaluated_key:
+                break
+    except Exception as e:
+        # Headers are already sent, the client sees a truncated stream
+        logger.error(f"Streaming question metrics failed: {str(e)}")
+        raise
+
+
+def _json_number(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -1,29 +1,25 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 from pydantic import BaseModel, RootModel
 import logging
 import asyncio
+import json
+from contextlib import aclosing
 
 from http.client import HTTPException
 
 from fastapi import APIRouter, Depends
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 
 from config.config import get_config
-from util.s3util import S3Util
+from util.price_book import get_price_book
+from app.streaming import stream_generation
+from app.runtime_cache import get_experiment_runtime_cache, invalidate_experiment_runtime
 
-from flotorch_core.inferencer.inferencer_provider_factory import InferencerProviderFactory
-from flotorch_core.storage.db.vector.vector_storage_factory import VectorStorageFactory
-from flotorch_core.embedding.embedding_registry import embedding_registry
 from flotorch_core.storage.db.dynamodb import DynamoDB
 from flotorch_core.config.config import Config
 from flotorch_core.config.env_config_provider import EnvConfigProvider
 from flotorch_core.chunking.chunking import Chunk
 
-from flotorch_core.embedding.titanv2_embedding import TitanV2Embedding
-from flotorch_core.embedding.titanv1_embedding import TitanV1Embedding
-from flotorch_core.embedding.cohere_embedding import CohereEmbedding
-from flotorch_core.embedding.bge_large_embedding import BGELargeEmbedding, BGEM3Embedding, GTEQwen2Embedding
-
 # Flotorch-core config
 env_config_provider = EnvConfigProvider()
 config = Config(env_config_provider)
@@ -34,7 +30,6 @@ S3_BUCKET = configs.s3_bucket
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-bedrock_price_df = S3Util().read_csv_from_s3(configs.bedrock_limit_csv_path, S3_BUCKET, as_dataframe=True)
 
 class ExperimentQuery(BaseModel):
     experiment_ids: List[str]
@@ -44,12 +39,12 @@ class VotePayload(RootModel):
     root: Dict[str, int]
     
     
-def get_model_question_prices(file_path, model, input_tokens, output_tokens, region):
+def get_model_question_prices(price_book, model, input_tokens, output_tokens, region):
     """
     Calculate the cost of model inference for a given number of input and output tokens.
     
     Args:
-        file_path: DataFrame containing pricing information
+        price_book: PriceBook with the Bedrock prices
         model: Name of the model being used
         input_tokens: Number of input tokens
         output_tokens: Number of output tokens  
@@ -63,19 +58,14 @@ def get_model_question_prices(file_path, model, input_tokens, output_tokens, reg
     """
     MILLION = 1_000_000
     try:
-        # Create copy of pricing dataframe
-        df = file_path.copy()
-        
-        # Get input price for model and region
-        retrieval_model_input_price = df[(df['model'] == model) & (df['Region'] == region)]['input_price']
-        if retrieval_model_input_price.empty:
+        # Get input and output price for model and region
+        model_prices = price_book.get(model, region)
+        if model_prices is None:
             logger.warning("Returning price as Zero, as model is not present in Sheet")
             return 0, 0
         else:
-            # Get output price for model and region
-            retrieval_model_input_price = float(retrieval_model_input_price.values[0])  # this price is in millions of tokens
-            retrieval_model_output_price = df[(df['model'] == model) & (df['Region'] == region)]['output_price']
-            retrieval_model_output_price = float(retrieval_model_output_price.values[0])  # this price is in millions of tokens
+            retrieval_model_input_price = model_prices.input_price  # this price is in millions of tokens
+            retrieval_model_output_price = model_prices.output_price or 0  # this price is in millions of tokens
             
             # Calculate input and output costs based on token counts
             retrieval_model_input_actual_cost = (retrieval_model_input_price * float(input_tokens))
@@ -87,7 +77,7 @@ def get_model_question_prices(file_path, model, input_tokens, output_tokens, reg
             return total_cost_for_question, total_cost_per_million_questions
         
     except Exception as e:
-        logger.error(f"Error reading the CSV file: {e}")
+        logger.error(f"Error reading the price sheet: {e}")
         return None
     
     
@@ -116,11 +106,133 @@ def get_experiment_configs(experiment_db: DynamoDB, experiment_ids: List[str]) -
     return experiments
 
 
-@router.post("/heval/query-experiments", tags=["heval"])
-async def query_experiments(
-    query: ExperimentQuery,
-    experiment_db: DynamoDB = Depends(get_experiment_db)
-):
+async def _generate_text(inferencer, user_query: str, context):
+    """Await the inferencer's native coroutine when it has one, otherwise run the blocking call on a worker thread."""
+    agenerate_text = getattr(inferencer, "agenerate_text", None)
+    if agenerate_text is not None and asyncio.iscoroutinefunction(agenerate_text):
+        return await agenerate_text(user_query, context)
+    return await asyncio.to_thread(inferencer.generate_text, user_query, context)
+
+def _build_experiment_runtime(exp_config_data: Dict) -> Dict:
+    """Create the inferencer and, for knowledge base experiments, the vector storage of an experiment."""
+    # The providers pull in the SageMaker SDK and OpenSearch clients, so they are imported on the first
+    # query instead of at API startup. Importing the embedding modules registers them with the registry.
+    from flotorch_core.inferencer.inferencer_provider_factory import InferencerProviderFactory
+    from flotorch_core.storage.db.vector.vector_storage_factory import VectorStorageFactory
+    from flotorch_core.embedding.embedding_registry import embedding_registry
+    import flotorch_core.embedding.titanv2_embedding
+    import flotorch_core.embedding.titanv1_embedding
+    import flotorch_core.embedding.cohere_embedding
+    import flotorch_core.embedding.bge_large_embedding
+
+    exp_config = exp_config_data.get("config")
+
+    # Configurations
+    inference_model = exp_config.get("retrieval_model")
+    inference_service = exp_config.get("retrieval_service")
+    inference_temperature = float(exp_config.get("temp_retrieval_llm"))
+
+    aws_region = exp_config.get("region")
+    knowledge_base = exp_config.get("knowledge_base", False)
+    bedrock_knowledge_base = exp_config.get("bedrock_knowledge_base", False)
+
+    # Inferencer Initialization
+    inferencer = InferencerProviderFactory.create_inferencer_provider(
+        False, "", "",
+        inference_service,
+        inference_model,
+        aws_region,
+        config.get_sagemaker_arn_role(),
+        int(exp_config.get("n_shot_prompts")),
+        inference_temperature,
+        exp_config.get("n_shot_prompt_guide")
+    )
+
+    vector_storage = None
+    if knowledge_base:
+        vector_storage = VectorStorageFactory.create_vector_storage(
+            knowledge_base=knowledge_base,
+            use_bedrock_kb=bedrock_knowledge_base,
+            embedding=(
+                embedding_registry.get_model(exp_config.get("embedding_model"))(
+                    exp_config.get("embedding_model"), aws_region, 
+                    int(exp_config.get("vector_dimension"))
+                )
+                if not bedrock_knowledge_base else None
+            ),
+            opensearch_host=config.get_opensearch_host(),
+            opensearch_port=config.get_opensearch_port(),
+            opensearch_username=config.get_opensearch_username(),
+            opensearch_password=config.get_opensearch_password(),
+            index_id=exp_config_data.get("index_id"),
+            knowledge_base_id=exp_config.get("kb_data"),
+            aws_region=aws_region
+        )
+
+    return {
+        "experiment_id": exp_config_data.get("id"),
+        "config": exp_config,
+        "inference_model": inference_model,
+        "temperature": inference_temperature,
+        "aws_region": aws_region,
+        "inferencer": inferencer,
+        "vector_storage": vector_storage
+    }
+
+
+def _load_experiment_runtime(experiment_db: DynamoDB, experiment_id: str) -> Optional[Dict]:
+    experiment_configs = get_experiment_configs(experiment_db, [experiment_id])
+    return _build_experiment_runtime(experiment_configs[0]) if experiment_configs else None
+
+
+async def _get_experiment_runtime(experiment_db: DynamoDB, experiment_id: str) -> Optional[Dict]:
+    """
+    Return the cached runtime of an experiment, reading its config and building it on a miss.
+
+    Reviewers query the same few experiments many times, so the config, inferencer, embedder and
+    vector storage are reused until the entry expires or the experiment is invalidated.
+    Returns None if the experiment does not exist.
+    """
+    cache = get_experiment_runtime_cache()
+    runtime = cache.get(experiment_id)
+    if runtime is not None:
+        return runtime
+    return await asyncio.to_thread(
+        cache.get_or_build, experiment_id, lambda: _load_experiment_runtime(experiment_db, experiment_id)
+    )
+
+
+async def _retrieve_context(runtime: Dict, user_query: str):
+    """Search the experiment's vector storage for the query, or return None for experiments without a knowledge base."""
+    vector_storage = runtime["vector_storage"]
+    if not vector_storage:
+        return None
+    exp_config = runtime["config"]
+    hierarchical = exp_config.get("chunking_strategy") == 'hierarchical'
+    question_chunk = Chunk(data=user_query)
+
+    vector_response = await asyncio.to_thread(
+        vector_storage.search, question_chunk, int(exp_config['knn_num']), hierarchical
+    )
+    return vector_response.to_json()['result']
+
+
+def _add_cost_metadata(metadata: Dict, inference_model: str, aws_region: str) -> Dict:
+    """Rename the inferencer's latency and token fields for the UI and add the token cost."""
+    question_price, million_questions_price = get_model_question_prices(
+        get_price_book(), inference_model, metadata.get('inputTokens', 0), metadata.get('outputTokens', 0), aws_region
+    )
+
+    if 'latencyMs' in metadata:
+        metadata['latency_milliseconds'] = metadata.pop('latencyMs')
+    if 'totalTokens' in metadata:
+        del metadata['totalTokens']
+    metadata['total_token_cost'] = question_price
+    metadata['token_cost_for_million_such_questions'] = million_questions_price
+    return metadata
+
+
+def _validate_experiment_count(query: ExperimentQuery):
     num_experiments = len(query.experiment_ids)
     if not (2 <= num_experiments <= 3):
         raise HTTPException(
@@ -128,95 +240,109 @@ async def query_experiments(
             detail="The number of experiment_ids must be between 2 and 3."
         )
 
-    experiment_configs = get_experiment_configs(experiment_db, query.experiment_ids)
-
-    async def run_experiment(exp_config_data):
-        experiment_id = exp_config_data.get("id")
-        exp_config = exp_config_data.get("config")
-
-        # Configurations        
-        inference_model = exp_config.get("retrieval_model")
-        inference_service = exp_config.get("retrieval_service")
-        inference_temperature = float(exp_config.get("temp_retrieval_llm"))
-
-        aws_region = exp_config.get("region")
-        knowledge_base = exp_config.get("knowledge_base", False)
-        bedrock_knowledge_base = exp_config.get("bedrock_knowledge_base", False)
-
-        # Inferencer Initialization
-        inferencer = InferencerProviderFactory.create_inferencer_provider(
-            False, "", "",
-            inference_service,
-            inference_model,
-            aws_region,
-            config.get_sagemaker_arn_role(),
-            int(exp_config.get("n_shot_prompts")),
-            inference_temperature,
-            exp_config.get("n_shot_prompt_guide")
-        )
 
-        vector_storage = None
-        if knowledge_base:
-            vector_storage = VectorStorageFactory.create_vector_storage(
-                knowledge_base=knowledge_base,
-                use_bedrock_kb=bedrock_knowledge_base,
-                embedding=(
-                    embedding_registry.get_model(exp_config.get("embedding_model"))(
-                        exp_config.get("embedding_model"), aws_region, 
-                        int(exp_config.get("vector_dimension"))
-                    )
-                    if not bedrock_knowledge_base else None
-                ),
-                opensearch_host=config.get_opensearch_host(),
-                opensearch_port=config.get_opensearch_port(),
-                opensearch_username=config.get_opensearch_username(),
-                opensearch_password=config.get_opensearch_password(),
-                index_id=exp_config_data.get("index_id"),
-                knowledge_base_id=exp_config.get("kb_data"),
-                aws_region=aws_region
-            )
+@router.post("/heval/query-experiments", tags=["heval"])
+async def query_experiments(
+    query: ExperimentQuery,
+    experiment_db: DynamoDB = Depends(get_experiment_db)
+):
+    _validate_experiment_count(query)
 
+    runtimes = await asyncio.gather(*[_get_experiment_runtime(experiment_db, exp_id) for exp_id in query.experiment_ids])
+
+    async def run_experiment(runtime):
         # Answer Generation
-        if vector_storage:
-            hierarchical = exp_config.get("chunking_strategy") == 'hierarchical'
-            question_chunk = Chunk(data=query.query)
-
-            vector_response = await asyncio.to_thread(
-                vector_storage.search, question_chunk, int(exp_config['knn_num']), hierarchical
-            )
-            vector_response = vector_response.to_json()['result']
-            metadata, answer = await asyncio.to_thread(
-                inferencer.generate_text, query.query, vector_response
-            )
-        else:
-            metadata, answer = await asyncio.to_thread(
-                inferencer.generate_text, query.query, None
-            )
-            
-        input_tokens, output_tokens, total_tokens, latency = metadata.values()
-        question_price, million_questions_price = get_model_question_prices(bedrock_price_df, inference_model, input_tokens, output_tokens, aws_region)
-        
-        
-        if 'latencyMs' in metadata:
-            metadata['latency_milliseconds'] = metadata.pop('latencyMs')
-        if 'totalTokens' in metadata:
-            del metadata['totalTokens']
-        metadata['total_token_cost'] = question_price
-        metadata['token_cost_for_million_such_questions'] = million_questions_price
+        context = await _retrieve_context(runtime, query.query)
+        metadata, answer = await _generate_text(runtime["inferencer"], query.query, context)
+        metadata = _add_cost_metadata(metadata, runtime["inference_model"], runtime["aws_region"])
 
         return {
-            "experiment_id": experiment_id,
-            "inference_model": inference_model,
-            "temperature": inference_temperature,
+            "experiment_id": runtime["experiment_id"],
+            "inference_model": runtime["inference_model"],
+            "temperature": runtime["temperature"],
             "answer": answer,
             "metadata": metadata
         }
 
-    results = await asyncio.gather(*[run_experiment(exp) for exp in experiment_configs])
+    results = await asyncio.gather(*[run_experiment(runtime) for runtime in runtimes if runtime])
 
     return JSONResponse(content={"results": results})
 
+
+def _sse_event(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@router.post("/heval/query-experiments/stream", tags=["heval"])
+async def stream_query_experiments(
+    query: ExperimentQuery,
+    experiment_db: DynamoDB = Depends(get_experiment_db)
+):
+    """
+    Streaming variant of /heval/query-experiments as server-sent events.
+
+    The experiments generate concurrently and their events are interleaved as they arrive:
+    `start` once per experiment, `token` for every chunk of answer text, `metadata` with the
+    token counts, cost, latency, time to first token and tokens per second once an answer is
+    complete, `error` if an experiment fails, and a single `done` after all experiments finish.
+    Every event except `done` carries the `experiment_id` it belongs to.
+    """
+    _validate_experiment_count(query)
+
+    events: asyncio.Queue = asyncio.Queue()
+
+    async def stream_experiment(experiment_id):
+        try:
+            runtime = await _get_experiment_runtime(experiment_db, experiment_id)
+            if runtime is None:
+                await events.put(_sse_event("error", {"experiment_id": experiment_id, "detail": "Experiment not found"}))
+                return
+            await events.put(_sse_event("start", {
+                "experiment_id": experiment_id,
+                "inference_model": runtime["inference_model"],
+                "temperature": runtime["temperature"]
+            }))
+
+            context = await _retrieve_context(runtime, query.query)
+            # Closed as soon as the task is cancelled, so the model's response stream is released
+            async with aclosing(stream_generation(runtime["inferencer"], query.query, context)) as generation:
+                async for kind, value in generation:
+                    if kind == "delta":
+                        await events.put(_sse_event("token", {"experiment_id": experiment_id, "text": value}))
+                    else:
+                        metadata = _add_cost_metadata(value, runtime["inference_model"], runtime["aws_region"])
+                        await events.put(_sse_event("metadata", {"experiment_id": experiment_id, "metadata": metadata}))
+        except Exception as e:
+            logger.error(f"Streaming answer for experiment {experiment_id} failed: {e}")
+            await events.put(_sse_event("error", {"experiment_id": experiment_id, "detail": str(e)}))
+
+    async def event_stream():
+        tasks = [asyncio.create_task(stream_experiment(exp_id)) for exp_id in query.experiment_ids]
+        finished = asyncio.gather(*tasks)
+        finished.add_done_callback(lambda _: events.put_nowait(None))
+        try:
+            while (event := await events.get()) is not None:
+                yield event
+            yield _sse_event("done", {"experiment_ids": query.experiment_ids})
+        finally:
+            # The client disconnected before all answers were complete
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
     
+@router.delete("/heval/runtime-cache", tags=["heval"])
+async def clear_runtime_cache(experiment_id: Optional[str] = None):
+    """Drop the cached runtime of one experiment, or of all experiments when no id is given."""
+    invalidate_experiment_runtime(experiment_id)
+    return {"status": "success", "cached_experiments": len(get_experiment_runtime_cache())}
+
+
 @router.post("/heval/upvote", tags=["heval"])
 async def vote(
     vote_data: VotePayload,
@@ -0,0 +1,97 @@
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class RuntimeCache:
+    """
+    Thread-safe LRU cache whose entries expire `ttl_seconds` after they were built.
+
+    Values are built on a miss by the caller's builder. Concurrent misses for the same key wait
+    for a single build instead of each constructing the value. Entries live in this process
+    only: when the API runs several workers, `invalidate` reaches the local worker and the TTL
+    bounds how long the others can serve a stale entry.
+    """
+
+    def __init__(self, max_size: int = 32, ttl_seconds: float = 900):
+        self.max_size = max(1, max_size)
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_locks: Dict[Hashable, threading.Lock] = {}
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def get_or_build(self, key: Hashable, builder: Callable[[], Optional[Any]]) -> Optional[Any]:
+        """Return the cached value for `key`, building and caching it on a miss. A builder result of None is not cached."""
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+        with build_lock:
+            # Another thread may have built it while this one waited
+            value = self.get(key)
+            if value is not None:
+                return value
+            value = builder()
+            if value is not None:
+                self.put(key, value)
+            with self._lock:
+                self._build_locks.pop(key, None)
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                evicted, _ = self._entries.popitem(last=False)
+                logger.debug(f"Evicted {evicted} from runtime cache")
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drop one entry, or every entry when no key is given."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_experiment_runtimes: Optional[RuntimeCache] = None
+_experiment_runtimes_lock = threading.Lock()
+
+
+def get_experiment_runtime_cache() -> RuntimeCache:
+    """Return the process-wide cache of human-eval experiment runtimes, sized from the config."""
+    global _experiment_runtimes
+    if _experiment_runtimes is None:
+        with _experiment_runtimes_lock:
+            if _experiment_runtimes is None:
+                from config.config import get_config
+                config = get_config()
+                _experiment_runtimes = RuntimeCache(config.heval_runtime_cache_size, config.heval_runtime_cache_ttl)
+    return _experiment_runtimes
+
+
+def invalidate_experiment_runtime(experiment_id: Optional[str] = None) -> None:
+    """Forget the cached runtime of an experiment that changed or was deleted, or of all experiments."""
+    if _experiment_runtimes is not None:
+        _experiment_runtimes.invalidate(experiment_id)
@@ -0,0 +1,246 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+
+from util.boto3_clients import get_async_client, get_client
+
+logger = logging.getLogger(__name__)
+
+# Models that reject the system parameter of the converse API, the system prompt is sent as a user turn instead.
+# Mirrors BedrockInferencer.generate_text of the pinned flotorch_core, tests/test_streaming.py checks they agree.
+_NO_SYSTEM_PROMPT_MODELS = ("amazon.titan-text-express-v1", "amazon.titan-text-lite-v1", "mistral.mistral-7b-instruct-v0:2")
+
+_DONE = object()
+
+
+class StreamStats:
+    """Timing and token counts of one streamed generation."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.end: Optional[float] = None
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.output_chars = 0
+        self.deltas = 0
+
+    def on_delta(self, text: str) -> None:
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        self.output_chars += len(text)
+        self.deltas += 1
+
+    def finish(self) -> Dict[str, Any]:
+        self.end = time.perf_counter()
+        # Endpoints that do not report usage are approximated at ~4 characters per token
+        output_tokens = self.output_tokens or self.output_chars // 4
+        first_token_at = self.first_token_at or self.end
+        # Decode throughput after the first token; an answer that arrived in one piece is rated over the whole call
+        generation_seconds = self.end - (first_token_at if self.deltas > 1 else self.start)
+        return {
+            'inputTokens': self.input_tokens,
+            'outputTokens': output_tokens,
+            'latencyMs': int((self.end - self.start) * 1000),
+            'time_to_first_token_ms': int((first_token_at - self.start) * 1000),
+            'tokens_per_second': round(output_tokens / generation_seconds, 2) if generation_seconds > 0 else None
+        }
+
+
+async def stream_generation(inferencer: Any, user_query: str, context: Optional[List[Dict]]) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Stream an answer from a flotorch_core inferencer.
+
+    Yields ("delta", text) for every chunk of generated text and finally ("metadata", dict) with
+    token counts, latency, time to first token and tokens per second. Bedrock models stream through
+    `converse_stream` and SageMaker endpoints through `invoke_endpoint_with_response_stream`. Other
+    inferencers, and SageMaker endpoints that cannot stream, produce the whole answer as one delta.
+    """
+    stats = StreamStats()
+    if hasattr(inferencer, 'client') and inferencer.client.meta.service_model.service_name == 'bedrock-runtime':
+        events = _stream_bedrock(inferencer, user_query, context, stats)
+    elif hasattr(inferencer, 'inferencing_model_endpoint_name'):
+        events = _stream_sagemaker(inferencer, user_query, context, stats)
+    else:
+        events = _generate_once(inferencer, user_query, context, stats)
+
+    try:
+        async for text in events:
+            stats.on_delta(text)
+            yield "delta", text
+    finally:
+        # Runs the backends' cleanup right away when the consumer stops early, e.g. on a client disconnect
+        await events.aclose()
+    yield "metadata", stats.finish()
+
+
+async def _stream_bedrock(inferencer: Any, user_query: str, context: Optional[List[Dict]], stats: StreamStats) -> AsyncIterator[str]:
+    request_params = _bedrock_request(inferencer, user_query, context)
+    region = inferencer.client.meta.region_name
+    async_client = await get_async_client('bedrock-runtime', region_name=region)
+    if async_client is not None:
+        response = await async_client.converse_stream(**request_params)
+        events = response['stream']
+    else:
+        response = get_client('bedrock-runtime', region_name=region).converse_stream(**request_params)
+        events = _iterate_in_thread(lambda: response['stream'])
+
+    try:
+        async for event in events:
+            if 'contentBlockDelta' in event:
+                text = event['contentBlockDelta']['delta'].get('text')
+                if text:
+                    yield text
+            elif 'metadata' in event:
+                usage = event['metadata'].get('usage', {})
+                stats.input_tokens = usage.get('inputTokens', 0)
+                stats.output_tokens = usage.get('outputTokens', 0)
+    finally:
+        await _close_stream(events, response['stream'])
+
+
+def _bedrock_request(inferencer: Any, user_query: str, context: Optional[List[Dict]]) -> Dict[str, Any]:
+    """Build the same converse request as the inferencer's `generate_text`."""
+    system_prompt, messages = inferencer.generate_prompt(user_query, True, context)
+    inference_config = {"temperature": inferencer.temperature}
+    for param, value in (("maxTokens", getattr(inferencer, 'max_tokens', None)), ("topP", getattr(inferencer, 'topP', None))):
+        if value is not None:
+            inference_config[param] = value
+
+    request_params = {
+        "modelId": inferencer.model_id,
+        "inferenceConfig": inference_config,
+        "messages": messages
+    }
+    if system_prompt:
+        if inferencer.model_id in _NO_SYSTEM_PROMPT_MODELS:
+            request_params["messages"] = [{"role": "user", "content": [{"text": system_prompt}]}] + messages
+        else:
+            request_params["system"] = [{"text": system_prompt}]
+    return request_params
+
+
+async def _stream_sagemaker(inferencer: Any, user_query: str, context: Optional[List[Dict]], stats: StreamStats) -> AsyncIterator[str]:
+    system_prompt, prompt = inferencer.generate_prompt(user_query, True, context)
+    payload = inferencer.construct_payload(system_prompt, prompt)
+    payload["stream"] = True
+    stats.input_tokens = len(prompt) // 4
+    request = {
+        "EndpointName": inferencer.inferencing_model_endpoint_name,
+        "ContentType": "application/json",
+        "Body": json.dumps(payload)
+    }
+    region = inferencer.client.meta.region_name
+
+    try:
+        async_client = await get_async_client('sagemaker-runtime', region_name=region)
+        if async_client is not None:
+            response = await async_client.invoke_endpoint_with_response_stream(**request)
+            events = response['Body']
+        else:
+            response = get_client('sagemaker-runtime', region_name=region).invoke_endpoint_with_response_stream(**request)
+            events = _iterate_in_thread(lambda: response['Body'])
+    except Exception as e:
+        # JumpStart containers without response streaming support reject the request up front
+        logger.info(f"Endpoint {request['EndpointName']} cannot stream, generating in one call: {e}")
+        async for text in _generate_once(inferencer, user_query, context, stats):
+            yield text
+        return
+
+    # Text generation containers send server-sent events split across payload parts
+    buffer = b""
+    try:
+        async for event in events:
+            buffer += event.get('PayloadPart', {}).get('Bytes', b"")
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                text = _parse_tgi_line(line)
+                if text:
+                    yield text
+    finally:
+        await _close_stream(events, response['Body'])
+    text = _parse_tgi_line(buffer)
+    if text:
+        yield text
+
+
+def _parse_tgi_line(line: bytes) -> Optional[str]:
+    line = line.strip()
+    if line.startswith(b"data:"):
+        line = line[len(b"data:"):].strip()
+    if not line:
+        return None
+    try:
+        data = json.loads(line)
+    except ValueError:
+        return None
+    token = data.get('token') if isinstance(data, dict) else None
+    if token and not token.get('special'):
+        return token.get('text')
+    return None
+
+
+async def _generate_once(inferencer: Any, user_query: str, context: Optional[List[Dict]], stats: StreamStats) -> AsyncIterator[str]:
+    metadata, answer = await asyncio.to_thread(inferencer.generate_text, user_query, context)
+    if isinstance(metadata, dict):
+        stats.input_tokens = int(metadata.get('inputTokens') or 0)
+        stats.output_tokens = int(metadata.get('outputTokens') or 0)
+    if answer:
+        yield answer
+
+
+async def _iterate_in_thread(make_iterable: Callable[[], Iterable[Any]]) -> AsyncIterator[Any]:
+    """
+    Consume a blocking iterable on a worker thread, handing its items to the event loop.
+
+    The thread stops at the next item once the consumer closes the generator. Closing the
+    underlying stream as well, as `_close_stream` does, releases a read it is blocked on.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def _put(item) -> None:
+        if stop.is_set():
+            return
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:
+            # The event loop closed while the thread was reading
+            stop.set()
+
+    def _produce():
+        try:
+            for item in make_iterable():
+                if stop.is_set():
+                    return
+                _put(item)
+        except Exception as e:
+            _put(e)
+        finally:
+            _put(_DONE)
+
+    threading.Thread(target=_produce, daemon=True).start()
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+async def _close_stream(events: Any, stream: Any) -> None:
+    """Stop the thread reading a response event stream, if any, and close the stream."""
+    if hasattr(events, 'aclose'):
+        await events.aclose()
+    try:
+        stream.close()
+    except Exception as e:
+        logger.debug(f"Closing the response stream failed: {e}")
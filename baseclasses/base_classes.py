@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Union
+from typing import List, Dict, Any, Union, Tuple
 from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import datetime
@@ -16,6 +16,8 @@ import random
 from dataclasses import dataclass, asdict
 from decimal import Decimal
 import botocore
+import functools
+import asyncio
 
 
 logger = logging.getLogger(__name__)
@@ -68,6 +70,14 @@ class BaseInferencer(ABC):
         """Generate text based on input"""
         pass
 
+    async def agenerate_text(self, user_query: str, default_prompt: str, context: List[Dict] = None, **kwargs) -> Tuple[Dict[Any, Any], str]:
+        """
+        Coroutine version of `generate_text`.
+
+        Inferencers with a native async client override this. The default runs `generate_text` on a worker thread.
+        """
+        return await asyncio.to_thread(self.generate_text, user_query=user_query, default_prompt=default_prompt, context=context, **kwargs)
+
     def get_model_id(self) -> str:
         """Return the model ID."""
         return self.model_id
@@ -326,6 +336,10 @@ class BaseHierarchicalChunker(ABC):
 class BaseEmbedder(ABC):
     """Abstract base class for all embedders."""
 
+    # Number of texts the model accepts in one request. Embedders whose models
+    # take multi-text payloads override this and `embed_batch`.
+    max_batch_size: int = 1
+
     def __init__(self, model_id: str) -> None:
         self.model_id = model_id
 
@@ -337,6 +351,21 @@ class BaseEmbedder(ABC):
     def embed(self, text: str, dimensions: int = 256, normalize: bool = True) -> List[float]:
         pass
 
+    def embed_batch(self, texts: List[str], dimensions: int = 256, normalize: bool = True) -> Tuple[Dict[str, int], List[List[float]]]:
+        """
+        Embed a batch of texts and return the batch metadata with one embedding per text, in input order.
+        The default implementation issues one request per text.
+        """
+        input_tokens = 0
+        latency = 0
+        embeddings = []
+        for text in texts:
+            metadata, embedding = self.embed(text, dimensions=dimensions, normalize=normalize)
+            input_tokens += int(metadata.get('inputTokens', 0))
+            latency += int(metadata.get('latencyMs', 0))
+            embeddings.append(embedding)
+        return {'inputTokens': input_tokens, 'latencyMs': latency}, embeddings
+
     def get_model_id(self) -> str:
         return self.model_id
     
@@ -461,7 +490,13 @@ class RetryParams(BaseModel):
     backoff_factor: int
     
 class BotoRetryHandler(ABC):
-    """Abstract class for retry handler"""
+    """
+    Abstract class for retry handler.
+
+    Throttled calls are retried with full-jitter exponential backoff. Handlers that return a
+    rate limiter from `rate_limiter` also pace every attempt through it and feed it throttle
+    and token usage feedback, so all callers of a model share one view of its quota.
+    """
     
     @property
     @abstractmethod
@@ -472,27 +507,53 @@ class BotoRetryHandler(ABC):
     @abstractmethod
     def retryable_errors(self) -> set[str]:
         pass
-        
+
+    def rate_limiter(self, instance: Any) -> Optional[Any]:
+        """Limiter shared by the calls of `instance`, the object whose method is decorated."""
+        return None
+
+    def estimate_tokens(self, args: Tuple, kwargs: Dict[str, Any]) -> int:
+        return 0
+
+    def actual_tokens(self, result: Any) -> Optional[int]:
+        return None
         
     def __call__(self, func):
+        if asyncio.iscoroutinefunction(func):
+            return self._async_wrapper(func)
+
+        @functools.wraps(func)
         def wrapper(*args, **kwargs):
             retries = 0
             retry_params = self.retry_params
+            limiter = self.rate_limiter(args[0]) if args else None
+            estimated_tokens = self.estimate_tokens(args[1:], kwargs) if limiter is not None else 0
             while retries < retry_params.max_retries:
                 try:
-                    return func(*args, **kwargs)
+                    if limiter is not None:
+                        limiter.acquire(estimated_tokens)
+                    result = func(*args, **kwargs)
+                    if limiter is not None:
+                        limiter.on_success()
+                        actual_tokens = self.actual_tokens(result)
+                        if actual_tokens is not None:
+                            limiter.record_usage(estimated_tokens, actual_tokens)
+                    return result
                 except botocore.exceptions.ClientError as e:
                     error_code = e.response['Error']['Code']
                     if error_code in self.retryable_errors:
                         retries += 1
+                        if limiter is not None:
+                            limiter.on_throttle()
                         logger.error(f"Rate limit error in Bedrock converse (Attempt {retries}/{retry_params.max_retries}): {str(e)}")
                         
                         if retries >= retry_params.max_retries:
                             logger.error("Max retries reached. Could not complete Bedrock converse operation.")
                             raise
                         
-                        backoff_time = retry_params.retry_delay * (retry_params.backoff_factor ** (retries - 1))
-                        logger.info(f"Retrying in {backoff_time} seconds...")
+                        # Full jitter keeps throttled callers from retrying in lockstep
+                        backoff_time = random.uniform(0, retry_params.retry_delay * (retry_params.backoff_factor ** (retries - 1)))
+                        logger.info(f"Retrying in {backoff_time:.2f} seconds...")
                         time.sleep(backoff_time)
                     else:
                         # If it's not a rate limit error, raise immediately
@@ -502,4 +563,40 @@ class BotoRetryHandler(ABC):
                     logger.error(f"Unexpected error in Bedrock converse: {str(e)}")
                     raise
             
-        return wrapper
\ No newline at end of file
+        return wrapper
+
+    def _async_wrapper(self, func):
+        """Coroutine version of the retry loop, waiting on the limiter and backoff without blocking the event loop."""
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            retries = 0
+            retry_params = self.retry_params
+            limiter = self.rate_limiter(args[0]) if args else None
+            estimated_tokens = self.estimate_tokens(args[1:], kwargs) if limiter is not None else 0
+            while True:
+                if limiter is not None:
+                    await limiter.aacquire(estimated_tokens)
+                try:
+                    result = await func(*args, **kwargs)
+                except botocore.exceptions.ClientError as e:
+                    if e.response['Error']['Code'] not in self.retryable_errors:
+                        raise
+                    retries += 1
+                    if limiter is not None:
+                        limiter.on_throttle()
+                    logger.error(f"Rate limit error (Attempt {retries}/{retry_params.max_retries}): {str(e)}")
+                    if retries >= retry_params.max_retries:
+                        logger.error("Max retries reached.")
+                        raise
+                    backoff_time = random.uniform(0, retry_params.retry_delay * (retry_params.backoff_factor ** (retries - 1)))
+                    logger.info(f"Retrying in {backoff_time:.2f} seconds...")
+                    await asyncio.sleep(backoff_time)
+                    continue
+                if limiter is not None:
+                    limiter.on_success()
+                    actual_tokens = self.actual_tokens(result)
+                    if actual_tokens is not None:
+                        limiter.record_usage(estimated_tokens, actual_tokens)
+                return result
+
+        return wrapper
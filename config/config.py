@@ -26,6 +26,53 @@ class Config:
     bedrock_role_arn : str
     sagemaker_role_arn: str
     bedrock_limit_csv_path: str
+    embedding_max_workers: int = 8
+    opensearch_bulk_threads: int = 4
+    opensearch_bulk_chunk_size: int = 500
+    indexing_queue_size: int = 1000
+    pdf_extractor_backend: str = 'pymupdf'
+    pdf_extraction_workers: int = 0
+    embedding_cache_enabled: bool = True
+    embedding_cache_dir: str = '/tmp/embedding_cache'
+    embedding_cache_s3_prefix: str = ''
+    embedding_cache_max_mb: int = 2048
+    index_registry_table: str = ''
+    index_registry_lease_seconds: int = 900
+    index_registry_wait_timeout: int = 21600
+    retrieval_max_workers: int = 8
+    retrieval_embedding_rps: float = 0
+    retrieval_opensearch_rps: float = 0
+    retrieval_rerank_rps: float = 0
+    retrieval_inference_rps: float = 0
+    retrieval_guardrails_rps: float = 0
+    bedrock_quotas_csv_path: str = ''
+    bedrock_service_quotas: bool = True
+    retrieval_block_size: int = 0
+    opensearch_msearch_batch_size: int = 50
+    opensearch_bulk_load_mode: bool = False
+    opensearch_force_merge_segments: int = 0
+    opensearch_knn_warmup: bool = True
+    retrieval_async_mode: bool = False
+    retrieval_async_concurrency: int = 64
+    heval_runtime_cache_size: int = 32
+    heval_runtime_cache_ttl: float = 900
+    incremental_indexing: bool = False
+    index_manifest_s3_prefix: str = 'index_manifests'
+    s3_download_workers: int = 8
+    s3_multipart_threshold_mb: int = 16
+    kb_streaming_extraction: bool = False
+    dynamodb_writer_threads: int = 2
+    dynamodb_writer_flush_seconds: float = 1.0
+    dynamodb_scan_segments: int = 4
+    eval_max_workers: int = 16
+    eval_timeout: int = 180
+    eval_max_retries: int = 10
+    eval_max_wait: int = 60
+    eval_batch_size: int = 50
+    eval_resume: bool = False
+    kb_streaming_spill_mb: int = 32
+    kb_streaming_inflight_mb: int = 256
+    eval_run_id: str = ''
 
     @staticmethod
     def load_config() -> 'Config':
@@ -57,7 +104,54 @@ class Config:
             s3_bucket=os.getenv('s3_bucket', ''),
             bedrock_role_arn=os.getenv('bedrock_role_arn', ''),
             sagemaker_role_arn=os.getenv('sagemaker_role_arn', ''),
-            bedrock_limit_csv_path=os.getenv('bedrock_limit_csv', '')
+            bedrock_limit_csv_path=os.getenv('bedrock_limit_csv', ''),
+            embedding_max_workers=int(os.getenv('embedding_max_workers', '8')),
+            opensearch_bulk_threads=int(os.getenv('opensearch_bulk_threads', '4')),
+            opensearch_bulk_chunk_size=int(os.getenv('opensearch_bulk_chunk_size', '500')),
+            indexing_queue_size=int(os.getenv('indexing_queue_size', '1000')),
+            pdf_extractor_backend=os.getenv('pdf_extractor_backend', 'pymupdf'),
+            pdf_extraction_workers=int(os.getenv('pdf_extraction_workers', '0')),
+            embedding_cache_enabled=os.getenv('embedding_cache_enabled', 'true').lower() == 'true',
+            embedding_cache_dir=os.getenv('embedding_cache_dir', '/tmp/embedding_cache'),
+            embedding_cache_s3_prefix=os.getenv('embedding_cache_s3_prefix', ''),
+            embedding_cache_max_mb=int(os.getenv('embedding_cache_max_mb', '2048')),
+            index_registry_table=os.getenv('index_registry_table', ''),
+            index_registry_lease_seconds=int(os.getenv('index_registry_lease_seconds', '900')),
+            index_registry_wait_timeout=int(os.getenv('index_registry_wait_timeout', '21600')),
+            retrieval_max_workers=int(os.getenv('retrieval_max_workers', '8')),
+            retrieval_embedding_rps=float(os.getenv('retrieval_embedding_rps', '0')),
+            retrieval_opensearch_rps=float(os.getenv('retrieval_opensearch_rps', '0')),
+            retrieval_rerank_rps=float(os.getenv('retrieval_rerank_rps', '0')),
+            retrieval_inference_rps=float(os.getenv('retrieval_inference_rps', '0')),
+            retrieval_guardrails_rps=float(os.getenv('retrieval_guardrails_rps', '0')),
+            bedrock_quotas_csv_path=os.getenv('bedrock_quotas_csv', ''),
+            bedrock_service_quotas=os.getenv('bedrock_service_quotas', 'true').lower() == 'true',
+            retrieval_block_size=int(os.getenv('retrieval_block_size', '0')),
+            opensearch_msearch_batch_size=int(os.getenv('opensearch_msearch_batch_size', '50')),
+            opensearch_bulk_load_mode=os.getenv('opensearch_bulk_load_mode', 'false').lower() == 'true',
+            opensearch_force_merge_segments=int(os.getenv('opensearch_force_merge_segments', '0')),
+            opensearch_knn_warmup=os.getenv('opensearch_knn_warmup', 'true').lower() == 'true',
+            retrieval_async_mode=os.getenv('retrieval_async_mode', 'false').lower() == 'true',
+            retrieval_async_concurrency=int(os.getenv('retrieval_async_concurrency', '64')),
+            heval_runtime_cache_size=int(os.getenv('heval_runtime_cache_size', '32')),
+            heval_runtime_cache_ttl=float(os.getenv('heval_runtime_cache_ttl', '900')),
+            incremental_indexing=os.getenv('incremental_indexing', 'false').lower() == 'true',
+            index_manifest_s3_prefix=os.getenv('index_manifest_s3_prefix', 'index_manifests'),
+            s3_download_workers=int(os.getenv('s3_download_workers', '8')),
+            s3_multipart_threshold_mb=int(os.getenv('s3_multipart_threshold_mb', '16')),
+            kb_streaming_extraction=os.getenv('kb_streaming_extraction', 'false').lower() == 'true',
+            dynamodb_writer_threads=int(os.getenv('dynamodb_writer_threads', '2')),
+            dynamodb_writer_flush_seconds=float(os.getenv('dynamodb_writer_flush_seconds', '1.0')),
+            dynamodb_scan_segments=int(os.getenv('dynamodb_scan_segments', '4')),
+            eval_max_workers=int(os.getenv('eval_max_workers', '16')),
+            eval_timeout=int(os.getenv('eval_timeout', '180')),
+            eval_max_retries=int(os.getenv('eval_max_retries', '10')),
+            eval_max_wait=int(os.getenv('eval_max_wait', '60')),
+            eval_batch_size=int(os.getenv('eval_batch_size', '50')),
+            eval_resume=os.getenv('eval_resume', 'false').lower() == 'true',
+            kb_streaming_spill_mb=int(os.getenv('kb_streaming_spill_mb', '32')),
+            kb_streaming_inflight_mb=int(os.getenv('kb_streaming_inflight_mb', '256')),
+            eval_run_id=os.getenv('eval_run_id', '')
             )
 
 
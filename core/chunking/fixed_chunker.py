@@ -1,5 +1,4 @@
 from typing import List
-from langchain.text_splitter import CharacterTextSplitter
 from baseclasses.base_classes import BaseChunker
 
 
@@ -14,6 +13,9 @@ class FixedChunker(BaseChunker):
         if not text:
             raise ValueError("Input text cannot be empty or None")
         
+        # Imported here as LangChain is slow to import and only needed once documents are chunked
+        from langchain.text_splitter import CharacterTextSplitter
+
         # TODO: Temporary fix, better to move to recursive
         separators = [' ', '\t', '\n', '\r', '\f', '\v']
         for sep in separators:
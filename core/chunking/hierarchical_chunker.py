@@ -1,6 +1,5 @@
 from typing import List
 from baseclasses.base_classes import BaseHierarchicalChunker
-from langchain.text_splitter import CharacterTextSplitter
 import uuid
 
 class HierarchicalChunker(BaseHierarchicalChunker):
@@ -18,6 +17,9 @@ class HierarchicalChunker(BaseHierarchicalChunker):
         if not text:
             raise ValueError("Input text cannot be empty or None")
         
+        # Imported here as LangChain is slow to import and only needed once documents are chunked
+        from langchain.text_splitter import CharacterTextSplitter
+
         # TODO: Temporary fix, better to move to recursive
         separators = [' ', '\t', '\n', '\r', '\f', '\v']
         for sep in separators:
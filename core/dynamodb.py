@@ -1,11 +1,14 @@
-import boto3
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Any, Optional
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
 from botocore.exceptions import ClientError
 from decimal import Decimal
 import json
 import time
 from datetime import datetime, timezone
+from util.boto3_clients import get_client, get_resource
+from core.dynamodb_batch_writer import DynamoDBBatchWriter, jittered_backoff
 
 class DynamoDBOperations:
     """Class to handle DynamoDB operations."""
@@ -23,11 +26,11 @@ class DynamoDBOperations:
         self.logger = logging.getLogger(__name__)
         
         # Initialize DynamoDB resources
-        self.dynamodb = boto3.resource('dynamodb', region_name=region)
+        self.dynamodb = get_resource('dynamodb', region_name=region)
         self.table = self.dynamodb.Table(table_name)
         
         # Initialize DynamoDB client for batch operations
-        self.dynamodb_client = boto3.client('dynamodb', region_name=region)
+        self.dynamodb_client = get_client('dynamodb', region_name=region)
 
     def _handle_decimal_type(self, obj: Any) -> Any:
         """
@@ -59,16 +62,22 @@ class DynamoDBOperations:
             return obj.isoformat()  # Convert datetime to ISO 8601 string
         return obj
     
-    def scan_all(self, filter_expression: Optional[str] = None, expression_values: Optional[Dict[str, Any]] = None, expression_attribute_names: Optional[Dict[str, str]] = None) -> Dict:
+    def scan_all(self, filter_expression: Optional[str] = None, expression_values: Optional[Dict[str, Any]] = None, expression_attribute_names: Optional[Dict[str, str]] = None,
+                 projection: Optional[str] = None, total_segments: int = 1) -> Dict:
         """
         Scan items from DynamoDB, optionally applying filter expressions.
         Args:
             filter_expression (Optional[str]): Filter expression for the scan.
             expression_values (Optional[Dict[str, Any]]): Attribute values for the filter.
             expression_attribute_names (Optional[Dict[str, str]]): Attribute names mapping for reserved keywords.
+            projection (Optional[str]): Projection expression of the attributes to return.
+            total_segments (int): Read the table as a parallel scan of this many segments when greater than 1.
         Returns:
             Dict: Scan results.
         """
+        if total_segments > 1:
+            return {"Items": self.parallel_scan(total_segments, filter_expression, expression_values, expression_attribute_names, projection)}
+
         result = {
             "Items": []
         }
@@ -82,6 +91,8 @@ class DynamoDBOperations:
                 params["ExpressionAttributeValues"] = self._handle_decimal_type(expression_values)
             if expression_attribute_names:
                 params["ExpressionAttributeNames"] = expression_attribute_names
+            if projection:
+                params["ProjectionExpression"] = projection
 
             while True:
                 if last_evaluated_key:
@@ -98,7 +109,132 @@ class DynamoDBOperations:
         except Exception as e:
             self.logger.error(f"Error scanning items: {str(e)}")
             raise
-    
+
+    def parallel_scan(self, total_segments: int, filter_expression: Optional[str] = None, expression_values: Optional[Dict[str, Any]] = None,
+                      expression_attribute_names: Optional[Dict[str, str]] = None, projection: Optional[str] = None) -> List[Dict]:
+        """
+        Scan the whole table with `total_segments` segments read concurrently, one thread per segment.
+
+        Args:
+            total_segments (int): Number of segments, see the Segment/TotalSegments scan parameters.
+            filter_expression (Optional[str]): Filter expression for the scan.
+            expression_values (Optional[Dict[str, Any]]): Attribute values for the filter.
+            expression_attribute_names (Optional[Dict[str, str]]): Attribute names mapping for reserved keywords.
+            projection (Optional[str]): Projection expression of the attributes to return.
+
+        Returns:
+            List[Dict]: Items of all segments, in segment order.
+        """
+        # Segments run on the thread-safe low-level client rather than the shared table resource
+        serializer, deserializer = TypeSerializer(), TypeDeserializer()
+        params = {"TableName": self.table_name, "TotalSegments": total_segments}
+        if filter_expression:
+            params["FilterExpression"] = filter_expression
+        if expression_values:
+            params["ExpressionAttributeValues"] = {
+                key: serializer.serialize(value) for key, value in self._handle_decimal_type(expression_values).items()
+            }
+        if expression_attribute_names:
+            params["ExpressionAttributeNames"] = expression_attribute_names
+        if projection:
+            params["ProjectionExpression"] = projection
+
+        def _scan_segment(segment: int) -> List[Dict]:
+            items = []
+            segment_params = dict(params, Segment=segment)
+            while True:
+                response = self.dynamodb_client.scan(**segment_params)
+                items.extend({key: deserializer.deserialize(value) for key, value in item.items()} for item in response.get('Items', []))
+                if 'LastEvaluatedKey' not in response:
+                    return items
+                segment_params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+        try:
+            with ThreadPoolExecutor(max_workers=total_segments) as executor:
+                segments = list(executor.map(_scan_segment, range(total_segments)))
+            return [item for segment_items in segments for item in segment_items]
+        except Exception as e:
+            self.logger.error(f"Error scanning items in parallel: {str(e)}")
+            raise
+
+    def query_all(self, key_condition_expression: str, expression_values: Dict[str, Any], index_name: Optional[str] = None,
+                  projection: Optional[str] = None, expression_attribute_names: Optional[Dict[str, str]] = None,
+                  filter_expression: Optional[str] = None) -> List[Dict]:
+        """
+        Query items from DynamoDB, following every page of the results.
+
+        Args:
+            key_condition_expression (str): Key condition expression
+            expression_values (Dict[str, Any]): Expression attribute values
+            index_name (str, optional): Name of the index to query
+            projection (str, optional): Projection expression of the attributes to return
+            expression_attribute_names (Dict[str, str], optional): Attribute names mapping for reserved keywords
+            filter_expression (str, optional): Filter applied to the matching items
+
+        Returns:
+            List[Dict]: All matching items
+        """
+        params = {
+            'KeyConditionExpression': key_condition_expression,
+            'ExpressionAttributeValues': self._handle_decimal_type(expression_values)
+        }
+        if index_name:
+            params['IndexName'] = index_name
+        if projection:
+            params['ProjectionExpression'] = projection
+        if expression_attribute_names:
+            params['ExpressionAttributeNames'] = expression_attribute_names
+        if filter_expression:
+            params['FilterExpression'] = filter_expression
+
+        items = []
+        try:
+            while True:
+                response = self.table.query(**params)
+                items.extend(response.get('Items', []))
+                if 'LastEvaluatedKey' not in response:
+                    break
+                params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+            self.logger.info(f"Successfully queried {len(items)} items")
+            return items
+        except ClientError as e:
+            self.logger.error(f"Error querying items: {str(e)}")
+            raise
+
+    def query_by_index(self, index_name: str, key: Dict[str, Any], projection: Optional[List[str]] = None,
+                       filter_expression: Optional[str] = None, expression_values: Optional[Dict[str, Any]] = None,
+                       expression_attribute_names: Optional[Dict[str, str]] = None) -> List[Dict]:
+        """
+        Query a global secondary index by the equality of its key attributes, e.g. {"execution_id": "abc"}.
+
+        Args:
+            index_name (str): Name of the index
+            key (Dict[str, Any]): Key attribute -> value, the partition key and optionally the sort key
+            projection (List[str], optional): Attributes to return, all projected attributes by default
+            filter_expression (str, optional): Filter applied to the matching items
+            expression_values (Dict[str, Any], optional): Attribute values used by the filter
+            expression_attribute_names (Dict[str, str], optional): Attribute names used by the filter
+
+        Returns:
+            List[Dict]: All matching items
+        """
+        names = dict(expression_attribute_names or {})
+        values = dict(expression_values or {})
+        conditions = []
+        for position, (attribute, value) in enumerate(key.items()):
+            names[f"#key{position}"] = attribute
+            values[f":key{position}"] = value
+            conditions.append(f"#key{position} = :key{position}")
+
+        projection_expression = None
+        if projection:
+            for position, attribute in enumerate(projection):
+                names[f"#attr{position}"] = attribute
+            projection_expression = ", ".join(f"#attr{position}" for position in range(len(projection)))
+
+        return self.query_all(" AND ".join(conditions), values, index_name=index_name, projection=projection_expression,
+                              expression_attribute_names=names, filter_expression=filter_expression)
+
     def scan(self, filter_expression: Optional[str] = None, expression_values: Optional[Dict[str, Any]] = None, expression_attribute_names: Optional[Dict[str, str]] = None) -> Dict:
         """
         Scan items from DynamoDB, optionally applying filter expressions.
@@ -272,7 +408,8 @@ class DynamoDBOperations:
     def query(self, 
               key_condition_expression: str,
               expression_values: Dict[str, Any],
-              index_name: str = None, projection: str = None, exclusive_start_key = None) -> Dict:
+              index_name: str = None, projection: str = None, exclusive_start_key = None,
+              limit: Optional[int] = None, expression_attribute_names: Optional[Dict[str, str]] = None) -> Dict:
         """
         Query items from DynamoDB.
 
@@ -281,6 +418,8 @@ class DynamoDBOperations:
             expression_values (Dict[str, Any]): Expression attribute values
             index_name (str, optional): Name of the index to query
             exclusive_start_key(Dict[str, Any]): LastEvaluateKey for pagination
+            limit (int, optional): Maximum number of items to evaluate in this page
+            expression_attribute_names (Dict[str, str], optional): Attribute names mapping for reserved keywords
 
         Returns:
             Dict: Query results
@@ -303,6 +442,12 @@ class DynamoDBOperations:
 
             if exclusive_start_key:
                 params['ExclusiveStartKey'] = exclusive_start_key
+
+            if limit:
+                params['Limit'] = limit
+
+            if expression_attribute_names:
+                params['ExpressionAttributeNames'] = expression_attribute_names
             
             response = self.table.query(**params)
             
@@ -358,8 +503,8 @@ class DynamoDBOperations:
                 if unprocessed_items:
                     retry_count += 1
                     if retry_count < max_retries:
-                        # Exponential backoff
-                        time.sleep(2 ** retry_count)
+                        # Exponential backoff with full jitter, so throttled writers do not retry in lockstep
+                        time.sleep(jittered_backoff(retry_count, base_delay=1.0))
             
             if unprocessed_items:
                 self.logger.warning(f"{len(unprocessed_items)} items remained unprocessed after {max_retries} retries")
@@ -373,6 +518,22 @@ class DynamoDBOperations:
             self.logger.error(f"Unexpected error: {str(e)}")
             raise
 
+    def batch_writer(self, workers: int = 2, flush_interval: float = 1.0, serialize_items: bool = False,
+                     **kwargs: Any) -> DynamoDBBatchWriter:
+        """
+        Create a background writer for this table, see `DynamoDBBatchWriter`.
+
+        Args:
+            workers (int): Number of writer threads
+            flush_interval (float): Seconds a partial batch waits for more items before it is sent
+            serialize_items (bool): Whether items are plain Python values rather than low-level attribute values
+
+        Returns:
+            DynamoDBBatchWriter: Writer to `put` items into and `close` when done
+        """
+        return DynamoDBBatchWriter(self.table_name, self.region, workers=workers, flush_interval=flush_interval,
+                                   serialize_items=serialize_items, client=self.dynamodb_client, **kwargs)
+
     def delete_item(self, key: Dict[str, Any], condition_expression: str = None) -> Dict:
         """
         Delete an item from DynamoDB.
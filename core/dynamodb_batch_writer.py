@@ -0,0 +1,204 @@
+import queue
+import random
+import threading
+import time
+import logging
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from boto3.dynamodb.types import TypeSerializer
+
+from util.boto3_clients import get_client
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+MAX_BATCH_ITEMS = 25
+
+_STOP = object()
+
+
+def jittered_backoff(attempt: int, base_delay: float = 0.05, max_delay: float = 5.0) -> float:
+    """Full-jitter exponential backoff: a random delay up to base_delay * 2 ** attempt, capped at max_delay."""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+class UnprocessedItemsError(RuntimeError):
+    """Raised when items were still unprocessed after the retries, which are kept in `items` in attribute-value format."""
+
+    def __init__(self, table_name: str, items: List[Dict[str, Any]]):
+        super().__init__(f"{len(items)} items could not be written to {table_name} after retries")
+        self.items = items
+
+
+class DynamoDBBatchWriter:
+    """
+    Writes items to a DynamoDB table from background threads.
+
+    `put` queues an item and returns straight away, blocking only when `max_queue_size` items are
+    already waiting. Writer threads pack queued items into BatchWriteItem requests, sent as soon as
+    25 items are collected or `flush_interval` seconds after the first item of a batch. Items that
+    come back in UnprocessedItems are resent with jittered exponential backoff.
+
+    `flush` waits until every queued item was written and `close`, also called when leaving a
+    `with` block, flushes and stops the threads. Both raise if a write failed; `put` raises once a
+    write failed so the producer stops early. Items still unprocessed after `max_retries` are kept
+    in `failed_items` and make `flush` and `close` raise `UnprocessedItemsError` until they are
+    queued again with `retry_failed` or dropped from `failed_items`.
+
+    Items are expected in the low-level attribute-value format (e.g. {'S': 'abc'}) unless
+    `serialize_items` is set, in which case plain Python items are converted.
+    """
+
+    def __init__(self, table_name: str, region: Optional[str] = None, workers: int = 2, flush_interval: float = 1.0,
+                 max_queue_size: int = 1000, max_retries: int = 8, serialize_items: bool = False, client=None):
+        self.table_name = table_name
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.client = client or get_client('dynamodb', region)
+        self.serializer = TypeSerializer() if serialize_items else None
+        self.written = 0
+        self.failed_items: List[Dict[str, Any]] = []
+        self._error: Optional[BaseException] = None
+        self._stats_lock = threading.Lock()
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, max_queue_size))
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._run, name=f"dynamodb-writer-{table_name}-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def put(self, item: Dict[str, Any]) -> None:
+        """Queue an item for writing."""
+        if self._closed:
+            raise RuntimeError(f"Batch writer of {self.table_name} is closed")
+        self._raise_if_failed()
+        if self.serializer is not None:
+            item = {key: self.serializer.serialize(_to_decimal(value)) for key, value in item.items()}
+        self._queue.put(item)
+
+    def put_many(self, items: List[Dict[str, Any]]) -> None:
+        for item in items:
+            self.put(item)
+
+    @property
+    def unprocessed(self) -> int:
+        return len(self.failed_items)
+
+    def retry_failed(self) -> None:
+        """Queue the items left unprocessed after the retries for writing again."""
+        if self._closed:
+            raise RuntimeError(f"Batch writer of {self.table_name} is closed")
+        with self._stats_lock:
+            items, self.failed_items = self.failed_items, []
+        for item in items:
+            self._queue.put(item)
+
+    def flush(self) -> None:
+        """Wait until every queued item has been written."""
+        self._queue.join()
+        self._raise_if_failed()
+        self._raise_if_unprocessed()
+
+    def close(self) -> None:
+        """Write the remaining items and stop the writer threads."""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+        logger.info(f"Batch writer of {self.table_name} closed: {self.written} items written, {self.unprocessed} unprocessed")
+        self._raise_if_failed()
+        self._raise_if_unprocessed()
+
+    def __enter__(self) -> 'DynamoDBBatchWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+            return
+        # Still write what was produced, without masking the original error
+        try:
+            self.close()
+        except Exception as e:
+            logger.error(f"Batch writer of {self.table_name} failed while closing: {e}")
+
+    def _raise_if_failed(self) -> None:
+        if self._error is not None:
+            raise RuntimeError(f"Batch write to {self.table_name} failed: {self._error}") from self._error
+
+    def _raise_if_unprocessed(self) -> None:
+        with self._stats_lock:
+            items = list(self.failed_items)
+        if items:
+            raise UnprocessedItemsError(self.table_name, items)
+
+    def _run(self) -> None:
+        batch: List[Dict[str, Any]] = []
+        deadline = 0.0
+        while True:
+            timeout = max(0.0, deadline - time.monotonic()) if batch else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self._send(batch)
+                batch = []
+                continue
+            if item is _STOP:
+                self._send(batch)
+                self._queue.task_done()
+                return
+            if not batch:
+                deadline = time.monotonic() + self.flush_interval
+            batch.append(item)
+            if len(batch) >= MAX_BATCH_ITEMS:
+                self._send(batch)
+                batch = []
+
+    def _send(self, batch: List[Dict[str, Any]]) -> None:
+        if not batch:
+            return
+        try:
+            if self._error is None:
+                self._write(batch)
+        except Exception as e:
+            logger.error(f"Error in batch write to {self.table_name}: {e}")
+            self._error = self._error or e
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        requests = [{'PutRequest': {'Item': item}} for item in batch]
+        attempt = 0
+        while True:
+            response = self.client.batch_write_item(RequestItems={self.table_name: requests})
+            remaining = response.get('UnprocessedItems', {}).get(self.table_name, [])
+            with self._stats_lock:
+                self.written += len(requests) - len(remaining)
+            if not remaining:
+                return
+            if attempt >= self.max_retries:
+                logger.warning(f"{len(remaining)} items remained unprocessed after {self.max_retries} retries")
+                with self._stats_lock:
+                    self.failed_items.extend(request['PutRequest']['Item'] for request in remaining)
+                return
+            time.sleep(jittered_backoff(attempt))
+            attempt += 1
+            requests = remaining
+
+
+def _to_decimal(value: Any) -> Any:
+    """Convert floats, which DynamoDB does not accept, to Decimal."""
+    if isinstance(value, float):
+        return Decimal(str(value))
+    if isinstance(value, list):
+        return [_to_decimal(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _to_decimal(v) for k, v in value.items()}
+    return value
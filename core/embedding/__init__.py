@@ -1,12 +1,12 @@
 from core.embedding.embedding_factory import EmbedderFactory  # Keep this for external usage.
+from core.embedding.embedding_engine import EmbeddingEngine
+from core.embedding.embedding_cache import EmbeddingCache, create_embedding_cache
 
 import core.embedding.bedrock.cohere_embedder
 import core.embedding.bedrock.titanv1_embedder
 import core.embedding.bedrock.titanv2_embedder
 
-# Importing SageMaker-specific embedder and embedding factory.
 from .embedding_factory import EmbedderFactory
-from .sagemaker import SageMakerEmbedder
 
 # List of model names that you want to register with the EmbedderFactory
 model_list = [
@@ -16,6 +16,7 @@ model_list = [
              ]
 
 # Registering each model from the list into the EmbedderFactory under 'sagemaker'.
-# The `SageMakerEmbedder` will be used for embedding operations for these models.
+# The `SageMakerEmbedder` will be used for embedding operations for these models. It is registered
+# by path so the SageMaker SDK is only imported when a SageMaker embedder is created.
 for model in model_list:
-    EmbedderFactory.register_embedder('sagemaker', model, SageMakerEmbedder)
\ No newline at end of file
+    EmbedderFactory.register_embedder('sagemaker', model, 'core.embedding.sagemaker.sagemaker_embedder:SageMakerEmbedder')
\ No newline at end of file
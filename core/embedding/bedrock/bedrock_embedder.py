@@ -1,10 +1,10 @@
-import boto3
 from typing import Dict, List, Tuple, Any
 from baseclasses.base_classes import BaseEmbedder
 from util.boto3_utils import BedRockRetryHander
 import json
 
 import logging
+from util.boto3_clients import get_client
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -13,34 +13,77 @@ logger.setLevel(logging.INFO)
 class BedrockEmbedder(BaseEmbedder):
     def __init__(self, model_id: str, region: str, role_arn: str = None) -> None:
         super().__init__(model_id)
-        self.client = boto3.client("bedrock-runtime", region_name=region)
+        self.client = get_client("bedrock-runtime", region_name=region)
 
     def prepare_payload(self, text: str, dimensions: int, normalize: bool) -> Dict:
         raise NotImplementedError("Subclasses must implement `prepare_payload`")
 
+    def prepare_batch_payload(self, texts: List[str], dimensions: int, normalize: bool) -> Dict:
+        raise NotImplementedError("Subclasses supporting multi-text payloads must implement `prepare_batch_payload`")
+
+    def _invoke(self, payload: Dict) -> Tuple[Dict[Any, Any], Dict]:
+        """Invoke the model once and return the token/latency metadata with the decoded model response."""
+        response = self.client.invoke_model(
+            modelId=self.model_id,
+            contentType="application/json",
+            accept="application/json",
+            body=json.dumps(payload)
+        )
+        model_response = json.loads(response["body"].read())
+        metadata = {}
+        if response and 'ResponseMetadata' in response and 'HTTPHeaders' in response['ResponseMetadata']:
+            input_tokens = response['ResponseMetadata']['HTTPHeaders']['x-amzn-bedrock-input-token-count']
+            latency = response['ResponseMetadata']['HTTPHeaders']['x-amzn-bedrock-invocation-latency']
+            metadata = {
+                'inputTokens': input_tokens,
+                'latencyMs': latency
+            }
+        return metadata, model_response
+
+    @BedRockRetryHander()
+    def _invoke_with_retry(self, payload: Dict) -> Tuple[Dict[Any, Any], Dict]:
+        """`_invoke` paced by the model's shared rate limiter and retried on throttles."""
+        return self._invoke(payload)
+
     @BedRockRetryHander()
     def embed(self, text: str, dimensions: int = 256, normalize: bool = True) -> Tuple[Dict[Any, Any], List[float]]:
         try:
             payload = self.prepare_payload(text, dimensions, normalize)
-            response = self.client.invoke_model(
-                modelId=self.model_id,
-                contentType="application/json",
-                accept="application/json",
-                body=json.dumps(payload)
-            )
-            model_response = json.loads(response["body"].read())
-            metadata = {}
-            if response and 'ResponseMetadata' in response and 'HTTPHeaders' in response['ResponseMetadata']:
-                input_tokens = response['ResponseMetadata']['HTTPHeaders']['x-amzn-bedrock-input-token-count']
-                latency = response['ResponseMetadata']['HTTPHeaders']['x-amzn-bedrock-invocation-latency']
-                metadata = {
-                    'inputTokens': input_tokens,
-                    'latencyMs': latency
-                }
+            metadata, model_response = self._invoke(payload)
             return metadata, self.extract_embedding(model_response)
         except Exception as e:
             logger.error(f"Error during embedding: {e}")
             raise
 
+    def embed_batch(self, texts: List[str], dimensions: int = 256, normalize: bool = True) -> Tuple[Dict[str, int], List[List[float]]]:
+        """
+        Embed a batch of texts in a single request when the model supports multi-text payloads.
+
+        Every request is paced by the model's rate limiter and retried on throttles on its own,
+        so a throttle in the per-text fallback does not re-send the texts already embedded.
+        """
+        if self.max_batch_size <= 1 or len(texts) == 1:
+            input_tokens = 0
+            latency = 0
+            embeddings = []
+            for text in texts:
+                metadata, model_response = self._invoke_with_retry(self.prepare_payload(text, dimensions, normalize))
+                input_tokens += int(metadata.get('inputTokens', 0))
+                latency += int(metadata.get('latencyMs', 0))
+                embeddings.append(self.extract_embedding(model_response))
+            return {'inputTokens': input_tokens, 'latencyMs': latency}, embeddings
+
+        metadata, model_response = self._invoke_with_retry(self.prepare_batch_payload(texts, dimensions, normalize))
+        embeddings = self.extract_embeddings(model_response)
+        if len(embeddings) != len(texts):
+            raise ValueError(f"Expected {len(texts)} embeddings from {self.model_id}, got {len(embeddings)}")
+        return {
+            'inputTokens': int(metadata.get('inputTokens', 0)),
+            'latencyMs': int(metadata.get('latencyMs', 0))
+        }, embeddings
+
     def extract_embedding(self, response: Dict) -> List[float]:
-        raise NotImplementedError("Subclasses must implement `extract_embedding`")
\ No newline at end of file
+        raise NotImplementedError("Subclasses must implement `extract_embedding`")
+
+    def extract_embeddings(self, response: Dict) -> List[List[float]]:
+        raise NotImplementedError("Subclasses supporting multi-text payloads must implement `extract_embeddings`")
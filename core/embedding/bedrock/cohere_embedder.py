@@ -10,11 +10,20 @@ logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 class CohereEmbedder(BedrockEmbedder):
+    # Cohere embed models accept up to 96 texts per request
+    max_batch_size = 96
+
     def prepare_payload(self, text: str, dimensions: int, normalize: bool) -> Dict:
         return {"texts": [text], "input_type": "search_document"}
 
+    def prepare_batch_payload(self, texts: List[str], dimensions: int, normalize: bool) -> Dict:
+        return {"texts": list(texts), "input_type": "search_document"}
+
     def extract_embedding(self, response: Dict) -> List[float]:
         return response["embeddings"][0]
 
+    def extract_embeddings(self, response: Dict) -> List[List[float]]:
+        return response["embeddings"]
+
 EmbedderFactory.register_embedder("bedrock", "cohere.embed-english-v3", CohereEmbedder)
 EmbedderFactory.register_embedder("bedrock", "cohere.embed-multilingual-v3", CohereEmbedder)
\ No newline at end of file
@@ -0,0 +1,265 @@
+import hashlib
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+import logging
+from array import array
+from typing import List, Optional, Sequence, Tuple
+
+from botocore.exceptions import ClientError
+from util.boto3_clients import get_client
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# SQLite caps the number of bound parameters per statement
+_SQL_BATCH_SIZE = 500
+
+# Attempts to publish the merged database before giving up until the next persist
+_S3_SYNC_ATTEMPTS = 5
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache for one (model, dimensions, normalize) namespace.
+
+    Embeddings are stored as float32 blobs in a local SQLite database keyed on the
+    SHA-256 of the text. When an S3 location is given, the S3 copy is merged into the
+    local database on start-up and the result is pushed back by `persist`, so experiments running in separate tasks
+    share it. Tasks of one execution persist concurrently, so `persist` first merges
+    the current S3 copy into the local database and uploads the union with a
+    conditional put on the ETag it merged; if another task uploaded in between, the
+    merge is redone. The database is kept under `max_bytes` by evicting the least
+    recently used entries before it is persisted.
+    """
+
+    def __init__(self, model_id: str, dimensions: int, normalize: bool, cache_dir: str,
+                 max_bytes: int = 2 * 1024 ** 3, s3_bucket: Optional[str] = None, s3_prefix: Optional[str] = None):
+        self.model_id = model_id
+        self.dimensions = int(dimensions)
+        self.normalize = bool(normalize)
+        self.max_bytes = max_bytes
+        self.namespace = re.sub(r'[^A-Za-z0-9._-]', '_', f"{model_id}_{self.dimensions}_{'norm' if self.normalize else 'raw'}")
+        self.path = os.path.join(cache_dir, f"{self.namespace}.sqlite")
+        self.s3_bucket = s3_bucket
+        self.s3_key = f"{s3_prefix.strip('/')}/{self.namespace}.sqlite" if s3_bucket and s3_prefix else None
+        self.hits = 0
+        self.misses = 0
+        self._remote_etag: Optional[str] = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "text_hash TEXT PRIMARY KEY, vector BLOB NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.commit()
+        if self.s3_key:
+            self._download_from_s3()
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Return the cached embedding for each text, or None where it is not cached."""
+        hashes = [self.text_hash(text) for text in texts]
+        found = {}
+        with self._lock:
+            for start in range(0, len(hashes), _SQL_BATCH_SIZE):
+                chunk = list(set(hashes[start:start + _SQL_BATCH_SIZE]))
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE text_hash IN ({placeholders})", chunk
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE embeddings SET last_access = ? WHERE text_hash = ?",
+                                       [(now, text_hash) for text_hash in found])
+                self._conn.commit()
+
+        results = [self._decode(found[text_hash]) if text_hash in found else None for text_hash in hashes]
+        hit_count = sum(1 for result in results if result is not None)
+        self.hits += hit_count
+        self.misses += len(results) - hit_count
+        return results
+
+    def put_many(self, texts: Sequence[str], embeddings: Sequence[List[float]]) -> None:
+        """Store embeddings for the given texts."""
+        now = time.time()
+        rows = [(self.text_hash(text), self._encode(embedding), now) for text, embedding in zip(texts, embeddings)]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings (text_hash, vector, last_access) VALUES (?, ?, ?)", rows)
+            self._conn.commit()
+            self._dirty = True
+
+    def get(self, text: str) -> Optional[List[float]]:
+        return self.get_many([text])[0]
+
+    def put(self, text: str, embedding: List[float]) -> None:
+        self.put_many([text], [embedding])
+
+    def persist(self) -> None:
+        """Evict down to the size bound and push the database to S3 if it changed."""
+        with self._lock:
+            logger.info(f"Embedding cache {self.namespace}: {self.hits} hits, {self.misses} misses")
+            if not self._dirty:
+                return
+            if self.s3_key:
+                self._sync_to_s3()
+            else:
+                self._evict()
+            self._dirty = False
+
+    def close(self) -> None:
+        self.persist()
+        with self._lock:
+            self._conn.close()
+
+    def _evict(self) -> None:
+        size = self._size_bytes()
+        if size <= self.max_bytes:
+            return
+        total_rows = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        # Evict down to 80% of the bound so that every persist does not have to evict again
+        keep_rows = int(total_rows * (0.8 * self.max_bytes) / size)
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE text_hash IN "
+            "(SELECT text_hash FROM embeddings ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (keep_rows,)
+        )
+        self._conn.commit()
+        self._conn.execute("VACUUM")
+        logger.info(f"Embedding cache {self.namespace}: evicted {total_rows - keep_rows} entries, {self._size_bytes()} bytes on disk")
+
+    def _size_bytes(self) -> int:
+        page_count = self._conn.execute("PRAGMA page_count").fetchone()[0]
+        page_size = self._conn.execute("PRAGMA page_size").fetchone()[0]
+        return page_count * page_size
+
+    def _download_from_s3(self) -> None:
+        """Merge the S3 copy into the local database, which is never overwritten, like `_sync_to_s3` does."""
+        remote_path = f"{self.path}.remote"
+        try:
+            remote_etag, downloaded = self._fetch_remote(remote_path)
+            if downloaded:
+                merged = self._merge(remote_path)
+                logger.info(f"Loaded {merged} embedding cache entries from s3://{self.s3_bucket}/{self.s3_key}")
+            self._remote_etag = remote_etag
+        except (ClientError, sqlite3.DatabaseError) as e:
+            logger.warning(f"Could not load embedding cache from S3, starting with the local cache: {e}")
+        finally:
+            if os.path.exists(remote_path):
+                os.remove(remote_path)
+
+    def _fetch_remote(self, path: str, known_etag: Optional[str] = None) -> Tuple[Optional[str], bool]:
+        """
+        Download the S3 copy to `path` unless its ETag is `known_etag`.
+
+        Returns the ETag of the S3 copy, None when there is none yet, and whether it was downloaded.
+        """
+        request = {'IfNoneMatch': known_etag} if known_etag else {}
+        try:
+            response = get_client('s3').get_object(Bucket=self.s3_bucket, Key=self.s3_key, **request)
+        except ClientError as e:
+            code = e.response['Error']['Code']
+            if code in ('304', 'NotModified'):
+                return known_etag, False
+            if code in ('404', 'NoSuchKey'):
+                return None, False
+            raise
+        # A journal left by an interrupted run would be replayed onto the downloaded database
+        for journal in (f"{path}-wal", f"{path}-shm"):
+            if os.path.exists(journal):
+                os.remove(journal)
+        with open(path, 'wb') as f:
+            for chunk in response['Body'].iter_chunks(1024 * 1024):
+                f.write(chunk)
+        return response['ETag'], True
+
+    def _sync_to_s3(self) -> None:
+        """Merge the S3 copy into the local database and upload the result if nobody uploaded meanwhile."""
+        remote_path = f"{self.path}.remote"
+        try:
+            for attempt in range(_S3_SYNC_ATTEMPTS):
+                remote_etag, downloaded = self._fetch_remote(remote_path, known_etag=self._remote_etag)
+                if downloaded:
+                    merged = self._merge(remote_path)
+                    logger.info(f"Embedding cache {self.namespace}: merged {merged} entries from s3://{self.s3_bucket}/{self.s3_key}")
+                self._evict()
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                try:
+                    self._remote_etag = self._put_if_unchanged(remote_etag)
+                    logger.info(f"Persisted embedding cache to s3://{self.s3_bucket}/{self.s3_key}")
+                    return
+                except ClientError as e:
+                    if e.response['Error']['Code'] not in ('PreconditionFailed', 'ConditionalRequestConflict', '409', '412'):
+                        raise
+                    logger.info(f"Embedding cache {self.namespace} was updated by another task, merging again")
+                    time.sleep(random.uniform(0, 0.5 * 2 ** attempt))
+            logger.warning(f"Could not persist embedding cache to S3 after {_S3_SYNC_ATTEMPTS} attempts, it kept changing")
+        except ClientError as e:
+            logger.warning(f"Could not persist embedding cache to S3: {e}")
+        finally:
+            if os.path.exists(remote_path):
+                os.remove(remote_path)
+
+    def _merge(self, remote_path: str) -> int:
+        """Add the entries of another cache database, keeping the latest access time of entries in both."""
+        before = self._conn.total_changes
+        self._conn.execute("ATTACH DATABASE ? AS remote", (remote_path,))
+        try:
+            self._conn.execute(
+                "INSERT INTO embeddings (text_hash, vector, last_access) "
+                "SELECT text_hash, vector, last_access FROM remote.embeddings WHERE true "
+                "ON CONFLICT(text_hash) DO UPDATE SET last_access = max(last_access, excluded.last_access)"
+            )
+            self._conn.commit()
+        finally:
+            self._conn.execute("DETACH DATABASE remote")
+        return self._conn.total_changes - before
+
+    def _put_if_unchanged(self, remote_etag: Optional[str]) -> str:
+        """Upload the database only if the S3 copy is still the one that was merged, returning the new ETag."""
+        condition = {'IfMatch': remote_etag} if remote_etag else {'IfNoneMatch': '*'}
+        with open(self.path, 'rb') as body:
+            response = get_client('s3').put_object(Bucket=self.s3_bucket, Key=self.s3_key, Body=body, **condition)
+        return response['ETag']
+
+    @staticmethod
+    def _encode(embedding: List[float]) -> bytes:
+        return array('f', embedding).tobytes()
+
+    @staticmethod
+    def _decode(blob: bytes) -> List[float]:
+        vector = array('f')
+        vector.frombytes(blob)
+        return vector.tolist()
+
+
+def create_embedding_cache(config, model_id: str, dimensions: int, normalize: bool) -> Optional[EmbeddingCache]:
+    """Build the embedding cache described by `config`, or None when caching is disabled."""
+    if not config.embedding_cache_enabled:
+        return None
+    try:
+        return EmbeddingCache(
+            model_id=model_id,
+            dimensions=dimensions,
+            normalize=normalize,
+            cache_dir=config.embedding_cache_dir,
+            max_bytes=config.embedding_cache_max_mb * 1024 * 1024,
+            s3_bucket=config.s3_bucket if config.embedding_cache_s3_prefix else None,
+            s3_prefix=config.embedding_cache_s3_prefix or None
+        )
+    except (sqlite3.Error, OSError) as e:
+        logger.warning(f"Embedding cache unavailable, embedding without it: {e}")
+        return None
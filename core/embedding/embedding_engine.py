@@ -0,0 +1,192 @@
+import threading
+import logging
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple, Any, Optional, TypeVar
+
+import botocore
+
+from baseclasses.base_classes import BaseEmbedder
+from util.boto3_utils import BedRockRetryHander, SageMakerRetryHandler
+from core.embedding.embedding_cache import EmbeddingCache
+from util.stream_utils import batched
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+T = TypeVar("T")
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Bounds the number of in-flight embedding requests.
+
+    The limit is halved on every throttle and grows back by one after a full
+    window of successful requests (AIMD), so the pool settles just under the
+    account's quota instead of hammering it.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = self.max_limit
+        self._in_flight = 0
+        self._successes = 0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._condition:
+            while self._in_flight >= self.limit:
+                self._condition.wait()
+            self._in_flight += 1
+
+    def release(self, throttled: bool = False) -> None:
+        with self._condition:
+            self._in_flight -= 1
+            if throttled:
+                new_limit = max(self.min_limit, self.limit // 2)
+                if new_limit != self.limit:
+                    logger.info(f"Throttled, reducing embedding concurrency from {self.limit} to {new_limit}")
+                self.limit = new_limit
+                self._successes = 0
+            else:
+                self._successes += 1
+                if self._successes >= self.limit and self.limit < self.max_limit:
+                    self.limit += 1
+                    self._successes = 0
+            self._condition.notify_all()
+
+
+class EmbeddingEngine:
+    """
+    Embeds texts in batches across a bounded worker pool.
+
+    Batches use the embedder's multi-text payload when the model supports it
+    (`max_batch_size` > 1). Results are returned in input order and every
+    batch's token total is logged and kept in `batch_stats`. When a cache is
+    given, only texts missing from it are sent to the model.
+    """
+
+    def __init__(self, embedder: BaseEmbedder, max_workers: int = 8, batch_size: Optional[int] = None,
+                 cache: Optional[EmbeddingCache] = None):
+        self.embedder = embedder
+        self.cache = cache
+        self.max_workers = max(1, max_workers)
+        self.batch_size = max(1, batch_size or embedder.max_batch_size)
+        self.retryable_errors = BedRockRetryHander().retryable_errors | SageMakerRetryHandler().retryable_errors
+        self.limiter = AdaptiveConcurrencyLimiter(self.max_workers)
+        self.batch_stats: List[Dict[str, Any]] = []
+        self._stats_lock = threading.Lock()
+
+    def embed(self, texts: List[str], dimensions: int, normalize: bool = True) -> List[Tuple[Dict[str, int], List[float]]]:
+        """
+        Embed all texts and return (metadata, embedding) tuples aligned with the input.
+
+        The batch token total is apportioned across the batch's texts by length,
+        so summing `inputTokens` over the results gives the exact total.
+        """
+        return [(metadata, embedding) for _, metadata, embedding in self.embed_stream(texts, dimensions, normalize)]
+
+    def embed_stream(self, items: Iterable[T], dimensions: int, normalize: bool = True,
+                     text_of: Optional[Callable[[T], str]] = None,
+                     max_pending_batches: Optional[int] = None) -> Iterator[Tuple[T, Dict[str, int], List[float]]]:
+        """
+        Lazily embed `items` and yield (item, metadata, embedding) tuples in input order.
+
+        Items are pulled from the iterable only as batches are submitted, and at most
+        `max_pending_batches` (default twice the worker count) are in flight, so memory
+        stays bounded for arbitrarily long inputs. `text_of` selects the text to embed
+        from each item and defaults to the item itself.
+        """
+        text_of = text_of or (lambda item: item)
+        max_pending = max(1, max_pending_batches or self.max_workers * 2)
+        pending = deque()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            try:
+                for batch_no, batch_items in enumerate(batched(items, self.batch_size)):
+                    texts = [text_of(item) for item in batch_items]
+                    future = executor.submit(self._embed_cached_batch, batch_no, texts, dimensions, normalize)
+                    pending.append((batch_items, texts, future))
+                    while len(pending) >= max_pending:
+                        yield from self._drain(*pending.popleft())
+                while pending:
+                    yield from self._drain(*pending.popleft())
+            finally:
+                for _, _, future in pending:
+                    future.cancel()
+
+    def _drain(self, batch_items: List[T], texts: List[str], future: Future) -> Iterator[Tuple[T, Dict[str, int], List[float]]]:
+        for item, (metadata, embedding) in zip(batch_items, self._split_batch_result(texts, *future.result())):
+            yield item, metadata, embedding
+
+    def _embed_cached_batch(self, batch_no: int, batch: List[str], dimensions: int, normalize: bool) -> Tuple[Dict[str, int], List[List[float]]]:
+        """Serve what the cache holds and embed only the remaining texts of the batch."""
+        if self.cache is None:
+            return self._embed_batch(batch_no, batch, dimensions, normalize)
+
+        embeddings = self.cache.get_many(batch)
+        missing = [idx for idx, embedding in enumerate(embeddings) if embedding is None]
+        if not missing:
+            self._record_batch(batch_no, len(batch), {'inputTokens': 0, 'latencyMs': 0})
+            return {'inputTokens': 0, 'latencyMs': 0}, embeddings
+
+        missing_texts = [batch[idx] for idx in missing]
+        metadata, new_embeddings = self._embed_batch(batch_no, missing_texts, dimensions, normalize)
+        self.cache.put_many(missing_texts, new_embeddings)
+        for idx, embedding in zip(missing, new_embeddings):
+            embeddings[idx] = embedding
+        return metadata, embeddings
+
+    def _embed_batch(self, batch_no: int, batch: List[str], dimensions: int, normalize: bool) -> Tuple[Dict[str, int], List[List[float]]]:
+        """
+        Embed one batch within the concurrency limit.
+
+        Pacing and throttle retries belong to the embedder's retry handler; a throttle that
+        outlasts them shrinks the concurrency limit before it is raised.
+        """
+        self.limiter.acquire()
+        throttled = False
+        try:
+            metadata, embeddings = self.embedder.embed_batch(batch, dimensions=dimensions, normalize=normalize)
+        except botocore.exceptions.ClientError as e:
+            throttled = e.response['Error']['Code'] in self.retryable_errors
+            if throttled:
+                logger.error(f"Embedding batch {batch_no + 1} still throttled after the embedder's retries")
+            raise
+        finally:
+            self.limiter.release(throttled)
+        self._record_batch(batch_no, len(batch), metadata)
+        return metadata, embeddings
+
+    def _record_batch(self, batch_no: int, batch_len: int, metadata: Dict[str, int]) -> None:
+        input_tokens = int(metadata.get('inputTokens', 0))
+        logger.info(f"Embedded batch {batch_no + 1} ({batch_len} texts): {input_tokens} input tokens, {metadata.get('latencyMs', 0)} ms")
+        with self._stats_lock:
+            self.batch_stats.append({
+                'batch': batch_no,
+                'texts': batch_len,
+                'inputTokens': input_tokens,
+                'latencyMs': int(metadata.get('latencyMs', 0))
+            })
+
+    @staticmethod
+    def _split_batch_result(batch: List[str], metadata: Dict[str, int], embeddings: List[List[float]]) -> List[Tuple[Dict[str, int], List[float]]]:
+        """Turn one batch response into per-text (metadata, embedding) tuples."""
+        if len(batch) == 1:
+            return [(metadata, embeddings[0])]
+
+        total_tokens = int(metadata.get('inputTokens', 0))
+        latency = int(metadata.get('latencyMs', 0))
+        total_chars = sum(len(text) for text in batch) or 1
+
+        items = []
+        assigned = 0
+        for idx, (text, embedding) in enumerate(zip(batch, embeddings)):
+            if idx == len(batch) - 1:
+                tokens = total_tokens - assigned
+            else:
+                tokens = total_tokens * len(text) // total_chars
+            assigned += tokens
+            items.append(({'inputTokens': tokens, 'latencyMs': latency}, embedding))
+        return items
@@ -2,9 +2,10 @@ from config.experimental_config import ExperimentalConfig
 
 import logging
 
-from typing import Type, Dict
+from typing import Type, Dict, Union
 from baseclasses.base_classes import BaseEmbedder
 from config.config import get_config
+from util.lazy_import import load_class
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -12,10 +13,11 @@ logger.setLevel(logging.INFO)
 class EmbedderFactory:
     """Factory to create embedders based on model ID and service type."""
 
-    _registry: Dict[str, Type[BaseEmbedder]] = {}
+    _registry: Dict[str, Union[Type[BaseEmbedder], str]] = {}
 
     @classmethod
-    def register_embedder(cls, service_type: str, model_id: str, embedder_cls: Type[BaseEmbedder]):
+    def register_embedder(cls, service_type: str, model_id: str, embedder_cls: Union[Type[BaseEmbedder], str]):
+        """Register an embedder class, or its "module:ClassName" path to import it on first use."""
         key = f"{service_type}:{model_id}"
         cls._registry[key] = embedder_cls
 
@@ -33,6 +35,7 @@ class EmbedderFactory:
         embedder_cls = cls._registry.get(key)
         if not embedder_cls:
             raise ValueError(f"No embedder registered for service {service_type} and model {model_id}")
+        embedder_cls = cls._registry[key] = load_class(embedder_cls)
         
         return embedder_cls(model_id, experimentalConfig.aws_region, role_arn)
 
@@ -1,5 +1,4 @@
-import boto3
-from typing import Dict, List
+from typing import Dict, List, Tuple, Union
 from botocore.exceptions import ClientError
 from baseclasses.base_classes import BaseEmbedder
 from sagemaker.session import Session
@@ -13,6 +12,8 @@ import logging
 import numpy as np
 import json
 import time
+from util.boto3_clients import get_client, get_session
+from util.boto3_utils import SageMakerRetryHandler
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -24,21 +25,24 @@ EMBEDDING_MODELS = {
         "model_source": "jumpstart",
         "dimension": 1024,
         "instance_type": "ml.g5.2xlarge",
-        "input_key": "text_inputs"
+        "input_key": "text_inputs",
+        "max_batch_size": 32
     },
     "huggingface-sentencesimilarity-bge-m3": {
         "model_name": "bge-m3",
         "model_source": "jumpstart",
         "dimension": 1024,
         "instance_type": "ml.g5.2xlarge",
-        "input_key": "text_inputs"
+        "input_key": "text_inputs",
+        "max_batch_size": 32
     },
     "huggingface-textembedding-gte-qwen2-7b-instruct": {
         "model_name": "qwen",
         "model_source": "jumpstart",
         "dimension": 3584,
         "instance_type": "ml.g5.2xlarge",
-        "input_key": "inputs"
+        "input_key": "inputs",
+        "max_batch_size": 1
     }
 }
 
@@ -64,11 +68,11 @@ class SageMakerEmbedder(BaseEmbedder):
         self.role = role_arn
         
         # Initialize the SageMaker runtime and client for general operations
-        self.client = boto3.client("sagemaker-runtime", region_name=region)
-        self.sagemaker_client = boto3.client('sagemaker', region_name=region)
+        self.client = get_client("sagemaker-runtime", region_name=region)
+        self.sagemaker_client = get_client('sagemaker', region_name=region)
         
         # Create a new SageMaker session
-        self.session = Session(boto_session=boto3.Session(region_name=region))
+        self.session = Session(boto_session=get_session(region_name=region))
         
         # Initialize additional embedding-related attributes
         self.embedding_model_id = model_id
@@ -76,6 +80,9 @@ class SageMakerEmbedder(BaseEmbedder):
         self.embedding_model_endpoint_name = f"{self._sanitize_name(model_id)[:44]}-embedding-endpoint"
         
         self.embedding_dimension = EMBEDDING_MODELS.get(model_id, {}).get('dimension', 1024)
+
+        # Models taking a `text_inputs` list can embed several texts per request
+        self.max_batch_size = EMBEDDING_MODELS.get(model_id, {}).get('max_batch_size', 1)
         
         self.wait_time = 5
         
@@ -201,7 +208,7 @@ class SageMakerEmbedder(BaseEmbedder):
             raise ValueError(f"Unsupported model ID: {model_id}")
 
         # Create AWS and SageMaker sessions for API interactions
-        boto_session = boto3.Session(region_name=self.region_name)
+        boto_session = get_session(region_name=self.region_name)
         sagemaker_session = sagemaker.Session(boto_session=boto_session)
 
         # Look up the appropriate instance type from model configurations
@@ -320,6 +327,11 @@ class SageMakerEmbedder(BaseEmbedder):
         else:
             logger.error(f"Model ID {model_id} is not recognized as an embedding model.")
 
+    @SageMakerRetryHandler()
+    def _predict(self, input_data: Dict):
+        """Invoke the embedding endpoint, retrying on throttles."""
+        return self.embedding_predictor.predict(input_data)
+
     def embed(self, text: str, dimensions: int = 256, normalize: bool = True) -> List[float]:
         """
         Retrieves the embedding for the given input text from the model's predictor.
@@ -363,7 +375,7 @@ class SageMakerEmbedder(BaseEmbedder):
             start_time = time.time()
             
             # Make the prediction request
-            response = self.embedding_predictor.predict(input_data)
+            response = self._predict(input_data)
 
             # Calculate latency metrics
             latency = int((time.time() - start_time) * 1000)
@@ -380,20 +392,7 @@ class SageMakerEmbedder(BaseEmbedder):
             else:
                 embedding = np.array(response[0] if isinstance(response, list) else response)
 
-            # Flatten the embedding to ensure it's a 1D array
-            embedding = embedding.flatten()
-
-            # Normalize the embedding to unit length
-            embedding = embedding / np.linalg.norm(embedding)
-
-            # Check if the embedding dimension matches the expected value (1024)
-            if len(embedding) != self.embedding_dimension:
-                logger.warning(f"Embedding dimension mismatch. Expected 1024, got {len(embedding)}")
-                # Adjust the dimension by truncating or padding
-                if len(embedding) > self.embedding_dimension:
-                    embedding = embedding[:self.embedding_dimension]
-                else:
-                    embedding = np.pad(embedding, (0, self.embedding_dimension - len(embedding)))
+            embedding = self._postprocess_embedding(embedding)
 
             metadata = {
                     'inputTokens': input_tokens,
@@ -420,15 +419,71 @@ class SageMakerEmbedder(BaseEmbedder):
             # Re-raise the exception after logging
             raise
     
+    def embed_batch(self, texts: List[str], dimensions: int = 256, normalize: bool = True) -> Tuple[Dict[str, int], List[List[float]]]:
+        """
+        Retrieves embeddings for a batch of texts with a single request when the model accepts a `text_inputs` list.
+
+        Args:
+            texts (List[str]): The input texts, all non-empty.
+
+        Returns:
+            Tuple[Dict[str, int], List[List[float]]]: Batch metadata and one embedding per text, in input order.
+        """
+        if self.max_batch_size <= 1 or len(texts) == 1:
+            return super().embed_batch(texts, dimensions, normalize)
+
+        if not self.predictor:
+            raise ValueError("Embedding predictor not initialized")
+        if any(not text or not text.strip() for text in texts):
+            raise ValueError("Input text cannot be empty")
+
+        input_data = self.prepare_payload(texts)
+        # SageMaker does not provide input tokens as metadata, approximate ~4 characters per token.
+        input_tokens = sum(len(text) // 4 for text in texts)
+
+        start_time = time.time()
+        response = self._predict(input_data)
+        latency = int((time.time() - start_time) * 1000)
+
+        if isinstance(response, (bytes, bytearray)):
+            response = json.loads(response.decode('utf-8'))
+        elif isinstance(response, str):
+            response = json.loads(response)
+
+        vectors = response['embedding'] if isinstance(response, dict) and 'embedding' in response else response
+        if not isinstance(vectors, list) or len(vectors) != len(texts):
+            raise ValueError(f"Expected {len(texts)} embeddings from {self.embedding_model_id}, got {type(vectors)}")
+
+        embeddings = [self._postprocess_embedding(np.array(vector)).tolist() for vector in vectors]
+        return {'inputTokens': input_tokens, 'latencyMs': latency}, embeddings
+
+    def _postprocess_embedding(self, embedding: np.ndarray) -> np.ndarray:
+        """Flatten, normalize to unit length and fit the embedding to the model dimension."""
+        # Flatten the embedding to ensure it's a 1D array
+        embedding = embedding.flatten()
+
+        # Normalize the embedding to unit length
+        embedding = embedding / np.linalg.norm(embedding)
+
+        # Check if the embedding dimension matches the expected value (1024)
+        if len(embedding) != self.embedding_dimension:
+            logger.warning(f"Embedding dimension mismatch. Expected 1024, got {len(embedding)}")
+            # Adjust the dimension by truncating or padding
+            if len(embedding) > self.embedding_dimension:
+                embedding = embedding[:self.embedding_dimension]
+            else:
+                embedding = np.pad(embedding, (0, self.embedding_dimension - len(embedding)))
+        return embedding
+
     def prepare_payload1(self, text: str, dimensions: int, normalize: bool) -> Dict:
         raise NotImplementedError("Subclasses must implement `prepare_payload`")
     
-    def prepare_payload(self, text: str) -> Dict:
+    def prepare_payload(self, text: Union[str, List[str]]) -> Dict:
         """
         Prepares the payload for the embedding model based on the provided text.
 
         Args:
-            text (str): The input text to be processed by the model.
+            text (Union[str, List[str]]): The input text, or a batch of texts, to be processed by the model.
 
         Raises:
             ValueError: If the embedding model ID is unknown.
@@ -447,7 +502,7 @@ class SageMakerEmbedder(BaseEmbedder):
         
         # Build the payload with the input text
         payload = {
-            input_key: [text]
+            input_key: list(text) if isinstance(text, list) else [text]
         }
         
         # Add mode only for models that need it
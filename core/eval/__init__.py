@@ -1,3 +1,5 @@
 from .eval_factory import EvalFactory
-from .ragas.ragas_non_llm_eval import RagasNonLLMEvaluator
-from .ragas.ragas_llm_eval import RagasLLMEvaluator
\ No newline at end of file
+
+# RAGAS evaluators are imported when an evaluator is created, so importing the factory stays light
+EvalFactory.register_evaluator('ragas', 'non_llm', 'core.eval.ragas.ragas_non_llm_eval:RagasNonLLMEvaluator')
+EvalFactory.register_evaluator('ragas', 'llm', 'core.eval.ragas.ragas_llm_eval:RagasLLMEvaluator')
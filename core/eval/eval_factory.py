@@ -1,7 +1,8 @@
 from baseclasses.base_classes import BaseEvaluator
 from config.experimental_config import ExperimentalConfig
 from config.config import Config
-from typing import Dict, Type
+from typing import Dict, Type, Union
+from util.lazy_import import load_class
 
 import logging
 
@@ -15,10 +16,11 @@ class EvaluatorServiceError(Exception):
 
 class EvalFactory:
 
-    _registry: Dict[str, Type[BaseEvaluator]] = {}
+    _registry: Dict[str, Union[Type[BaseEvaluator], str]] = {}
 
     @classmethod
-    def register_evaluator(cls, service_type: str, eval_type: str, evaluator_cls: Type[BaseEvaluator]):
+    def register_evaluator(cls, service_type: str, eval_type: str, evaluator_cls: Union[Type[BaseEvaluator], str]):
+        """Register an evaluator class, or its "module:ClassName" path to import it on first use."""
         key = f"{service_type}:{eval_type}"
         cls._registry[key] = evaluator_cls
 
@@ -34,5 +36,6 @@ class EvalFactory:
         evaluator_cls = cls._registry.get(key)
         if not evaluator_cls:
             raise EvaluatorServiceError(f"No evaluator_cls registered for service {eval_service_type} and type {eval_type}")
+        evaluator_cls = cls._registry[key] = load_class(evaluator_cls)
         
         return evaluator_cls(config=config, experimental_config=experimentalConfig)
@@ -1,7 +1,10 @@
-from baseclasses.base_classes import BaseEvaluator, EvaluationMetrics
+from abc import abstractmethod
+from baseclasses.base_classes import BaseEvaluator, EvaluationMetrics, ExperimentQuestionMetrics
 from core.dynamodb import DynamoDBOperations
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional
 import json
+import math
 import numpy as np
 
 import logging
@@ -9,6 +12,15 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 class RagasEvaluator(BaseEvaluator):
+    """
+    Base of the RAGAS evaluators.
+
+    `evaluate` scores the questions of an experiment in batches of `eval_batch_size`. After each
+    batch the per-question `eval_metrics` are set with concurrent UpdateItem calls and the progress
+    is recorded on the experiment. With `eval_resume`, a retry of a failed run resumes with the questions that have no
+    metrics from the same `eval_run_id` yet; otherwise every question is scored again.
+    Subclasses score one batch in `evaluate_batch`.
+    """
 
     def __init__(self, config, experimental_config):
         super().__init__(config, experimental_config)
@@ -24,16 +36,106 @@ class RagasEvaluator(BaseEvaluator):
             region=self.config.aws_region,
             table_name=self.config.experiment_table
         )
-    
+
     def get_all_questions(self, experiment_id: str) -> List[Dict]:
         """Fetch all questions for a given experiment"""
         expression_values = {":experimentId": experiment_id}
-        return self.metrics_db.query(
+        return self.metrics_db.query_all(
             "experiment_id = :experimentId",
             expression_values=expression_values,
             index_name=self.config.experiment_question_metrics_experimentid_index
         )
-    
+
+    def evaluate(self, experiment_id: str):
+        """Perform evaluation for all questions in an experiment"""
+        if not experiment_id:
+            raise ValueError("Experiment ID cannot be None")
+
+        questions = self.get_all_questions(experiment_id)
+        pending = questions
+        run_id = self.config.eval_run_id
+        if self.config.eval_resume:
+            # With a run id, only the metrics stored by an earlier attempt of the same run are kept
+            pending = [question for question in questions
+                       if not question.get('eval_metrics') or (run_id and question.get('eval_run_id') != run_id)]
+            if len(pending) < len(questions):
+                logger.info(f"Experiment {experiment_id}: resuming evaluation, {len(questions) - len(pending)} of {len(questions)} questions already evaluated")
+
+        batch_size = max(1, self.config.eval_batch_size)
+        evaluated = len(questions) - len(pending)
+        # The questions were read from an eventually consistent index, so only the metric attributes are written back
+        with ThreadPoolExecutor(max_workers=max(1, self.config.dynamodb_writer_threads)) as executor:
+            for start in range(0, len(pending), batch_size):
+                batch = pending[start:start + batch_size]
+                records = [ExperimentQuestionMetrics(**question) for question in batch]
+                updates = []
+                for question, metrics in zip(batch, self.evaluate_batch(records)):
+                    if metrics:
+                        question['eval_metrics'] = {'M': metrics.to_dict()}
+                        updates.append(executor.submit(self._store_question_metrics, question['id'], question['eval_metrics'], run_id))
+
+                # Checkpoint: the metrics of this batch are stored before the next one starts
+                for update in updates:
+                    update.result()
+                evaluated += len(batch)
+                self._record_progress(experiment_id, evaluated, len(questions))
+
+        self.update_experiment_metrics(experiment_id, self._experiment_metrics(questions))
+
+    @abstractmethod
+    def evaluate_batch(self, metrics_records: List[ExperimentQuestionMetrics]) -> List[Optional[EvaluationMetrics]]:
+        """Score a batch of questions, returning their metrics in order, None for a question that could not be scored"""
+        pass
+
+    def _store_question_metrics(self, question_id: str, eval_metrics: Dict, run_id: str):
+        """Set the metrics of one question, and the run that scored it when there is a run id"""
+        update_expression = "SET eval_metrics = :eval"
+        expression_values = {':eval': eval_metrics}
+        if run_id:
+            update_expression += ", eval_run_id = :run_id"
+            expression_values[':run_id'] = run_id
+        self.metrics_db.update_item(
+            key={'id': question_id},
+            update_expression=update_expression,
+            expression_values=expression_values
+        )
+
+    def _record_progress(self, experiment_id: str, evaluated: int, total: int):
+        logger.info(f"Experiment {experiment_id}: evaluated {evaluated} of {total} questions")
+        try:
+            self.experiment_db.update_item(
+                key={'id': experiment_id},
+                update_expression="SET eval_progress = :progress",
+                expression_values={':progress': {'evaluated': evaluated, 'total': total}}
+            )
+        except Exception as e:
+            logger.error(f"Error recording evaluation progress: {e}")
+
+    @staticmethod
+    def _experiment_metrics(questions: List[Dict]) -> Dict[str, str]:
+        """Average each metric over the questions that have a score for it, rounded to 2 decimals"""
+        scores: Dict[str, List[float]] = {}
+        for question in questions:
+            for key, value in question.get('eval_metrics', {}).get('M', {}).items():
+                try:
+                    score = float(value)
+                except (TypeError, ValueError):
+                    continue
+                if not math.isnan(score):
+                    scores.setdefault(key, []).append(score)
+        if not scores:
+            return {}
+        averages = {key: round(sum(values) / len(values), 2) for key, values in scores.items()}
+        return EvaluationMetrics(
+            faithfulness_score=averages.get('faithfulness_score', 0.0),
+            context_precision_score=averages.get('context_precision_score', 0.0),
+            aspect_critic_score=averages.get('aspect_critic_score', 0.0),
+            answers_relevancy_score=averages.get('answers_relevancy_score', 0.0),
+            string_similarity=averages.get('string_similarity_score', 0.0),
+            context_recall=averages.get('context_recall_score', 0.0),
+            rouge_score=averages.get('rouge_score', 0.0)
+        ).to_dict()
+
     def update_experiment_metrics(self, experiment_id: str, experiment_eval_metrics: Dict[str, float]):
         """Update overall experiment metrics"""
         try:
@@ -46,7 +148,7 @@ class RagasEvaluator(BaseEvaluator):
                 )
         except Exception as e:
             logger.error(f"Error updating experiment metrics: {e}")
-    
+
     def calculate_eval_score(self,evaluator,data):
         try:
             score=evaluator.single_turn_score(data)
@@ -55,4 +157,4 @@ class RagasEvaluator(BaseEvaluator):
             logger.error(f"Error processing sample : {e}")
             return 0.0
 
-    
\ No newline at end of file
+
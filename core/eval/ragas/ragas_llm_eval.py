@@ -1,5 +1,5 @@
 from core.eval.ragas.ragas_eval import RagasEvaluator
-from ragas import evaluate
+from ragas import evaluate, RunConfig
 from ragas.dataset_schema import SingleTurnSample, EvaluationDataset
 from ragas.metrics._string import NonLLMStringSimilarity
 from ragas.metrics import Faithfulness, AspectCritic, LLMContextPrecisionWithoutReference, ResponseRelevancy, LLMContextPrecisionWithReference
@@ -8,6 +8,7 @@ from ragas.embeddings import LangchainEmbeddingsWrapper
 from ragas.llms import LangchainLLMWrapper
 from baseclasses.base_classes import ExperimentQuestionMetrics, EvaluationMetrics
 from typing import Optional, List
+import math
 from core.eval.eval_factory import EvalFactory
 
 import logging
@@ -20,6 +21,12 @@ class RagasLLMEvaluator(RagasEvaluator):
         super().__init__(config, experimental_config)
         self._initialze_llm()
         self._initialize_scorers()
+        self.run_config = RunConfig(
+            timeout=self.config.eval_timeout,
+            max_retries=self.config.eval_max_retries,
+            max_wait=self.config.eval_max_wait,
+            max_workers=self.config.eval_max_workers
+        )
 
 
     def _initialze_llm(self):
@@ -52,25 +59,19 @@ class RagasLLMEvaluator(RagasEvaluator):
     def get_questions(self, experiment_id):
         return super().get_questions(experiment_id)
 
-    def evaluate(self, experiment_id: str):
-        """Perform evaluation for all questions in an experiment"""
-        if not experiment_id:
-            raise ValueError("Experiment ID cannot be None")
-
-        questions = self.get_all_questions(experiment_id)['Items'] # Contains question, generated answer, GT answer and retrieved context
-
-        metrics_records = [ExperimentQuestionMetrics(**question) for question in questions]
+    def evaluate_batch(self, metrics_records: List[ExperimentQuestionMetrics]) -> List[Optional[EvaluationMetrics]]:
+        """Score a batch of questions with one RAGAS run, limited by the configured RunConfig"""
+        if not metrics_records:
+            return []
         metrics = self.evaluate_bulk_questions(metrics_records)
+        return [self._question_metrics(scores) for scores in metrics.scores]
 
-        experiment_eval_metrics = {}
-        if metrics:
-            experiment_eval_metrics = metrics._repr_dict
-            experiment_eval_metrics = {key: round(value, 2) if isinstance(value, float) else value for key, value in experiment_eval_metrics.items()}        
-            experiment_eval_metrics = EvaluationMetrics().from_dict(experiment_eval_metrics).to_dict()
-            logger.info(f"Experiment {experiment_id} evaluation metrics: {experiment_eval_metrics}")
-
-        
-        self.update_experiment_metrics(experiment_id, experiment_eval_metrics)
+    @staticmethod
+    def _question_metrics(scores: dict) -> Optional[EvaluationMetrics]:
+        # Samples whose every metric failed have no usable score
+        if all(isinstance(value, float) and math.isnan(value) for value in scores.values()):
+            return None
+        return EvaluationMetrics().from_dict(scores)
 
     def evaluate_bulk_questions(self, metrics_records: List[ExperimentQuestionMetrics]):
         """Evaluate a list of metrics records"""
@@ -95,7 +96,7 @@ class RagasLLMEvaluator(RagasEvaluator):
             answer_samples.append(answer_sample)
 
         evaluation_dataset = EvaluationDataset(answer_samples)
-        metrics = evaluate(evaluation_dataset, metrics_to_evaluate)
+        metrics = evaluate(evaluation_dataset, metrics_to_evaluate, run_config=self.run_config, show_progress=False)
         
         return metrics
 
@@ -2,7 +2,9 @@ from core.eval.ragas.ragas_eval import RagasEvaluator
 from ragas.metrics import NonLLMStringSimilarity, NonLLMContextRecall, NonLLMContextPrecisionWithReference, RougeScore, BleuScore, Faithfulness
 from baseclasses.base_classes import ExperimentQuestionMetrics, EvaluationMetrics
 from ragas.dataset_schema import SingleTurnSample
-from typing import Optional
+from typing import List, Optional
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from core.eval.eval_factory import EvalFactory
 
 import logging
@@ -27,32 +29,12 @@ class RagasNonLLMEvaluator(RagasEvaluator):
     def get_questions(self, experiment_id):
         return super().get_questions(experiment_id)
 
-    def evaluate(self, experiment_id: str):
-        """Perform evaluation for all questions in an experiment"""
-        if not experiment_id:
-            raise ValueError("Experiment ID cannot be None")
-
-        questions = self.get_all_questions(experiment_id)['Items']
-        metrics_list = []
-        evaluation_dict = {}
-
-        for question in questions:
-            metrics_record = ExperimentQuestionMetrics(**question)
-            metrics = self._evaluate_single_question(metrics_record)
-
-            if metrics:
-                metrics_list.append(metrics)
-                update_expression = "SET eval_metrics = :metrics"
-                expression_attribute_values = {
-                    ':metrics': {'M' : metrics.to_dict()}
-                }
-                
-                self.metrics_db.update_item(
-                    key={'id': metrics_record.id},
-                    update_expression=update_expression,
-                    expression_values=expression_attribute_values
-                )
-        self.update_experiment_metrics(experiment_id, metrics_list)
+    def evaluate_batch(self, metrics_records: List[ExperimentQuestionMetrics]) -> List[Optional[EvaluationMetrics]]:
+        """Score a batch of questions on `eval_max_workers` threads"""
+        # RAGAS scores a single sample on the thread's event loop, each worker gets its own
+        with ThreadPoolExecutor(max_workers=max(1, self.config.eval_max_workers),
+                                initializer=lambda: asyncio.set_event_loop(asyncio.new_event_loop())) as executor:
+            return list(executor.map(self._evaluate_single_question, metrics_records))
 
     def _evaluate_single_question(self, metrics_record: ExperimentQuestionMetrics) -> Optional[EvaluationMetrics]:
         """Evaluate a single question and return its metrics"""
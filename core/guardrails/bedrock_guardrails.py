@@ -1,11 +1,12 @@
 from typing import List, Dict, Optional, Any
-import boto3, yaml, uuid
+import yaml, uuid
 from botocore.exceptions import ClientError
+from util.boto3_clients import get_client
 
 class BedrockGuardrails:
     def __init__(self, region: str = 'us-east-1'):
-        self.bedrock_client = boto3.client('bedrock', region_name = region)
-        self.runtime_client = boto3.client('bedrock-runtime', region_name = region)
+        self.bedrock_client = get_client('bedrock', region_name = region)
+        self.runtime_client = get_client('bedrock-runtime', region_name = region)
 
     def create_guardrail(
         self,
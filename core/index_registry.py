@@ -0,0 +1,200 @@
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from botocore.exceptions import ClientError
+
+from core.dynamodb import DynamoDBOperations
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+class IndexBuildStatus:
+    """Build states recorded for an index in the registry."""
+    BUILDING = "building"
+    READY = "ready"
+    FAILED = "failed"
+
+
+class IndexRegistryTimeout(Exception):
+    """Raised when an index is still being built by another task after the wait timeout."""
+    pass
+
+
+class IndexLeaseLost(Exception):
+    """Raised in a builder whose lease expired and was claimed by another task."""
+    pass
+
+
+class BuildLease:
+    """
+    Build lease held on an index, handed out by `IndexRegistry.hold_lease`.
+
+    `check` is called before every write to the index. It renews the lease with a conditional
+    write when the last renewal is older than a third of the lease, so a builder that stalled past
+    its lease finds out before writing again instead of racing the task that took the index over.
+    """
+
+    def __init__(self, registry: 'IndexRegistry', index_id: str, owner: str):
+        self.registry = registry
+        self.index_id = index_id
+        self.owner = owner
+        self.lost = False
+        self._renewed_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def renew(self) -> None:
+        with self._lock:
+            if self.lost:
+                raise IndexLeaseLost(f"Build lease for index {self.index_id} is no longer held by {self.owner}")
+            try:
+                self.registry.renew(self.index_id, self.owner)
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
+                self.lost = True
+                raise IndexLeaseLost(f"Build lease for index {self.index_id} was taken over from {self.owner}") from e
+            self._renewed_at = time.monotonic()
+
+    def check(self) -> None:
+        """Raise `IndexLeaseLost` unless the lease is still held for at least two thirds of its duration."""
+        if self.lost:
+            raise IndexLeaseLost(f"Build lease for index {self.index_id} is no longer held by {self.owner}")
+        if self._renewed_at is None or time.monotonic() - self._renewed_at >= self.registry.lease_seconds / 3:
+            self.renew()
+
+
+class IndexRegistry:
+    """
+    Records the build state of each vector index so experiments sharing an index build it once.
+
+    An indexing task claims an index with a conditional write. The claim succeeds only if the
+    index is unknown, its last build failed, its builder's lease has expired or it was built
+    from a different knowledge base. Every other task waits until the build is ready or failed.
+    The builder keeps its lease alive while it works, so a crashed task does not block the
+    index forever.
+    """
+
+    def __init__(self, table_name: str, region: str, lease_seconds: int = 900, poll_interval: int = 30):
+        self.db = DynamoDBOperations(table_name=table_name, region=region)
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+
+    def get(self, index_id: str) -> Optional[Dict[str, Any]]:
+        return self.db.get_item({'index_id': index_id})
+
+    def try_acquire(self, index_id: str, kb_fingerprint: str, owner: str) -> bool:
+        """Claim the right to build `index_id`, returning False if another task owns it or it is already built."""
+        now = int(time.time())
+        try:
+            self.db.update_item(
+                key={'index_id': index_id},
+                update_expression="SET build_status = :building, kb_fingerprint = :fp, owner_id = :owner, "
+                                  "lease_expires = :expires, doc_count = :zero, updated_at = :now",
+                expression_values={
+                    ':building': IndexBuildStatus.BUILDING,
+                    ':ready': IndexBuildStatus.READY,
+                    ':failed': IndexBuildStatus.FAILED,
+                    ':fp': kb_fingerprint,
+                    ':owner': owner,
+                    ':expires': now + self.lease_seconds,
+                    ':zero': 0,
+                    ':now': now
+                },
+                condition_expression="attribute_not_exists(index_id) OR build_status = :failed "
+                                     "OR (build_status = :building AND lease_expires < :now) "
+                                     "OR (build_status = :ready AND kb_fingerprint <> :fp)"
+            )
+            logger.info(f"Acquired build lease for index {index_id} as {owner}")
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return False
+            raise
+
+    def acquire_or_wait(self, index_id: str, kb_fingerprint: str, owner: str, timeout: int) -> Optional[Dict[str, Any]]:
+        """
+        Claim `index_id` for building, or wait for the task that is building it.
+
+        Args:
+            index_id (str): Vector index name
+            kb_fingerprint (str): Fingerprint of the knowledge base the index is built from
+            owner (str): Identifier of the calling task, e.g. the experiment id
+            timeout (int): Maximum number of seconds to wait for another task's build
+
+        Returns:
+            Optional[Dict[str, Any]]: None if the caller now owns the build, otherwise the ready registry entry
+
+        Raises:
+            IndexRegistryTimeout: If the index is still building after `timeout` seconds
+        """
+        deadline = time.time() + timeout
+        while True:
+            # Read first so that a ready index never causes a claim attempt
+            entry = self.get(index_id)
+            if entry and entry.get('build_status') == IndexBuildStatus.READY and entry.get('kb_fingerprint') == kb_fingerprint:
+                logger.info(f"Index {index_id} is already built with {entry.get('doc_count')} documents")
+                return entry
+            if self.try_acquire(index_id, kb_fingerprint, owner):
+                return None
+            if time.time() >= deadline:
+                raise IndexRegistryTimeout(f"Index {index_id} is still being built by another task after {timeout} seconds")
+            logger.info(f"Index {index_id} is being built by {entry.get('owner_id') if entry else 'another task'}, waiting {self.poll_interval} seconds")
+            time.sleep(self.poll_interval)
+
+    def renew(self, index_id: str, owner: str) -> None:
+        """Extend the build lease, failing with ConditionalCheckFailedException if `owner` no longer builds the index."""
+        self.db.update_item(
+            key={'index_id': index_id},
+            update_expression="SET lease_expires = :expires, updated_at = :now",
+            expression_values={':expires': int(time.time()) + self.lease_seconds, ':now': int(time.time()), ':owner': owner,
+                               ':building': IndexBuildStatus.BUILDING},
+            condition_expression="owner_id = :owner AND build_status = :building"
+        )
+
+    @contextmanager
+    def hold_lease(self, index_id: str, owner: str) -> Iterator[BuildLease]:
+        """Keep renewing the build lease on a background thread while the block runs, yielding the lease to check before writes."""
+        lease = BuildLease(self, index_id, owner)
+        stop = threading.Event()
+
+        def _renew():
+            while not stop.wait(self.lease_seconds / 3):
+                try:
+                    lease.renew()
+                except IndexLeaseLost as e:
+                    logger.error(f"{e}, the build will stop before its next write")
+                    return
+                except Exception as e:
+                    logger.warning(f"Failed to renew build lease for index {index_id}: {e}")
+
+        renewer = threading.Thread(target=_renew, daemon=True)
+        renewer.start()
+        try:
+            yield lease
+        finally:
+            stop.set()
+            renewer.join()
+
+    def mark_ready(self, index_id: str, owner: str, doc_count: int) -> None:
+        self._finish(index_id, owner, IndexBuildStatus.READY, doc_count)
+
+    def mark_failed(self, index_id: str, owner: str) -> None:
+        self._finish(index_id, owner, IndexBuildStatus.FAILED, 0)
+
+    def _finish(self, index_id: str, owner: str, status: str, doc_count: int) -> None:
+        try:
+            self.db.update_item(
+                key={'index_id': index_id},
+                update_expression="SET build_status = :status, doc_count = :count, updated_at = :now REMOVE lease_expires",
+                expression_values={':status': status, ':count': doc_count, ':now': int(time.time()), ':owner': owner},
+                condition_expression="owner_id = :owner"
+            )
+            logger.info(f"Index {index_id} marked {status} with {doc_count} documents")
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            logger.warning(f"Build lease for index {index_id} is no longer held by {owner}, not marking it {status}")
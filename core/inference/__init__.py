@@ -1,9 +1,6 @@
 from .bedrock.bedrock_inferencer import BedrockInferencer
 
-# Importing SageMaker-specific inference and inference factory.
 from .inference_factory import InferencerFactory
-from .sagemaker.sagemaker_inferencer import SageMakerInferencer
-from .sagemaker.llama_inferencer import LlamaInferencer
 
 # List of model names that you want to register with the InferencerFactory
 model_list = [
@@ -18,9 +15,10 @@ model_list = [
              ]
 
 # Registering each model from the list into the InferencerFactory under 'sagemaker'.
-# The `SageMakerInferencer` will be used for inferencing operations for these models.
+# The `SageMakerInferencer` will be used for inferencing operations for these models. They are registered
+# by path so the SageMaker SDK is only imported when a SageMaker inferencer is created.
 for model in model_list:
     if model.startswith("meta-vlm-llama-4"):
-        InferencerFactory.register_inferencer('sagemaker', model, LlamaInferencer)
+        InferencerFactory.register_inferencer('sagemaker', model, 'core.inference.sagemaker.llama_inferencer:LlamaInferencer')
     else:
-        InferencerFactory.register_inferencer('sagemaker', model, SageMakerInferencer)
\ No newline at end of file
+        InferencerFactory.register_inferencer('sagemaker', model, 'core.inference.sagemaker.sagemaker_inferencer:SageMakerInferencer')
\ No newline at end of file
@@ -1,11 +1,11 @@
 from baseclasses.base_classes import BaseInferencer
-import boto3
 from typing import List, Dict, Any, Union, Tuple
 import logging
 from config.experimental_config import ExperimentalConfig, NShotPromptGuide
 from core.inference.inference_factory import InferencerFactory
 from util.boto3_utils import BedRockRetryHander
 import random
+from util.boto3_clients import get_async_client, get_client
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -22,10 +22,7 @@ class BedrockInferencer(BaseInferencer):
         self._initialize_client() 
     
     def _initialize_client(self) -> None:
-        self.client = boto3.client(
-            service_name='bedrock-runtime',
-            region_name=self.region_name
-        )
+        self.client = get_client('bedrock-runtime', region_name=self.region_name)
 
     def generate_prompt(self, experiment_config: ExperimentalConfig, default_prompt: str, user_query: str, context: List[Dict] = None) -> Tuple[str, List[Dict[str, Any]]]:
         # Get n_shot config values first to avoid repeated lookups
@@ -76,42 +73,64 @@ class BedrockInferencer(BaseInferencer):
     @BedRockRetryHander()
     def generate_text(self, user_query: str, default_prompt: str, context: List[Dict] = None, **kwargs) -> Tuple[Dict[Any, Any], str]:
         try:
-            # Code to generate prompt considering the upload prompt config file
-            system_prompt, messages = self.generate_prompt(self.experiment_config, default_prompt, user_query, context)
-
-            inference_config = {
-                "maxTokens": 512, 
-                "temperature": self.experiment_config.temp_retrieval_llm, 
-                "topP": 0.9
-            }
-            
-            skip_system_param = self.model_id in ("amazon.titan-text-express-v1", "amazon.titan-text-lite-v1", "mistral.mistral-7b-instruct-v0:2")
-
-            request_params = {
-                "modelId": self.model_id,
-                "messages": ([self._prepare_conversation(role="user", message=system_prompt)] if skip_system_param else []) + messages,
-                "inferenceConfig": inference_config
-            }
-            
-            # Add system parameter only for non-Titan-v1 models
-            #TODO: Short-term fix, will be addressed using inheritence as part of refactoring
-            if not skip_system_param:
-                request_params["system"] = [{"text" : system_prompt}]
-            
+            request_params = self._build_converse_request(user_query, default_prompt, context)
             response = self.client.converse(**request_params)
-           
-            metadata = {}
-            if 'usage' in response:
-                for key, value in response['usage'].items():
-                    metadata[key] = value
-            if 'metrics' in response:
-                for key, value in response['metrics'].items():
-                    metadata[key] = value
-            return metadata, self._extract_response(response)
+            return self._parse_converse_response(response)
+        except Exception as e:
+            logger.error(f"Error generating text with Bedrock: {str(e)}")
+            raise
+
+    async def agenerate_text(self, user_query: str, default_prompt: str, context: List[Dict] = None, **kwargs) -> Tuple[Dict[Any, Any], str]:
+        """Generate text with the async converse API, without holding a thread while the model runs."""
+        async_client = await get_async_client('bedrock-runtime', region_name=self.region_name)
+        if async_client is None:
+            return await super().agenerate_text(user_query=user_query, default_prompt=default_prompt, context=context, **kwargs)
+        try:
+            request_params = self._build_converse_request(user_query, default_prompt, context)
+            return await self._aconverse(async_client, request_params)
         except Exception as e:
             logger.error(f"Error generating text with Bedrock: {str(e)}")
             raise
 
+    @BedRockRetryHander()
+    async def _aconverse(self, async_client: Any, request_params: Dict[str, Any]) -> Tuple[Dict[Any, Any], str]:
+        response = await async_client.converse(**request_params)
+        return self._parse_converse_response(response)
+
+    def _build_converse_request(self, user_query: str, default_prompt: str, context: List[Dict] = None) -> Dict[str, Any]:
+        # Code to generate prompt considering the upload prompt config file
+        system_prompt, messages = self.generate_prompt(self.experiment_config, default_prompt, user_query, context)
+
+        inference_config = {
+            "maxTokens": 512, 
+            "temperature": self.experiment_config.temp_retrieval_llm, 
+            "topP": 0.9
+        }
+        
+        skip_system_param = self.model_id in ("amazon.titan-text-express-v1", "amazon.titan-text-lite-v1", "mistral.mistral-7b-instruct-v0:2")
+
+        request_params = {
+            "modelId": self.model_id,
+            "messages": ([self._prepare_conversation(role="user", message=system_prompt)] if skip_system_param else []) + messages,
+            "inferenceConfig": inference_config
+        }
+        
+        # Add system parameter only for non-Titan-v1 models
+        #TODO: Short-term fix, will be addressed using inheritence as part of refactoring
+        if not skip_system_param:
+            request_params["system"] = [{"text" : system_prompt}]
+        return request_params
+
+    def _parse_converse_response(self, response: Dict[str, Any]) -> Tuple[Dict[Any, Any], str]:
+        metadata = {}
+        if 'usage' in response:
+            for key, value in response['usage'].items():
+                metadata[key] = value
+        if 'metrics' in response:
+            for key, value in response['metrics'].items():
+                metadata[key] = value
+        return metadata, self._extract_response(response)
+
     def _prepare_conversation(self, message: str, role: str):
         # Format message and role into a conversation
         if not message or not role:
@@ -2,7 +2,8 @@ from config.config import get_config
 from config.experimental_config import ExperimentalConfig
 import logging
 from baseclasses.base_classes import BaseInferencer
-from typing import Dict, Type
+from typing import Dict, Type, Union
+from util.lazy_import import load_class
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -16,10 +17,11 @@ class InferencerFactory:
 
     """Factory to create embedders based on model ID and service type."""
 
-    _registry: Dict[str, Type[BaseInferencer]] = {}
+    _registry: Dict[str, Union[Type[BaseInferencer], str]] = {}
 
     @classmethod
-    def register_inferencer(cls, service_type: str, model_id: str, embedder_cls: Type[BaseInferencer]):
+    def register_inferencer(cls, service_type: str, model_id: str, embedder_cls: Union[Type[BaseInferencer], str]):
+        """Register an inferencer class, or its "module:ClassName" path to import it on first use."""
         key = f"{service_type}:{model_id}"
         cls._registry[key] = embedder_cls
     
@@ -32,6 +34,7 @@ class InferencerFactory:
         inferencer_cls = cls._registry.get(key)
         if not inferencer_cls:
             raise InferenceServiceError(f"No inferencer_cls registered for service {service_type} and model {model_id}")
+        inferencer_cls = cls._registry[key] = load_class(inferencer_cls)
         
         if service_type == "sagemaker":
             role_arn = get_config().sagemaker_role_arn
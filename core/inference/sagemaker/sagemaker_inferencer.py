@@ -1,5 +1,4 @@
-import boto3
-from typing import List, Dict
+from typing import Any, List, Dict, Tuple
 from botocore.exceptions import ClientError
 from baseclasses.base_classes import BaseInferencer
 from config.experimental_config import ExperimentalConfig
@@ -14,6 +13,7 @@ import logging
 import time
 import random
 import json
+from util.boto3_clients import get_async_client, get_client, get_session
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -84,11 +84,11 @@ class SageMakerInferencer(BaseInferencer):
         logger.info(f"Initializing SageMaker Generator for model: {model_id}")
 
         # Initialize the SageMaker runtime and client for general operations
-        self.client = boto3.client("sagemaker-runtime", region_name=region)
-        self.sagemaker_client = boto3.client('sagemaker', region_name=region)
+        self.client = get_client("sagemaker-runtime", region_name=region)
+        self.sagemaker_client = get_client('sagemaker', region_name=region)
         
         # Create a new SageMaker session
-        self.session = Session(boto_session=boto3.Session(region_name=region))
+        self.session = Session(boto_session=get_session(region_name=region))
 
         # Initialize additional inferencing-related attributes
         self.inferencing_model_id = model_id
@@ -514,42 +514,84 @@ class SageMakerInferencer(BaseInferencer):
             # Calculate latency metrics
             latency = int((time.time() - start_time) * 1000)
 
-            generated_text = self.parse_response(response)
-            
-            # Process the generated text to extract the answer
-            if "The final answer is:" in generated_text:
-                answer = generated_text.split("The final answer is:")[1].strip()
-            elif "Assistant:" in generated_text:
-                answer = generated_text.split("Assistant:")[1].strip()
-            else:
-                answer = generated_text.strip()
-
-            # Clean and validate the response
-            cleaned_response = self._clean_response(answer)
-            
-            # Final validation of the generated text
-            if not cleaned_response or cleaned_response.isspace() or 'DRAFT' in cleaned_response:
-                return "Unable to generate a proper response. Please try again."
-
-            # SageMaker does not provide input tokens as metadata.
-            # As a workaround, we use a rough approximation: ~4 characters per token.
-            input_tokens = len(prompt) // 4
-            output_tokens = len(generated_text) // 4
-            total_tokens = input_tokens + output_tokens
-            
-            answer_metadata = {
-                'inputTokens': input_tokens,
-                'outputTokens': output_tokens,
-                'totalTokens': total_tokens,
-                'latencyMs': latency
-            }
-            
-            return answer_metadata, cleaned_response
+            return self._build_answer(self.parse_response(response), prompt, latency)
 
         except Exception as e:
             logger.error(f"Error generating response: {str(e)}")
             return f"Error generating response: {str(e)}"
 
+    async def agenerate_text(self, user_query: str, default_prompt: str, context: List[Dict] = None, **kwargs) -> Tuple[Dict[str, Any], str]:
+        """
+        Coroutine version of `generate_text`, invoking the endpoint through the async SageMaker runtime client.
+
+        Unlike `generate_text`, endpoint errors are raised instead of being returned as the answer text.
+        """
+        async_client = await get_async_client("sagemaker-runtime", region_name=self.region_name)
+        if async_client is None:
+            return await super().agenerate_text(user_query=user_query, default_prompt=default_prompt, context=context, **kwargs)
+
+        # Ensure the generation predictor is initialized
+        if not self.inferencing_predictor:
+            raise ValueError("Generation predictor not initialized")
+
+        system_prompt, prompt = self.generate_prompt(self.experiment_config, default_prompt, user_query, context)
+
+        payload = self.construct_payload(system_prompt, prompt)
+
+        try:
+            start_time = time.time()
+
+            # Same request the predictor's JSON serializer and deserializer would make
+            response = await async_client.invoke_endpoint(
+                EndpointName=self.inferencing_predictor.endpoint_name,
+                ContentType="application/json",
+                Accept="application/json",
+                Body=json.dumps(payload)
+            )
+            async with response["Body"] as stream:
+                model_response = json.loads(await stream.read())
+
+            latency = int((time.time() - start_time) * 1000)
+
+            return self._build_answer(self.parse_response(model_response), prompt, latency)
+
+        except Exception as e:
+            # Raised rather than returned as text, callers unpack the (metadata, answer) tuple
+            logger.error(f"Error generating response: {str(e)}")
+            raise
+
+    def _build_answer(self, generated_text: str, prompt: str, latency: int):
+        """Extract and clean the answer from the generated text and attach approximate token metadata."""
+        # Process the generated text to extract the answer
+        if "The final answer is:" in generated_text:
+            answer = generated_text.split("The final answer is:")[1].strip()
+        elif "Assistant:" in generated_text:
+            answer = generated_text.split("Assistant:")[1].strip()
+        else:
+            answer = generated_text.strip()
+
+        # Clean and validate the response
+        cleaned_response = self._clean_response(answer)
+        
+        # Final validation of the generated text
+        if not cleaned_response or cleaned_response.isspace() or 'DRAFT' in cleaned_response:
+            return "Unable to generate a proper response. Please try again."
+
+        # SageMaker does not provide input tokens as metadata.
+        # As a workaround, we use a rough approximation: ~4 characters per token.
+        input_tokens = len(prompt) // 4
+        output_tokens = len(generated_text) // 4
+        total_tokens = input_tokens + output_tokens
+        
+        answer_metadata = {
+            'inputTokens': input_tokens,
+            'outputTokens': output_tokens,
+            'totalTokens': total_tokens,
+            'latencyMs': latency
+        }
+        
+        return answer_metadata, cleaned_response
+
     def _clean_response(self, text: str) -> str:
         """
         Cleans and formats the response text by removing common artifacts, ensuring proper sentence structure,
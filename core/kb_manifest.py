@@ -0,0 +1,86 @@
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from botocore.exceptions import ClientError
+
+from util.s3util import S3Util
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+@dataclass
+class ManifestDiff:
+    """S3 objects of a knowledge base grouped by what incremental indexing has to do with them."""
+    added: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+
+    @property
+    def to_index(self) -> List[str]:
+        return self.added + self.changed
+
+    @property
+    def to_delete(self) -> List[str]:
+        return self.changed + self.removed
+
+    def __str__(self) -> str:
+        return (f"{len(self.added)} added, {len(self.changed)} changed, "
+                f"{len(self.removed)} removed, {len(self.unchanged)} unchanged")
+
+
+class KnowledgeBaseManifest:
+    """
+    Record of the knowledge base objects indexed into a vector index.
+
+    Each S3 key maps to the ETag and size of the version that was indexed and the ids of the
+    chunks it produced. The manifest is stored as JSON in S3 and only saved after an indexing
+    run succeeded, so an interrupted run is redone from the last complete state.
+    """
+
+    def __init__(self, bucket: str, key: str, entries: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.bucket = bucket
+        self.key = key
+        self.entries: Dict[str, Dict[str, Any]] = entries or {}
+
+    @classmethod
+    def load(cls, bucket: str, key: str) -> Optional['KnowledgeBaseManifest']:
+        """Read the manifest from s3://bucket/key, returning None if none was saved yet."""
+        try:
+            response = S3Util().s3_client.get_object(Bucket=bucket, Key=key)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+                return None
+            raise
+        content = json.loads(response['Body'].read().decode('utf-8'))
+        return cls(bucket, key, content.get('objects', {}))
+
+    def save(self) -> None:
+        S3Util().write_json_to_s3(self.key, self.bucket, {'objects': self.entries})
+
+    def diff(self, objects: Dict[str, Dict[str, Any]]) -> ManifestDiff:
+        """Compare the indexed versions with the current S3 objects, as listed by `S3Util.list_pdf_objects`."""
+        result = ManifestDiff()
+        for key, current in objects.items():
+            indexed = self.entries.get(key)
+            if indexed is None:
+                result.added.append(key)
+            elif indexed.get('etag') != current['etag'] or indexed.get('size') != current['size']:
+                result.changed.append(key)
+            else:
+                result.unchanged.append(key)
+        result.removed = [key for key in self.entries if key not in objects]
+        return result
+
+    def record(self, key: str, etag: str, size: int, chunk_ids: List[str]) -> None:
+        self.entries[key] = {'etag': etag, 'size': size, 'chunk_ids': chunk_ids}
+
+    def forget(self, key: str) -> None:
+        self.entries.pop(key, None)
+
+    @property
+    def chunk_count(self) -> int:
+        return sum(len(entry.get('chunk_ids', [])) for entry in self.entries.values())
@@ -1,15 +1,15 @@
 from typing import List, Dict, Any, Union
-import boto3
 import logging
 from baseclasses.base_classes import VectorDatabase
 from config.config import Config
+from util.boto3_clients import get_client
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 class KnowledgeBaseVectorDatabase(VectorDatabase):
     def __init__(self, region: str = 'us-east-1'):
-        self.client = boto3.client("bedrock-agent-runtime", region_name=region)
+        self.client = get_client("bedrock-agent-runtime", region_name=region)
         
     def create_index(self, index_name: str, mapping: Dict[str, Any], algorithm: str) -> None:
         raise NotImplementedError("This method is not implemented in this minimal version.")
@@ -1,21 +1,53 @@
 import traceback, json
-from typing import Dict, Any, List, Optional
+import random
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Dict, Any, Iterable, Iterator, List, Optional, Tuple
 from botocore.endpoint import uuid
 from opensearchpy import OpenSearch, RequestsHttpConnection, AWSV4SignerAuth
+from opensearchpy.exceptions import ConnectionError, TransportError
 from baseclasses.base_classes import VectorDatabase
-import boto3
 import logging
+from util.boto3_clients import get_session
 
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Bulk item statuses worth resending: throttled or temporarily unavailable
+RETRYABLE_BULK_STATUSES = {429, 502, 503, 504}
+
+# Fields tagging each chunk with the knowledge base object it was cut from, used by incremental indexing
+SOURCE_FIELDS_MAPPING = {
+    "source_key": {"type": "keyword"},
+    "source_etag": {"type": "keyword"}
+}
+
+@dataclass(frozen=True)
+class KnnFieldInfo:
+    """kNN vector field of an index, as declared in its mapping."""
+    field: str
+    dimension: int
+    engine: Optional[str] = None
+    space_type: Optional[str] = None
+
 class OpenSearchVectorDatabase(VectorDatabase):
-    def __init__(self, host: str, use_ssl: bool = True, port: int = 443, is_serverless : bool = True, region: str = 'us-east-1', username: str = None, password: str = None):
+    # Per-index kNN field metadata shared by all clients of a host: (host, index) -> (info, expiry)
+    _knn_field_cache: Dict[Tuple[str, str], Tuple[KnnFieldInfo, float]] = {}
+    _knn_field_cache_lock = threading.Lock()
+
+    def __init__(self, host: str, use_ssl: bool = True, port: int = 443, is_serverless : bool = True, region: str = 'us-east-1', username: str = None, password: str = None,
+                 knn_field_cache_ttl: float = 3600):
+        self.host = host
+        self.is_serverless = is_serverless
+        self.knn_field_cache_ttl = knn_field_cache_ttl
         if is_serverless:
             try:
                 # Get credentials from the Lambda role
-                credentials = boto3.Session().get_credentials()
+                credentials = get_session().get_credentials()
                 # Create AWS V4 Signer Auth for OpenSearch Serverless
                 auth = AWSV4SignerAuth(credentials, region, 'aoss')
                 
@@ -129,6 +161,12 @@ class OpenSearchVectorDatabase(VectorDatabase):
         try:
             self.client.indices.create(index=index_name, body=index_body)
             logger.info(f"Successfully created index '{index_name}'")
+            self._cache_knn_field(index_name, KnnFieldInfo(
+                field=vector_field,
+                dimension=dim,
+                engine=algorithm_settings.get("engine"),
+                space_type=algorithm_settings.get("space_type")
+            ))
         except Exception as e:
             logger.error(f"Error creating index '{index_name}': {str(e)}")
             logger.error(f"Index body: {json.dumps(index_body, indent=2)}")
@@ -138,20 +176,87 @@ class OpenSearchVectorDatabase(VectorDatabase):
 
     def update_index(self, index_name: str, new_mapping: Dict[str, Any]) -> None:
         self.client.indices.put_mapping(index=index_name, body=new_mapping)
+        self.invalidate_knn_field_cache(index_name)
 
     def delete_index(self, index_name: str) -> None:
         self.client.indices.delete(index=index_name)
+        self.invalidate_knn_field_cache(index_name)
 
     def insert_document(self, index_name: str, document: Dict[str, Any]) -> None:
         self.client.index(index=index_name, body=document)
 
-    def search(self, index_name: str, query_vector: List[float], k: int) -> List[Dict[str, Any]]:
-        vector_field = next((field for field, props in 
-                             self.client.indices.get_mapping(index=index_name)[index_name]['mappings']['properties'].items() 
-                             if 'type' in props and props['type'] == 'knn_vector'), None)
-        if not vector_field:
+    def get_knn_field_info(self, index_name: str, refresh: bool = False) -> KnnFieldInfo:
+        """
+        Return the kNN vector field of an index, reading the mapping only on a cache miss.
+
+        :param index_name: Name of the index
+        :param refresh: Bypass the cache and re-read the mapping
+        :return: Vector field name, dimension, engine and space type
+        """
+        cache_key = (self.host, index_name)
+        if not refresh:
+            with self._knn_field_cache_lock:
+                cached = self._knn_field_cache.get(cache_key)
+            if cached and cached[1] > time.monotonic():
+                return cached[0]
+
+        properties = self.client.indices.get_mapping(index=index_name)[index_name]['mappings']['properties']
+        field, props = next(((field, props) for field, props in properties.items()
+                             if props.get('type') == 'knn_vector'), (None, None))
+        if not field:
             raise ValueError("Index does not contain a knn_vector field")
 
+        method = props.get('method', {})
+        info = KnnFieldInfo(
+            field=field,
+            dimension=int(props['dimension']),
+            engine=method.get('engine'),
+            space_type=method.get('space_type', props.get('space_type'))
+        )
+        self._cache_knn_field(index_name, info)
+        return info
+
+    def invalidate_knn_field_cache(self, index_name: Optional[str] = None) -> None:
+        """
+        Drop cached kNN field metadata for one index, or for every index of this host.
+
+        :param index_name: Name of the index, None to clear all indices of this host
+        """
+        with self._knn_field_cache_lock:
+            for key in list(self._knn_field_cache):
+                if key[0] == self.host and (index_name is None or key[1] == index_name):
+                    del self._knn_field_cache[key]
+
+    def _cache_knn_field(self, index_name: str, info: KnnFieldInfo) -> None:
+        with self._knn_field_cache_lock:
+            self._knn_field_cache[(self.host, index_name)] = (info, time.monotonic() + self.knn_field_cache_ttl)
+
+    def _resolve_knn_field(self, index_name: str, query_dimension: int, vector_field: Optional[str] = None) -> str:
+        """Pick the vector field to query and check the query dimension against the cached mapping."""
+        if vector_field:
+            with self._knn_field_cache_lock:
+                cached = self._knn_field_cache.get((self.host, index_name))
+            info = cached[0] if cached and cached[0].field == vector_field else None
+        else:
+            info = self.get_knn_field_info(index_name)
+            vector_field = info.field
+
+        if info and query_dimension != info.dimension:
+            raise ValueError(f"Query vector has dimension {query_dimension} but index '{index_name}' field '{vector_field}' expects {info.dimension}")
+        return vector_field
+
+    def search(self, index_name: str, query_vector: List[float], k: int, vector_field: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Run a kNN query against an index.
+
+        :param index_name: Name of the index
+        :param query_vector: Query embedding
+        :param k: Number of neighbours to return
+        :param vector_field: Name of the vector field, looked up from the (cached) mapping when omitted
+        :return: Source documents of the hits
+        """
+        vector_field = self._resolve_knn_field(index_name, len(query_vector), vector_field)
+
         query = {
             "size": k,
             "query": {
@@ -169,6 +274,50 @@ class OpenSearchVectorDatabase(VectorDatabase):
         response = self.client.search(index=index_name, body=query)
         return [hit['_source'] for hit in response['hits']['hits']]
     
+    def batch_search(self, index_name: str, query_vectors: List[List[float]], k: int, vector_field: Optional[str] = None,
+                     batch_size: int = 50) -> List[List[Dict[str, Any]]]:
+        """
+        Run many kNN queries with one _msearch request per `batch_size` queries.
+
+        :param index_name: Name of the index
+        :param query_vectors: Query embeddings
+        :param k: Number of neighbours to return per query
+        :param vector_field: Name of the vector field, looked up from the (cached) mapping when omitted
+        :param batch_size: Maximum number of queries packed into one _msearch request
+        :return: Source documents of the hits for each query, aligned with `query_vectors`
+        """
+        if not query_vectors:
+            return []
+        for query_vector in query_vectors:
+            vector_field = self._resolve_knn_field(index_name, len(query_vector), vector_field)
+
+        results = []
+        batch_size = max(1, batch_size)
+        for start in range(0, len(query_vectors), batch_size):
+            body = []
+            for query_vector in query_vectors[start:start + batch_size]:
+                body.append({"index": index_name})
+                body.append({
+                    "size": k,
+                    "query": {
+                        "knn": {
+                            vector_field: {
+                                "vector": query_vector,
+                                "k": k
+                            }
+                        }
+                    },
+                    "_source": True,
+                    "fields": ["text", "parent_id"]
+                })
+
+            response = self.client.msearch(body=body)
+            for offset, item in enumerate(response['responses']):
+                if 'error' in item:
+                    raise RuntimeError(f"kNN query {start + offset} on index '{index_name}' failed: {item['error']}")
+                results.append([hit['_source'] for hit in item['hits']['hits']])
+        return results
+
     def index_exists(self, index_name: str) -> bool:
         """
         Check if an index exists in OpenSearch.
@@ -177,7 +326,131 @@ class OpenSearchVectorDatabase(VectorDatabase):
         :return: True if the index exists, False otherwise
         """
         return self.client.indices.exists(index=index_name)
+
+    def document_count(self, index_name: str) -> int:
+        """
+        Count the documents in an index.
+
+        :param index_name: Name of the index
+        :return: Number of documents in the index
+        """
+        if not self.is_serverless:
+            # Serverless collections refresh on their own and reject explicit refreshes
+            self.client.indices.refresh(index=index_name)
+        return self.client.count(index=index_name)['count']
+
+    def delete_all_documents(self, index_name: str) -> int:
+        """
+        Delete every document from an index while keeping its settings and mapping.
+
+        Serverless collections do not guarantee delete by query, so there the index is dropped
+        and recreated with the same mappings and kNN settings instead.
+
+        :param index_name: Name of the index to clear
+        :return: Number of deleted documents
+        """
+        if self.is_serverless:
+            count = self.document_count(index_name)
+            self._recreate_index(index_name)
+            return count
+        response = self.client.delete_by_query(index=index_name, body={"query": {"match_all": {}}}, refresh=True, conflicts="proceed")
+        return response.get('deleted', 0)
+
+    def _recreate_index(self, index_name: str) -> None:
+        """Drop an index and create it empty with its current mappings and kNN settings."""
+        definition = self.client.indices.get(index=index_name, flat_settings=True)[index_name]
+        # Only the kNN settings are user-defined, the others are assigned by the collection
+        settings = {key: value for key, value in definition.get("settings", {}).items() if key.startswith("index.knn")}
+        self.delete_index(index_name)
+        self.client.indices.create(index=index_name, body={"settings": settings, "mappings": definition.get("mappings", {})})
+        logger.info(f"Recreated index '{index_name}' empty")
+
+    def delete_documents_by_terms(self, index_name: str, field: str, values: List[str], batch_size: int = 1000) -> int:
+        """
+        Delete the documents whose `field` matches any of `values`, e.g. the chunks of removed source files.
+
+        :param index_name: Name of the index
+        :param field: Keyword field to match
+        :param values: Values to delete, sent in terms queries of at most `batch_size` values
+        :return: Number of deleted documents
+        """
+        deleted = 0
+        for start in range(0, len(values), batch_size):
+            query = {"query": {"terms": {field: values[start:start + batch_size]}}}
+            response = self.client.delete_by_query(index=index_name, body=query, refresh=not self.is_serverless, conflicts="proceed")
+            deleted += response.get('deleted', 0)
+        return deleted
     
+    @contextmanager
+    def bulk_load(self, index_name: str, force_merge_segments: int = 0, warmup: bool = True,
+                  request_timeout: int = 3600) -> Iterator[None]:
+        """
+        Tune an index for ingestion while the block runs.
+
+        Refresh is disabled and replicas are dropped during the block, so HNSW graphs are built
+        once per segment rather than on every refresh. The previous settings are restored even if
+        ingestion fails. On success the index is refreshed, optionally force-merged down to
+        `force_merge_segments` segments, and once its replicas are allocated again its kNN graphs
+        are loaded into memory so that the first queries do not pay the cold-graph cost.
+        Serverless collections manage these settings themselves, so the block runs unchanged there.
+
+        :param index_name: Name of the index
+        :param force_merge_segments: Merge down to this many segments per shard, 0 to skip
+        :param warmup: Load the kNN graphs through the warmup API after ingestion
+        :param request_timeout: Timeout in seconds for the force merge, replica allocation and warmup calls
+        """
+        if self.is_serverless:
+            logger.info(f"Bulk-load tuning is not available on serverless collections, ingesting into '{index_name}' as is")
+            yield
+            return
+
+        initial_status = self.client.cluster.health(index=index_name).get("status")
+        settings = self.client.indices.get_settings(index=index_name, name="index.refresh_interval,index.number_of_replicas")
+        index_settings = settings.get(index_name, {}).get("settings", {}).get("index", {})
+        # Settings left at their defaults are absent and restored to the default with null
+        previous = {
+            "refresh_interval": index_settings.get("refresh_interval"),
+            "number_of_replicas": index_settings.get("number_of_replicas")
+        }
+        self.client.indices.put_settings(index=index_name, body={"index": {"refresh_interval": "-1", "number_of_replicas": 0}})
+        logger.info(f"Bulk-load mode enabled on '{index_name}', previous settings {previous}")
+        try:
+            yield
+        finally:
+            self.client.indices.put_settings(index=index_name, body={"index": previous})
+            logger.info(f"Restored settings {previous} on '{index_name}'")
+
+        self.client.indices.refresh(index=index_name, request_timeout=request_timeout)
+        if force_merge_segments > 0:
+            logger.info(f"Force merging '{index_name}' to {force_merge_segments} segments")
+            self.client.indices.forcemerge(index=index_name, max_num_segments=force_merge_segments, request_timeout=request_timeout)
+        if warmup:
+            # Warm the restored replicas too rather than leave them cold: wait until they are allocated
+            # again, unless the index was not green before the load (e.g. replicas on a single node)
+            self.wait_for_health(index_name, "green" if initial_status == "green" else "yellow", timeout=request_timeout)
+            self.warmup_knn_index(index_name, request_timeout=request_timeout)
+
+    def wait_for_health(self, index_name: str, status: str = "green", timeout: int = 3600) -> bool:
+        """Wait until an index reaches `status` ("green" once replicas are allocated too), returning False on timeout."""
+        health = self.client.cluster.health(index=index_name, wait_for_status=status, timeout=f"{timeout}s",
+                                            request_timeout=timeout + 30)
+        if health.get("timed_out"):
+            logger.warning(f"'{index_name}' is still {health.get('status')} after {timeout} seconds, "
+                           f"{health.get('unassigned_shards')} shards unassigned")
+            return False
+        return True
+
+    def warmup_knn_index(self, index_name: str, request_timeout: int = 3600) -> None:
+        """Load the kNN graphs of an index into native memory through the k-NN warmup API."""
+        if self.is_serverless:
+            return
+        response = self.client.transport.perform_request("GET", f"/_plugins/_knn/warmup/{index_name}", timeout=request_timeout)
+        shards = response.get("_shards", {})
+        if shards.get("failed"):
+            logger.warning(f"kNN warmup of '{index_name}' failed on {shards['failed']} of {shards.get('total')} shards")
+        else:
+            logger.info(f"kNN graphs of '{index_name}' warmed up on {shards.get('successful')} shards")
+
     def insert_chunk(self, index_name: str, text: str, embedding: List[float], chunk_id: str, metadata: Dict = None):
         document = {
             "text": text,
@@ -191,24 +464,129 @@ class OpenSearchVectorDatabase(VectorDatabase):
             logger.error(f"Error inserting chunk {chunk_id}: {str(e)}")
 
     def batch_insert_chunks(self, index_name: str, chunks: List[str], chunk_embeddings: List[List[float]], 
-                            metadata: Optional[List[Dict]] = None, batch_size: int = 100):
-        total_chunks = len(chunks)
-        
+                            metadata: Optional[List[Dict]] = None, batch_size: int = 500, workers: int = 4) -> Dict[str, int]:
+        """
+        Index chunks and their embeddings through the _bulk API.
+
+        :param index_name: Name of the index
+        :param chunks: Chunk texts
+        :param chunk_embeddings: Embeddings aligned with `chunks`
+        :param metadata: Optional metadata per chunk
+        :param batch_size: Maximum number of documents per bulk request
+        :param workers: Number of bulk requests in flight
+        :return: Summary with the indexed, failed and retried document counts
+        """
         # If metadata is None or empty, create a list of empty dictionaries
         if not metadata:
-            metadata = [{} for _ in range(total_chunks)]
-        
-        for i in range(0, total_chunks, batch_size):
-            batch_chunks = chunks[i:i+batch_size]
-            batch_embeddings = chunk_embeddings[i:i+batch_size]
-            batch_metadata = metadata[i:i+batch_size]
-            
-            for chunk, embedding, meta in zip(batch_chunks, batch_embeddings, batch_metadata):
-                chunk_id = str(uuid.uuid4())  # Generate a unique ID for each chunk
-                self.insert_chunk(index_name, chunk, embedding, chunk_id, meta)
-            
-            logger.info(f"Inserted batch {i//batch_size + 1} ({i+1} to {min(i+batch_size, total_chunks)} of {total_chunks})")
-    
+            metadata = [{} for _ in range(len(chunks))]
+
+        documents = (
+            {
+                "text": chunk,
+                "embedding": embedding,
+                "chunk_id": str(uuid.uuid4()),  # Generate a unique ID for each chunk
+                "metadata": meta or {}
+            }
+            for chunk, embedding, meta in zip(chunks, chunk_embeddings, metadata)
+        )
+        return self.bulk_index_documents(index_name, documents, max_batch_docs=batch_size, workers=workers)
+
+    def bulk_index_documents(self, index_name: str, documents: Iterable[Dict[str, Any]], max_batch_bytes: int = 10 * 1024 * 1024,
+                             max_batch_docs: int = 500, workers: int = 4, max_retries: int = 3,
+                             before_request: Optional[Callable[[], None]] = None) -> Dict[str, int]:
+        """
+        Index documents with parallel _bulk requests, retrying only the items that failed.
+
+        Documents are packed into requests of at most `max_batch_docs` documents and `max_batch_bytes`
+        bytes. Items rejected with a retryable status (429 or 5xx) are resent with jittered backoff,
+        and items that still fail are counted rather than aborting the whole load. The document
+        iterable is consumed lazily, with at most twice `workers` requests pending.
+
+        :param index_name: Name of the index, overrides any `_index` key in the documents
+        :param documents: Documents to index
+        :param max_batch_bytes: Maximum size of a bulk request body
+        :param max_batch_docs: Maximum number of documents per bulk request
+        :param workers: Number of bulk requests in flight
+        :param max_retries: Retries for failed items of a request
+        :param before_request: Called before every bulk request, e.g. to confirm a build lease; an exception it raises aborts the load
+        :return: Summary with the indexed, failed and retried document counts
+        """
+        summary = {"indexed": 0, "failed": 0, "retried": 0}
+        action_line = json.dumps({"index": {"_index": index_name}}) + "\n"
+
+        def _batches() -> Iterator[List[str]]:
+            batch, batch_bytes = [], 0
+            for document in documents:
+                source = {key: value for key, value in document.items() if key != "_index"}
+                action = action_line + json.dumps(source) + "\n"
+                action_bytes = len(action.encode("utf-8"))
+                if batch and (len(batch) >= max_batch_docs or batch_bytes + action_bytes > max_batch_bytes):
+                    yield batch
+                    batch, batch_bytes = [], 0
+                batch.append(action)
+                batch_bytes += action_bytes
+            if batch:
+                yield batch
+
+        def _merge(futures) -> None:
+            for future in futures:
+                for key, count in future.result().items():
+                    summary[key] += count
+
+        workers = max(1, workers)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = set()
+            for batch_no, batch in enumerate(_batches()):
+                pending.add(executor.submit(self._send_bulk, batch, max_retries, before_request))
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    _merge(done)
+                if (batch_no + 1) % 20 == 0:
+                    logger.info(f"Submitted {batch_no + 1} bulk requests to '{index_name}', {summary['indexed']} documents indexed so far")
+            _merge(pending)
+
+        logger.info(f"Bulk indexing into '{index_name}' finished: {summary}")
+        return summary
+
+    def _send_bulk(self, actions: List[str], max_retries: int, before_request: Optional[Callable[[], None]] = None) -> Dict[str, int]:
+        """Send one bulk request and resend only its retryable failures."""
+        result = {"indexed": 0, "failed": 0, "retried": 0}
+        attempt = 0
+        while actions:
+            if before_request is not None:
+                before_request()
+            try:
+                response = self.client.bulk(body="".join(actions))
+            except (ConnectionError, TransportError) as e:
+                status = getattr(e, "status_code", None)
+                retryable = isinstance(e, ConnectionError) or status in RETRYABLE_BULK_STATUSES
+                if not retryable or attempt >= max_retries:
+                    raise
+                retry = actions
+            else:
+                if not response.get("errors"):
+                    result["indexed"] += len(actions)
+                    return result
+                retry = []
+                for action, item in zip(actions, response["items"]):
+                    item_result = next(iter(item.values()))
+                    status = item_result.get("status", 500)
+                    if status < 300:
+                        result["indexed"] += 1
+                    elif status in RETRYABLE_BULK_STATUSES and attempt < max_retries:
+                        retry.append(action)
+                    else:
+                        result["failed"] += 1
+                        logger.error(f"Bulk item failed with status {status}: {item_result.get('error')}")
+            if not retry:
+                return result
+            attempt += 1
+            result["retried"] += len(retry)
+            backoff_time = random.uniform(0, min(30, 2 ** attempt))
+            logger.info(f"Retrying {len(retry)} bulk items (attempt {attempt}/{max_retries}) in {backoff_time:.2f} seconds")
+            time.sleep(backoff_time)
+            actions = retry
+        return result
 
     def print_opensearch_info(self):
         try:
@@ -243,5 +621,6 @@ class OpenSearchVectorDatabase(VectorDatabase):
             logger.error(f"Error creating index: {str(e)}")
             return
     
-        self.batch_insert_chunks(index_name, chunks, chunk_embeddings, metadata)
-        return f"Indexing complete for '{index_name}'!"
\ No newline at end of file
+        summary = self.batch_insert_chunks(index_name, chunks, chunk_embeddings, metadata)
+        logger.info(f"Indexing complete for '{index_name}'!")
+        return {"index_name": index_name, **summary}
\ No newline at end of file
@@ -1,4 +1,4 @@
-from typing import Dict, List, Type, Union
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Type, Union
 from core.chunking import FixedChunker, HierarchicalChunker
 from baseclasses.base_classes import BaseChunker, BaseHierarchicalChunker
 import logging
@@ -42,4 +42,15 @@ class ChunkingProcessor:
     def chunk(self, texts: List[str]) -> Union[List[str], List[List[str]]]:
         """Chunk the input list of text into a single flat list"""
         all_chunks = [chunk for text in texts for chunk in self.chunker.chunk(text)]
-        return all_chunks
\ No newline at end of file
+        return all_chunks
+
+    def chunk_stream(self, texts: Iterable[str]) -> Iterator[Union[str, tuple]]:
+        """Lazily chunk texts one document at a time, yielding chunks as they are produced"""
+        for text in texts:
+            yield from self.chunker.chunk(text)
+
+    def chunk_documents(self, documents: Iterable[Tuple[Any, str]]) -> Iterator[Tuple[Any, Union[str, tuple]]]:
+        """Lazily chunk (source, text) pairs, yielding each chunk with the source of its document"""
+        for source, text in documents:
+            for chunk in self.chunker.chunk(text):
+                yield source, chunk
@@ -1,6 +1,7 @@
-from core.embedding import EmbedderFactory
-from typing import Dict, List, Tuple, Any
+from core.embedding import EmbedderFactory, EmbeddingEngine, create_embedding_cache
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple, Any, Optional
 from config.experimental_config import ExperimentalConfig
+from config.config import get_config
 import logging
 
 logger = logging.getLogger()
@@ -9,22 +10,31 @@ logger.setLevel(logging.INFO)
 class EmbedProcessor:
     """Processor for embedding text chunks."""
 
-    def __init__(self, experimentalConfig : ExperimentalConfig) -> None:
+    def __init__(self, experimentalConfig : ExperimentalConfig, max_workers: Optional[int] = None) -> None:
+        config = get_config()
         self.experimentalConfig = experimentalConfig
         self.embedder = EmbedderFactory.create_embedder(experimentalConfig)
+        self.cache = create_embedding_cache(
+            config,
+            model_id=f"{experimentalConfig.embedding_service}_{experimentalConfig.embedding_model}",
+            dimensions=experimentalConfig.vector_dimension,
+            normalize=True
+        )
+        self.engine = EmbeddingEngine(
+            self.embedder,
+            max_workers=max_workers or config.embedding_max_workers,
+            cache=self.cache
+        )
 
     def embed(self, chunks: List[str]) -> List[Tuple[List[float], str, Dict[Any, Any]]]:
-        """Embed each chunk one by one."""
-        embeddings = []
+        """Embed chunks in concurrent batches, keeping the input order."""
         try:
             dimensions = self.experimentalConfig.vector_dimension 
             normalize = True  # Always normalize
 
-            logger.info(f"Embedding {len(chunks)} chunks with dimensions: {dimensions}.")
-            for idx, chunk in enumerate(chunks):
-                logger.debug(f"Embedding chunk {idx + 1}/{len(chunks)}: {chunk[:50]}...")
-                metadata, embedding = self.embedder.embed(chunk, dimensions=dimensions, normalize=normalize)
-                embeddings.append((embedding, chunk, metadata))  # Append as tuple
+            logger.info(f"Embedding {len(chunks)} chunks with dimensions: {dimensions}, batch size: {self.engine.batch_size}, workers: {self.engine.max_workers}.")
+            results = self.engine.embed(chunks, dimensions=dimensions, normalize=normalize)
+            embeddings = [(embedding, chunk, metadata) for chunk, (metadata, embedding) in zip(chunks, results)]
 
             logger.info("Embedding process completed successfully.")
             return embeddings
@@ -32,14 +42,42 @@ class EmbedProcessor:
             logger.error(f"Error during embedding process: {e}")
             raise
 
+    def embed_stream(self, chunks: Iterable[Any], text_of: Optional[Callable[[Any], str]] = None) -> Iterator[Tuple[List[float], Any, Dict[Any, Any]]]:
+        """
+        Lazily embed a stream of chunks, yielding (embedding, chunk, metadata) in input order.
+
+        `text_of` picks the text to embed from each chunk, e.g. the child text of a hierarchical chunk.
+        """
+        dimensions = self.experimentalConfig.vector_dimension
+        normalize = True  # Always normalize
+
+        logger.info(f"Streaming embeddings with dimensions: {dimensions}, batch size: {self.engine.batch_size}, workers: {self.engine.max_workers}.")
+        try:
+            for chunk, metadata, embedding in self.engine.embed_stream(chunks, dimensions=dimensions, normalize=normalize, text_of=text_of):
+                yield embedding, chunk, metadata
+        except Exception as e:
+            logger.error(f"Error during embedding process: {e}")
+            raise
+
     def embed_text(self, text: str) -> Tuple[Dict[Any, Any], List[float]]:
-        """Embed each chunk one by one."""
+        """Embed a single text, serving it from the embedding cache when possible."""
         try:
             dimensions = self.experimentalConfig.vector_dimension 
             normalize = True  # Always normalize
+            if self.cache is not None:
+                embedding = self.cache.get(text)
+                if embedding is not None:
+                    return {'inputTokens': '0', 'latencyMs': '0'}, embedding
             metadata, embedding = self.embedder.embed(text, dimensions=dimensions, normalize=normalize)
+            if self.cache is not None:
+                self.cache.put(text, embedding)
             logger.info("Embedding text process completed successfully.")
             return metadata, embedding
         except Exception as e:
             logger.error(f"Error during embedding process: {e}")
             raise
+
+    def persist_cache(self) -> None:
+        """Persist newly cached embeddings so later experiments can reuse them."""
+        if self.cache is not None:
+            self.cache.persist()
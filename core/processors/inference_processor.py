@@ -25,3 +25,16 @@ class InferenceProcessor:
         except Exception as e:
             logger.error(f"Error generating text with Inferencer: {str(e)}")
             raise
+
+    async def agenerate_text(self, user_query: str, default_prompt: str, context: List[Dict] = None, **kwargs) -> Tuple[Dict[Any,Any], str]:
+        try:
+            metadata, answer = await self.inferencer.agenerate_text(
+                user_query=user_query,
+                context = context,
+                default_prompt = default_prompt,
+                experiment_config = self.experimentalConfig
+            )
+            return metadata, answer
+        except Exception as e:
+            logger.error(f"Error generating text with Inferencer: {str(e)}")
+            raise
@@ -1,42 +1,57 @@
 import logging
-import boto3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 from config.experimental_config import ExperimentalConfig
 from config.config import Config, get_config
+from util.rate_limiter import RateLimiter
+from util.boto3_clients import get_client
 
 # Set up logging
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.ERROR)
 
 class DocumentReranker:
-    def __init__(self, region, rerank_model_id):
+    def __init__(self, region, rerank_model_id, max_concurrency: int = 8, rate_limiter: Optional[RateLimiter] = None):
         """
         Initialize the DocumentReranker with the AWS region, model ID, and Bedrock agent runtime.
-        
+
+        The reranker is meant to be created once per retrieval run and shared by all question
+        workers. Its client keeps a connection pool sized for `max_concurrency`, and at most that
+        many rerank calls are in flight at once.
+
         Args:
             region (str): The AWS region to use.
-            model_id (str): The model ID to use for reranking.
-            bedrock_agent_runtime (object): The Bedrock agent runtime instance to interact with the API.
+            rerank_model_id (str): The model ID to use for reranking.
+            max_concurrency (int): Maximum number of concurrent rerank calls.
+            rate_limiter (RateLimiter): Optional limiter acquired before every rerank call.
         """
         self.region = region
         self.rerank_model_id = rerank_model_id
-        self.bedrock_agent_runtime = boto3.client('bedrock-agent-runtime', region_name=self.region)
-        
-    def rerank_documents(self, input_prompt, retrieved_documents):
+        self.max_concurrency = max(1, max_concurrency)
+        self.rate_limiter = rate_limiter or RateLimiter(0)
+        self.model_package_arn = f"arn:aws:bedrock:{self.region}::foundation-model/{self.rerank_model_id}"
+        self.bedrock_agent_runtime = get_client('bedrock-agent-runtime', region_name=self.region,
+                                                max_pool_connections=self.max_concurrency)
+        self._in_flight = threading.BoundedSemaphore(self.max_concurrency)
+
+    def rerank_documents(self, input_prompt: str, retrieved_documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         Rerank a list of documents based on a query using Amazon Bedrock's reranking model.
-        
+
         Args:
             input_prompt (str): The query to rerank documents for.
             retrieved_documents (list): The list of documents to be reranked.
-        
+
         Returns:
-            list: A list of reranked documents in order of relevance.
+            list: The documents in order of relevance. Each keeps its original fields, such as
+            `parent_id` and `metadata`, and carries the model's relevance in `rerank_score`.
         """
+        if not retrieved_documents:
+            return []
         try:
-            # Construct the model ARN using the provided model ID
-            model_package_arn = f"arn:aws:bedrock:{self.region}::foundation-model/{self.rerank_model_id}"
             rerank_return_count = len(retrieved_documents)
-            
+
             # Prepare the text sources for the documents (wrap text in a dictionary)
             document_sources = [{
                 "type": "INLINE",
@@ -49,26 +64,27 @@ class DocumentReranker:
             } for doc in retrieved_documents]
 
             # Call the Bedrock API for reranking
-            response = self.bedrock_agent_runtime.rerank(
-                queries=[{
-                    "type": "TEXT",
-                    "textQuery": {"text": input_prompt}
-                }],
-                sources=document_sources,
-                rerankingConfiguration={
-                    "type": "BEDROCK_RERANKING_MODEL",
-                    "bedrockRerankingConfiguration": {
-                        "numberOfResults": rerank_return_count,
-                        "modelConfiguration": {"modelArn": model_package_arn}
+            with self._in_flight, self.rate_limiter:
+                response = self.bedrock_agent_runtime.rerank(
+                    queries=[{
+                        "type": "TEXT",
+                        "textQuery": {"text": input_prompt}
+                    }],
+                    sources=document_sources,
+                    rerankingConfiguration={
+                        "type": "BEDROCK_RERANKING_MODEL",
+                        "bedrockRerankingConfiguration": {
+                            "numberOfResults": rerank_return_count,
+                            "modelConfiguration": {"modelArn": self.model_package_arn}
+                        }
                     }
-                }
-            )
+                )
 
             # Check if 'results' exist in the response and log the structure
             if 'results' not in response:
                 logger.error("Error in rerank response: No results found.")
                 return []
-            
+
             # Create a list to store the reranked documents
             reranked_documents = []
 
@@ -76,7 +92,10 @@ class DocumentReranker:
             for rank, result in enumerate(response['results']):
                 if isinstance(result, dict) and 'index' in result:
                     original_index = result['index']
-                    reranked_documents.append({'text': retrieved_documents[original_index]['text']})
+                    reranked_documents.append({
+                        **retrieved_documents[original_index],
+                        'rerank_score': result.get('relevanceScore')
+                    })
                 else:
                     logger.error(f"Unexpected result format: {result}")
 
@@ -87,4 +106,19 @@ class DocumentReranker:
         except Exception as e:
             # Catch any other unforeseen errors
             logger.error(f"An error occurred: {e}")
-            return []
\ No newline at end of file
+            return []
+
+    def rerank_batch(self, requests: Sequence[Tuple[str, List[Dict[str, Any]]]]) -> List[List[Dict[str, Any]]]:
+        """
+        Rerank the documents of many queries concurrently.
+
+        Args:
+            requests (list): (query, retrieved_documents) pairs.
+
+        Returns:
+            list: The reranked documents of each query, aligned with `requests`.
+        """
+        if not requests:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(requests))) as executor:
+            return list(executor.map(lambda request: self.rerank_documents(*request), requests))
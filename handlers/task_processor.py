@@ -1,15 +1,15 @@
 import os
 import json
-import boto3
 from botocore.exceptions import ClientError
 import logging
+from util.boto3_clients import get_client
 
 logger = logging.getLogger()
 logging.basicConfig(level=logging.INFO)
 
 class FargateTaskProcessor():
     def __init__(self):
-        self.sfn_client = boto3.client('stepfunctions')
+        self.sfn_client = get_client('stepfunctions')
         self.task_token = os.environ.get('TASK_TOKEN')
         event_data = os.environ.get('INPUT_DATA', '{}')
         if isinstance(event_data, str):
@@ -1,16 +1,22 @@
 from core.processors import ChunkingProcessor, EmbedProcessor
-from core.opensearch_vectorstore import OpenSearchVectorDatabase
+from core.opensearch_vectorstore import OpenSearchVectorDatabase, SOURCE_FIELDS_MAPPING
 from util.s3util import S3Util
-from util.pdf_utils import process_pdf_from_folder
+from util.pdf_utils import iter_pdf_documents, iter_pdf_documents_from_bytes
+from util.stream_utils import bounded_prefetch
 import logging
-from typing import Dict, List, Any
-from opensearchpy.helpers import bulk
+from contextlib import nullcontext
+from typing import Callable, ContextManager, Dict, Iterable, Iterator, List, Optional, Tuple, Any
+from urllib.parse import urlparse
 import os
+import shutil
+import tempfile
 import uuid
 import json
 from config.experimental_config import ExperimentalConfig
 from config.config import Config
 from core.dynamodb import DynamoDBOperations
+from core.index_registry import IndexRegistry
+from core.kb_manifest import KnowledgeBaseManifest
 import re
 
 logger = logging.getLogger()
@@ -39,7 +45,20 @@ def clean_text_for_vector_db(text):
     return text.strip()
 
 def chunk_embed_store(config : Config, experimentalConfig : ExperimentalConfig)-> None:
-    """Main function to run the chunking and embedding pipeline."""
+    """
+    Main function to run the chunking and embedding pipeline.
+
+    Documents flow through generator stages (PDF text -> chunks -> embeddings -> bulk index)
+    connected by bounded queues, so extraction, embedding and indexing overlap and only a
+    bounded number of chunks is held in memory at any time.
+
+    When an index registry is configured, the index is built by one experiment only. Other
+    experiments sharing the index wait for that build and skip indexing once it is ready. The
+    builder confirms its lease before every write and stops if another task took the index over.
+
+    With incremental indexing enabled, an index that already holds the knowledge base is only
+    updated with the files that were added, changed or removed since it was last indexed.
+    """
     experiment_dynamodb = DynamoDBOperations(region=config.aws_region, table_name=config.experiment_table)
     logger.info(experiment_dynamodb.table)
     try:
@@ -47,81 +66,236 @@ def chunk_embed_store(config : Config, experimentalConfig : ExperimentalConfig)-
         
         if not experimentalConfig.kb_data:
             raise ValueError("S3 path is missing in the kb_data field.")
-        
-        pdf_folder_path = S3Util().download_directory_from_s3(experimentalConfig.kb_data)
-        
-        # Step 1: Chunking
-        chunks = ChunkingProcessor(experimentalConfig).chunk(process_pdf_from_folder(pdf_folder_path))
-        
-        embed_chunks = chunks
-        if experimentalConfig.chunking_strategy.lower() == 'hierarchical':
-            embed_chunks = []
-            for chunk in chunks:
-                embed_chunks.append(chunk[2]) # Child Chunk only
-
-        # Step 2: Embedding
-        embedding_results = EmbedProcessor(experimentalConfig).embed(embed_chunks)
-
-        total_index_embed_tokens = 0
-        for _, _, metadata in embedding_results:
-            total_index_embed_tokens += int(metadata['inputTokens'])
-
-        if experimentalConfig.chunking_strategy.lower() == 'hierarchical':
-            temp_results = []
-            for i, chunk in enumerate(chunks):
-                temp_embedding = list(embedding_results[i])
-                temp_embedding.extend([chunk[0], chunk[1]])
-                temp_results.append(temp_embedding)
-            embedding_results = temp_results
-            documents = [
-                {
-                    "_index": experimentalConfig.index_id,
-                    "execution_id":experimentalConfig.execution_id,
-                    "chunk_id": str(uuid.uuid4()),  # Generate a unique UUID for each chunk
-                    "text": clean_text_for_vector_db(parent_chunk),
-                    "child_text": clean_text_for_vector_db(chunk),
-                    "parent_id": parent_id,
-                    config.vector_field: embedding,
-                    "metadata": metadata  # Optional metadata, defaulting to an empty dictionary
-                }
-                for embedding, chunk, metadata, parent_id, parent_chunk in embedding_results  # Enumerate is unnecessary since UUIDs are used
-            ]
+
+        vector_database = OpenSearchVectorDatabase(host=config.opensearch_host, is_serverless=config.opensearch_serverless, region=config.aws_region,username=config.opensearch_username,
+            password=config.opensearch_password)
+
+        index_id = experimentalConfig.index_id
+        owner = experimentalConfig.experiment_id
+        registry = None
+        if config.index_registry_table:
+            registry = IndexRegistry(config.index_registry_table, config.aws_region, lease_seconds=config.index_registry_lease_seconds)
+            kb_fingerprint = S3Util().fingerprint_s3_prefix(experimentalConfig.kb_data)
+            ready_entry = registry.acquire_or_wait(index_id, kb_fingerprint, owner, timeout=config.index_registry_wait_timeout)
+            if ready_entry is not None:
+                logger.info(f"Experiment {experimentalConfig.experiment_id} reuses index {index_id}, skipping indexing")
+                _update_index_embed_tokens(experiment_dynamodb, experimentalConfig, 0)
+                return
+
+        if registry is None:
+            if config.incremental_indexing:
+                doc_count, total_index_embed_tokens = _update_index(config, experimentalConfig, vector_database)
+            else:
+                doc_count, total_index_embed_tokens = _build_index(config, experimentalConfig, vector_database)
         else:
-            documents = [
-                {
-                    "_index": experimentalConfig.index_id,
-                    "execution_id":experimentalConfig.execution_id,
-                    "chunk_id": str(uuid.uuid4()),  # Generate a unique UUID for each chunk
-                    "text": clean_text_for_vector_db(chunk),
-                    config.vector_field: embedding,
-                    "metadata": metadata  # Optional metadata, defaulting to an empty dictionary
-                }
-                for embedding, chunk, metadata in embedding_results  # Enumerate is unnecessary since UUIDs are used
-            ]
-
-        logger.info(f"Experiment {experimentalConfig.experiment_id} Indexing Embed Tokens : {total_index_embed_tokens}")
-
-        experiment_dynamodb.update_item(
-                    key={'id': experimentalConfig.experiment_id},
-                    update_expression="SET index_embed_tokens = :embed",
-                    expression_values={':embed': total_index_embed_tokens}
-                )
-        
-        _insert_to_opensearch(config, documents)
+            try:
+                with registry.hold_lease(index_id, owner) as lease:
+                    if config.incremental_indexing:
+                        # Chunks of an earlier build are kept, only the files that changed since are re-indexed
+                        doc_count, total_index_embed_tokens = _update_index(config, experimentalConfig, vector_database,
+                                                                            before_write=lease.check)
+                    else:
+                        if vector_database.index_exists(index_id) and vector_database.document_count(index_id) > 0:
+                            # Left over from a failed or abandoned build, clear it so documents are not duplicated
+                            lease.check()
+                            deleted = vector_database.delete_all_documents(index_id)
+                            logger.info(f"Removed {deleted} documents of a previous incomplete build from index {index_id}")
+                        doc_count, total_index_embed_tokens = _build_index(config, experimentalConfig, vector_database,
+                                                                           before_write=lease.check)
+            except Exception:
+                registry.mark_failed(index_id, owner)
+                raise
+            registry.mark_ready(index_id, owner, doc_count)
+
+        _update_index_embed_tokens(experiment_dynamodb, experimentalConfig, total_index_embed_tokens)
+        logger.info("Pipeline completed successfully.")
     except Exception as e:
         logger.exception(f"Pipeline failed: {e}")
         raise e
-    
-def _insert_to_opensearch(config: Config, documents: List[Dict[str, Any]]):
-    vector_database = OpenSearchVectorDatabase(host=config.opensearch_host, is_serverless=config.opensearch_serverless, region=config.aws_region,username=config.opensearch_username,
-        password=config.opensearch_password)
-    chunks_length = len(documents)
-    chunk_size = 500 # Default chunk size streaming by Opensearch
-    if chunks_length < chunk_size:
-        chunk_size = chunks_length
-    logger.info(f"Opensearch Bulk insert initiated")
-    bulk(vector_database.client, documents, chunk_size=chunk_size, max_retries=1)
-    logger.info("Opensearch Bulk insert successful \n Pipeline completed successfully.")
 
+def _build_index(config: Config, experimentalConfig: ExperimentalConfig, vector_database: OpenSearchVectorDatabase,
+                 before_write: Optional[Callable[[], None]] = None) -> Tuple[int, int]:
+    """
+    Chunk, embed and index the knowledge base, returning the number of indexed documents and embed tokens.
+
+    `before_write` is called before every write to the index and aborts the build by raising.
+    """
+    bucket = urlparse(experimentalConfig.kb_data).netloc
+    objects = S3Util().list_pdf_objects(experimentalConfig.kb_data)
+
+    # Step 1: Chunking, one document at a time
+    texts = bounded_prefetch((text for _, text in _iter_kb_documents(config, bucket, sorted(objects))), maxsize=2)
+    chunks = bounded_prefetch(ChunkingProcessor(experimentalConfig).chunk_stream(texts), maxsize=config.indexing_queue_size)
+    return _embed_and_index(config, experimentalConfig, vector_database, chunks, before_write=before_write)
+
+def _update_index(config: Config, experimentalConfig: ExperimentalConfig, vector_database: OpenSearchVectorDatabase,
+                  before_write: Optional[Callable[[], None]] = None) -> Tuple[int, int]:
+    """
+    Bring the index up to date with the knowledge base, returning the number of documents in the index and embed tokens.
+
+    Every chunk is tagged with the S3 key and ETag of its file, and a manifest of the indexed
+    (key, ETag, size) versions and their chunk ids is kept in S3. Only new and changed files are
+    downloaded, chunked and embedded; the chunks of changed and removed files are deleted by query.
+    Without a manifest matching the index, the index is cleared and rebuilt the same way.
+    `before_write` is called before every write to the index and aborts the update by raising.
+    """
+    before_write = before_write or (lambda: None)
+    index_id = experimentalConfig.index_id
+    bucket = urlparse(experimentalConfig.kb_data).netloc
+    objects = S3Util().list_pdf_objects(experimentalConfig.kb_data)
+    manifest_key = f"{config.index_manifest_s3_prefix.strip('/')}/{index_id}.json"
+    manifest = KnowledgeBaseManifest.load(config.s3_bucket, manifest_key)
+    vector_database.update_index(index_id, {"properties": SOURCE_FIELDS_MAPPING})
 
+    indexed_count = vector_database.document_count(index_id)
+    rebuild = manifest is None or not manifest.entries
+    if manifest is None:
+        manifest = KnowledgeBaseManifest(config.s3_bucket, manifest_key)
+        if indexed_count > 0:
+            # Built before incremental indexing was enabled, its chunks cannot be traced back to their files
+            before_write()
+            deleted = vector_database.delete_all_documents(index_id)
+            logger.info(f"Index {index_id} has no manifest, removed its {deleted} documents to rebuild it")
+    elif manifest.entries and indexed_count == 0:
+        logger.info(f"Index {index_id} is empty, ignoring its manifest of {len(manifest.entries)} files")
+        manifest.entries = {}
+        rebuild = True
+
+    diff = manifest.diff(objects)
+    logger.info(f"Incremental indexing of {index_id}: {diff}")
+
+    # Chunks of added files are cleared too, an interrupted run may have indexed part of them
+    stale_keys = diff.to_delete + diff.added
+    if stale_keys and indexed_count > 0:
+        before_write()
+        deleted = vector_database.delete_documents_by_terms(index_id, 'source_key', stale_keys)
+        logger.info(f"Removed {deleted} stale documents of {len(stale_keys)} files from index {index_id}")
+    for key in diff.removed:
+        manifest.forget(key)
+
+    total_index_embed_tokens = 0
+    if diff.to_index:
+        texts = bounded_prefetch(_iter_kb_documents(config, bucket, diff.to_index), maxsize=2)
+        chunks = bounded_prefetch(ChunkingProcessor(experimentalConfig).chunk_documents(texts), maxsize=config.indexing_queue_size)
+        chunk_ids = {key: [] for key in diff.to_index}
+        _, total_index_embed_tokens = _embed_and_index(config, experimentalConfig, vector_database, chunks,
+                                                       sources=objects, chunk_ids=chunk_ids, bulk_load=rebuild,
+                                                       before_write=before_write)
+        for key in diff.to_index:
+            manifest.record(key, objects[key]['etag'], objects[key]['size'], chunk_ids[key])
+
+    # Saved last, so a failed run is redone from the previous complete state
+    before_write()
+    manifest.save()
+    return vector_database.document_count(index_id), total_index_embed_tokens
+
+def _iter_kb_documents(config: Config, bucket: str, keys: List[str]) -> Iterator[Tuple[str, str]]:
+    """
+    Extract the text of knowledge base files, yielding (S3 key, text) pairs.
+
+    Files are either streamed from S3 straight into extraction or downloaded concurrently to a
+    scratch folder that is removed afterwards.
+    """
+    s3_util = S3Util()
+    extraction = {'backend': config.pdf_extractor_backend, 'max_workers': config.pdf_extraction_workers or None}
+    if config.kb_streaming_extraction:
+        bodies = s3_util.iter_object_bodies(bucket, keys, max_workers=config.s3_download_workers,
+                                            multipart_threshold_mb=config.s3_multipart_threshold_mb)
+        yield from iter_pdf_documents_from_bytes(bodies, spill_bytes=config.kb_streaming_spill_mb * 1024 * 1024,
+                                                 max_inflight_bytes=config.kb_streaming_inflight_mb * 1024 * 1024,
+                                                 **extraction)
+        return
+
+    download_dir = tempfile.mkdtemp(prefix='kb_')
+    try:
+        local_files = s3_util.download_objects(bucket, keys, download_dir, max_workers=config.s3_download_workers,
+                                               multipart_threshold_mb=config.s3_multipart_threshold_mb)
+        key_of = {path: key for key, path in local_files.items()}
+        for path, text in iter_pdf_documents(list(local_files.values()), **extraction):
+            yield key_of[path], text
+    finally:
+        shutil.rmtree(download_dir, ignore_errors=True)
+
+def _embed_and_index(config: Config, experimentalConfig: ExperimentalConfig, vector_database: OpenSearchVectorDatabase, chunks: Iterable[Any],
+                     sources: Optional[Dict[str, Dict[str, Any]]] = None, chunk_ids: Optional[Dict[str, List[str]]] = None,
+                     bulk_load: bool = True, before_write: Optional[Callable[[], None]] = None) -> Tuple[int, int]:
+    """Embed and index a stream of chunks, or of (S3 key, chunk) pairs when `sources` is given."""
+    # Step 2: Embedding, only the child chunk is embedded for hierarchical chunking
+    is_hierarchical = experimentalConfig.chunking_strategy.lower() == 'hierarchical'
+    if sources is None:
+        text_of = (lambda chunk: chunk[2]) if is_hierarchical else None
+    else:
+        text_of = (lambda item: item[1][2]) if is_hierarchical else (lambda item: item[1])
+    embed_processor = EmbedProcessor(experimentalConfig)
+    embedding_results = embed_processor.embed_stream(chunks, text_of=text_of)
+
+    # Step 3: Indexing, consuming documents as soon as they are embedded
+    token_counter = {'index_embed_tokens': 0}
+    documents = _build_documents(config, experimentalConfig, embedding_results, is_hierarchical, token_counter,
+                                 sources=sources, chunk_ids=chunk_ids)
+    with _ingest_mode(config, vector_database, experimentalConfig.index_id) if bulk_load else nullcontext():
+        doc_count = _insert_to_opensearch(config, vector_database, experimentalConfig.index_id, documents, before_write=before_write)
+    embed_processor.persist_cache()
+
+    return doc_count, token_counter['index_embed_tokens']
+
+def _ingest_mode(config: Config, vector_database: OpenSearchVectorDatabase, index_name: str) -> ContextManager:
+    """Bulk-load tuning for the ingest when enabled, so the index is refreshed, merged and warm before it is marked ready."""
+    if config.opensearch_bulk_load_mode and vector_database.index_exists(index_name):
+        return vector_database.bulk_load(index_name, force_merge_segments=config.opensearch_force_merge_segments,
+                                         warmup=config.opensearch_knn_warmup)
+    return nullcontext()
+
+def _update_index_embed_tokens(experiment_dynamodb: DynamoDBOperations, experimentalConfig: ExperimentalConfig, total_index_embed_tokens: int) -> None:
+    logger.info(f"Experiment {experimentalConfig.experiment_id} Indexing Embed Tokens : {total_index_embed_tokens}")
+    experiment_dynamodb.update_item(
+                key={'id': experimentalConfig.experiment_id},
+                update_expression="SET index_embed_tokens = :embed",
+                expression_values={':embed': total_index_embed_tokens}
+            )
+
+def _build_documents(config: Config, experimentalConfig: ExperimentalConfig, embedding_results: Iterable[Tuple[List[float], Any, Dict[Any, Any]]],
+                     is_hierarchical: bool, token_counter: Dict[str, int], sources: Optional[Dict[str, Dict[str, Any]]] = None,
+                     chunk_ids: Optional[Dict[str, List[str]]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Turn embedding results into OpenSearch bulk actions, accumulating embed tokens into `token_counter`.
+
+    When `sources` is given, each chunk comes as an (S3 key, chunk) pair: the document is tagged with
+    the key and ETag of its file and its chunk id is appended to `chunk_ids[key]`.
+    """
+    for embedding, chunk, metadata in embedding_results:
+        token_counter['index_embed_tokens'] += int(metadata['inputTokens'])
+        document = {
+            "_index": experimentalConfig.index_id,
+            "execution_id":experimentalConfig.execution_id,
+            "chunk_id": str(uuid.uuid4()),  # Generate a unique UUID for each chunk
+        }
+        if sources is not None:
+            source_key, chunk = chunk
+            document["source_key"] = source_key
+            document["source_etag"] = sources[source_key]['etag']
+            chunk_ids[source_key].append(document["chunk_id"])
+        if is_hierarchical:
+            parent_id, parent_chunk, child_chunk = chunk
+            document["text"] = clean_text_for_vector_db(parent_chunk)
+            document["child_text"] = clean_text_for_vector_db(child_chunk)
+            document["parent_id"] = parent_id
+        else:
+            document["text"] = clean_text_for_vector_db(chunk)
+        document[config.vector_field] = embedding
+        document["metadata"] = metadata  # Optional metadata, defaulting to an empty dictionary
+        yield document
 
+def _insert_to_opensearch(config: Config, vector_database: OpenSearchVectorDatabase, index_name: str, documents: Iterable[Dict[str, Any]],
+                          before_write: Optional[Callable[[], None]] = None) -> int:
+    logger.info(f"Opensearch Bulk insert initiated with {config.opensearch_bulk_threads} threads, chunk size {config.opensearch_bulk_chunk_size}")
+    # Documents are pulled lazily with a bounded number of requests in flight, so slow indexing applies backpressure to embedding
+    summary = vector_database.bulk_index_documents(
+        index_name, documents,
+        max_batch_docs=config.opensearch_bulk_chunk_size, workers=config.opensearch_bulk_threads,
+        before_request=before_write
+    )
+    if summary['failed']:
+        raise RuntimeError(f"Opensearch Bulk insert failed for {summary['failed']} documents: {summary}")
+    logger.info(f"Opensearch Bulk insert successful, {summary['indexed']} documents indexed")
+    return summary['indexed']
@@ -1,6 +1,7 @@
 import os
 import boto3
-from utils import read_csv_from_s3, parse_datetime
+from utils import parse_datetime
+from price_book import get_price_book
 from datetime import datetime
 import math
 import logging
@@ -33,12 +34,8 @@ def compute_actual_price_breakdown(
         logger.error(f"Missing required parameters: {', '.join(input_missing)}.")
         return None
 
-    try:
-        # Read pricing data from S3
-        df = read_csv_from_s3(BEDROCK_CSV_PATH, S3_BUCKET)
-    except Exception as e:
-        logger.error(f"Error reading the CSV file from S3: {e}")
-        return None
+    # Prices are loaded once per container and revalidated against the sheet's ETag
+    price_book = get_price_book()
 
     try:
         aws_region = configuration.get("config", {}).get("region", "")
@@ -82,11 +79,11 @@ def compute_actual_price_breakdown(
             indexing_metadata['model'] = embedding_model
             indexing_metadata['service'] = embedding_service
             if embedding_service == "bedrock" :
-                embedding_model_price = df[(df["model"] == embedding_model) & (df["Region"] == aws_region)]["input_price"]
-                if embedding_model_price.empty:
+                embedding_model_prices = price_book.get(embedding_model, aws_region)
+                if embedding_model_prices is None:
                     logger.error(f"No embedding model {embedding_model} price found.")
                     return None
-                embedding_model_price = float(embedding_model_price.values[0])  # Price per 1000 tokens
+                embedding_model_price = embedding_model_prices.input_price  # Price per 1000 tokens
                 indexing_cost = (embedding_model_price * float(index_embed_tokens)) / THOUSAND
                 indexing_metadata['knowledge_base_tokens'] = index_embed_tokens
                 indexing_metadata['bedrock_cost'] = indexing_cost
@@ -110,23 +107,18 @@ def compute_actual_price_breakdown(
 
             reranking_cost = 0
 
-            retrieval_model_input_price = df[
-                (df["model"] == retrieval_model) & (df["Region"] == aws_region)
-            ]["input_price"]
-            retrieval_model_output_price = df[
-                (df["model"] == retrieval_model) & (df["Region"] == aws_region)
-            ]["output_price"]
+            retrieval_model_prices = price_book.get(retrieval_model, aws_region)
 
-            if retrieval_model_input_price.empty:
+            if retrieval_model_prices is None:
                 logger.error(f"No retrieval model {retrieval_model} input price found.")
                 return None
             
-            if retrieval_model_output_price.empty:
+            if retrieval_model_prices.output_price is None:
                 logger.error(f"No retrieval model {retrieval_model} output price found.")
                 return None
             
-            retrieval_model_input_price = float(retrieval_model_input_price.values[0])  # Price per million tokens
-            retrieval_model_output_price = float(retrieval_model_output_price.values[0])  # Price per million tokens
+            retrieval_model_input_price = retrieval_model_prices.input_price  # Price per million tokens
+            retrieval_model_output_price = retrieval_model_prices.output_price  # Price per million tokens
             # Calculate costs
             
             retrieval_model_input_actual_cost = (retrieval_model_input_price * float(input_tokens)) / MILLION
@@ -140,11 +132,11 @@ def compute_actual_price_breakdown(
             if rerank_model_id and rerank_model_id != "none" :
                 retriever_metadata['rerank_model'] = rerank_model_id
                 retriever_metadata['reranker_queries'] = question_details["reranker_queries"]
-                reranker_model_price = df[(df["model"] == rerank_model_id) & (df["Region"] == aws_region)]["input_price"]
-                if reranker_model_price.empty:
+                reranker_model_prices = price_book.get(rerank_model_id, aws_region)
+                if reranker_model_prices is None:
                     logger.error(f"No reranker model {rerank_model_id} price found.")
                     return None
-                reranker_model_price = float(reranker_model_price.values[0])  # Price per 1000 queries
+                reranker_model_price = reranker_model_prices.input_price  # Price per 1000 queries
                 reranking_cost = (reranker_model_price * float(question_details['reranker_queries'])) / THOUSAND
                 retriever_metadata['reranking_cost'] = reranking_cost
                 retrieval_cost += reranking_cost
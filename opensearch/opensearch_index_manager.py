@@ -2,7 +2,7 @@ from typing import Dict, Any, List, Optional
 import logging
 
 from config.config import Config
-from core.opensearch_vectorstore import OpenSearchVectorDatabase
+from core.opensearch_vectorstore import OpenSearchVectorDatabase, SOURCE_FIELDS_MAPPING
 from dataclasses import dataclass
 from util.dynamo_utils import deserialize_dynamodb_json
 
@@ -87,7 +87,8 @@ class OpenSearchIndexManager:
                 },
                 "text": {
                     "type": "text"
-                }
+                },
+                **SOURCE_FIELDS_MAPPING
             }
         }
 
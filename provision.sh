@@ -126,9 +126,7 @@ build_and_push_images() {
     docker build --platform linux/amd64 -t ${account_id}.dkr.ecr."$region".amazonaws.com/flotorch-runtime-"$suffix":latest -f opensearch/opensearch.Dockerfile --push .
 
     # Build cost compute image
-    cd lambda_handlers
-    docker build --platform linux/amd64 -t ${account_id}.dkr.ecr."$region".amazonaws.com/flotorch-costcompute-"$suffix":latest -f cost_handler/Dockerfile --push .
-    cd ..
+    docker build --platform linux/amd64 -t ${account_id}.dkr.ecr."$region".amazonaws.com/flotorch-costcompute-"$suffix":latest -f lambda_handlers/cost_handler/Dockerfile --push .
 
     echo "Docker images updated successfully"
 }
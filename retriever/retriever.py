@@ -5,12 +5,18 @@ from config.experimental_config import ExperimentalConfig
 from util.s3util import S3Util
 from baseclasses.base_classes import ExperimentQuestionMetrics
 from core.dynamodb import DynamoDBOperations
+from core.dynamodb_batch_writer import DynamoDBBatchWriter
 from config.config import Config, get_config
 from core.processors import EmbedProcessor
 from core.processors import InferenceProcessor
 from core.rerank.rerank import DocumentReranker
 from core.knowledgebase_vectorstore import KnowledgeBaseVectorDatabase
+import asyncio
 import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from util.rate_limiter import ServiceRateLimits
+from util.boto3_clients import close_async_clients
 
 import boto3, json, uuid
 from core.inference.inference_factory import InferencerFactory
@@ -60,13 +66,14 @@ def retrieve(config: Config, experimentalConfig: ExperimentalConfig) -> None:
             retrieval_query_embed_tokens,
             retrieval_input_tokens,
             retrieval_output_tokens,
-        ) = process_questions(
-            gt_data=gt_data,
-            components=components,
-            config=config,
-            experimentalConfig=experimentalConfig,
+        ) = (
+            asyncio.run(aprocess_questions(gt_data=gt_data, components=components, config=config, experimentalConfig=experimentalConfig))
+            if config.retrieval_async_mode
+            else process_questions(gt_data=gt_data, components=components, config=config, experimentalConfig=experimentalConfig)
         )
 
+        if components["embed_processor"] is not None:
+            components["embed_processor"].persist_cache()
 
         components['experiment_dynamodb'].update_item(
             key={"id": experimentalConfig.experiment_id},
@@ -116,6 +123,25 @@ def initialize_components(config: Config, experimentalConfig: ExperimentalConfig
                     password=config.opensearch_password
                 )
         
+        rate_limits = ServiceRateLimits({
+            "embedding": config.retrieval_embedding_rps,
+            "opensearch": config.retrieval_opensearch_rps,
+            "rerank": config.retrieval_rerank_rps,
+            "inference": config.retrieval_inference_rps,
+            "guardrails": config.retrieval_guardrails_rps
+        })
+
+        # Initialize the reranker once, its client and connection pool are shared by all question workers
+        reranker = None
+        if experimentalConfig.knowledge_base and experimentalConfig.rerank_model_id and experimentalConfig.rerank_model_id.lower() != 'none':
+            logger.info(f"Initializing reranker {experimentalConfig.rerank_model_id}")
+            reranker = DocumentReranker(
+                region=experimentalConfig.aws_region,
+                rerank_model_id=experimentalConfig.rerank_model_id,
+                max_concurrency=config.retrieval_max_workers,
+                rate_limiter=rate_limits["rerank"]
+            )
+
         # Initialize DynamoDB connections
         logger.info("Initializing DynamoDB connections")
         metrics_dynamodb = DynamoDBOperations(
@@ -132,7 +158,9 @@ def initialize_components(config: Config, experimentalConfig: ExperimentalConfig
             "inference_processor": inference_processor,
             "vector_database": vector_database,
             "metrics_dynamodb": metrics_dynamodb,
-            "experiment_dynamodb": experiment_dynamodb
+            "experiment_dynamodb": experiment_dynamodb,
+            "reranker": reranker,
+            "rate_limits": rate_limits
         }
         
     except Exception as e:
@@ -180,51 +208,194 @@ def process_questions(
     config: Config,
     experimentalConfig: ExperimentalConfig,
 ) -> Tuple[int, int, int]:
-    """Process questions and store results in DynamoDB."""
-    batch_items = []
-    logger.info(f"Processing {len(gt_data)} questions from ground truth data")
+    """
+    Process questions concurrently and store results in DynamoDB.
+
+    Questions run on a pool of `retrieval_max_workers` threads, with each downstream service
+    throttled by its own rate limiter. Results are consumed in question order and handed to a
+    background batch writer, so DynamoDB writes overlap with the model calls of later questions.
+    """
+    max_workers = max(1, config.retrieval_max_workers)
+    logger.info(f"Processing {len(gt_data)} questions from ground truth data with {max_workers} workers")
 
     retrieval_query_embed_tokens = 0
     retrieval_input_tokens = 0
     retrieval_output_tokens = 0
 
     logger.info(f"Rerank model id for experiment {experimentalConfig.experiment_id}: {experimentalConfig.rerank_model_id}")
-    for idx, item in enumerate(gt_data):
-        try:
-            question = item["question"]
-            logger.debug(f"Processing question {idx+1}: {question}")
-
-            # Generate embeddings
-            if experimentalConfig.bedrock_knowledge_base or not experimentalConfig.knowledge_base:
-                query_metadata, query_embedding = {'inputTokens': '0', 'latencyMs': '0'}, None                
+    process = partial(_process_question, components=components, config=config, experimentalConfig=experimentalConfig)
+
+    block_mode, block_size = _retrieval_blocks(gt_data, components, config, experimentalConfig)
+
+    with _metrics_writer(components, config) as writer, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for start in range(0, len(gt_data), block_size):
+            block = gt_data[start:start + block_size]
+            if block_mode:
+                prefetched = _prefetch_block(block, start, components, config, experimentalConfig)
             else:
-                logger.info("Generating embeddings for the question using provided embedder")
-                query_metadata, query_embedding = components["embed_processor"].embed_text(
-                    question
-                )
-                
-            query_results=None
-            guardrail_input_assessment = None
-            guardrail_output_assessment = None
-            guardrail_context_assessment = None
-            guardrail_id = None
-            guardrail_blocked = None
-
-            answer_metadata = {}
-            answer = ""
-
-            # Retrieval query embed is not provided by knowledge base
-            retrieval_query_embed_tokens += int(query_metadata.get("inputTokens", 0) if query_embedding else 0)
-
-            #Apply Guardrails
-            if experimentalConfig.enable_guardrails:
-                logger.info("Applying guardrails")
-                guardrail_id = components['guardrails']['id']
-                guardrail_blocked = 'NONE'
-                query_results = None
-
-                # Apply INPUT guardrails
-                if experimentalConfig.enable_prompt_guardrails:
+                prefetched = [None] * len(block)
+
+            for dynamo_item, (embed_tokens, input_tokens, output_tokens) in executor.map(process, range(start, start + len(block)), block, prefetched):
+                retrieval_query_embed_tokens += embed_tokens
+                retrieval_input_tokens += input_tokens
+                retrieval_output_tokens += output_tokens
+                writer.put(dynamo_item)
+
+    logger.info(f"Experiment {experimentalConfig.experiment_id} Retrieval Tokens : \n Query Embed Tokens : {retrieval_query_embed_tokens} \n Input Tokens : {retrieval_input_tokens} \n Output Tokens : {retrieval_output_tokens}")
+    return (retrieval_query_embed_tokens, retrieval_input_tokens, retrieval_output_tokens)
+
+async def aprocess_questions(
+    gt_data: List[Dict],
+    components: Dict[str, Any],
+    config: Config,
+    experimentalConfig: ExperimentalConfig,
+) -> Tuple[int, int, int]:
+    """
+    Coroutine version of `process_questions`.
+
+    Up to `retrieval_async_concurrency` questions are in flight at once, each awaiting its
+    generation instead of occupying a pool thread. Items are handed to a background batch writer in question order.
+    """
+    semaphore = asyncio.Semaphore(max(1, config.retrieval_async_concurrency))
+    logger.info(f"Processing {len(gt_data)} questions from ground truth data with up to {config.retrieval_async_concurrency} concurrent questions")
+
+    retrieval_query_embed_tokens = 0
+    retrieval_input_tokens = 0
+    retrieval_output_tokens = 0
+
+    async def process(idx: int, item: Dict, prefetched: Optional[Dict[str, Any]]) -> Tuple[Dict, Tuple[int, int, int]]:
+        async with semaphore:
+            return await _aprocess_question(idx, item, prefetched, components=components, config=config, experimentalConfig=experimentalConfig)
+
+    block_mode, block_size = _retrieval_blocks(gt_data, components, config, experimentalConfig)
+    writer = _metrics_writer(components, config)
+    try:
+        for start in range(0, len(gt_data), block_size):
+            block = gt_data[start:start + block_size]
+            if block_mode:
+                prefetched = await asyncio.to_thread(_prefetch_block, block, start, components, config, experimentalConfig)
+            else:
+                prefetched = [None] * len(block)
+
+            results = await asyncio.gather(*(process(start + offset, item, prefetch) for offset, (item, prefetch) in enumerate(zip(block, prefetched))))
+            for dynamo_item, (embed_tokens, input_tokens, output_tokens) in results:
+                retrieval_query_embed_tokens += embed_tokens
+                retrieval_input_tokens += input_tokens
+                retrieval_output_tokens += output_tokens
+                writer.put(dynamo_item)
+    except BaseException as e:
+        # Closing waits for the writer threads, keep it off the event loop
+        await asyncio.to_thread(writer.__exit__, type(e), e, e.__traceback__)
+        raise
+    finally:
+        # The async clients of the inferencers belong to this event loop, which ends with this run
+        await close_async_clients()
+    await asyncio.to_thread(writer.close)
+    logger.info(f"Experiment {experimentalConfig.experiment_id} Retrieval Tokens : \n Query Embed Tokens : {retrieval_query_embed_tokens} \n Input Tokens : {retrieval_input_tokens} \n Output Tokens : {retrieval_output_tokens}")
+    return (retrieval_query_embed_tokens, retrieval_input_tokens, retrieval_output_tokens)
+
+def _retrieval_blocks(gt_data: List[Dict], components: Dict[str, Any], config: Config,
+                      experimentalConfig: ExperimentalConfig) -> Tuple[bool, int]:
+    """Return whether block retrieval applies and the number of questions per block."""
+    # In block mode, a block of questions is embedded and searched together before answering
+    block_mode = (
+        config.retrieval_block_size > 0
+        and experimentalConfig.knowledge_base
+        and isinstance(components["vector_database"], OpenSearchVectorDatabase)
+    )
+    return block_mode, config.retrieval_block_size if block_mode else max(1, len(gt_data))
+
+def _prefetch_block(
+    block: List[Dict],
+    start: int,
+    components: Dict[str, Any],
+    config: Config,
+    experimentalConfig: ExperimentalConfig,
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    Embed a block of questions in batches and run their kNN queries in one _msearch round-trip.
+
+    Hits are de-duplicated and, if configured, reranked for the whole block concurrently.
+    Returns one entry per question with its query metadata, embedding and final search results. If the
+    block cannot be prefetched, every entry is None and questions fall back to per-question retrieval.
+    """
+    limits = components["rate_limits"]
+    try:
+        questions = [item["question"] for item in block]
+        with limits["embedding"]:
+            embeddings = components["embed_processor"].embed(questions)
+        query_vectors = [embedding for embedding, _, _ in embeddings]
+        with limits["opensearch"]:
+            hits = components["vector_database"].batch_search(
+                experimentalConfig.index_id, query_vectors, experimentalConfig.knn_num,
+                batch_size=config.opensearch_msearch_batch_size
+            )
+        if experimentalConfig.chunking_strategy.lower() == 'hierarchical':
+            hits = [__duplicate_removal_for_heirarchical_config(query_hits) for query_hits in hits]
+        if components.get("reranker") is not None:
+            start_time = time.time()
+            hits = components["reranker"].rerank_batch(list(zip(questions, hits)))
+            logger.info(f"Reranking for questions {start+1}-{start+len(block)} took {time.time() - start_time:.2f} seconds")
+        return [
+            {"query_metadata": metadata, "query_embedding": embedding, "query_results": query_hits}
+            for (embedding, _, metadata), query_hits in zip(embeddings, hits)
+        ]
+    except Exception as e:
+        logger.warning(f"Prefetch of questions {start+1}-{start+len(block)} failed, falling back to per-question retrieval: {str(e)}")
+        return [None] * len(block)
+
+def _process_question(
+    idx: int,
+    item: Dict,
+    prefetched: Optional[Dict[str, Any]] = None,
+    *,
+    components: Dict[str, Any],
+    config: Config,
+    experimentalConfig: ExperimentalConfig,
+) -> Tuple[Dict, Tuple[int, int, int]]:
+    """
+    Answer a single question and build its metrics item.
+
+    Errors are isolated to the question: a failing question yields an empty answer.
+    `prefetched` carries the embedding and search hits computed by block retrieval, if any.
+
+    Returns:
+        Tuple of (DynamoDB item, (query embed tokens, input tokens, output tokens))
+    """
+    limits = components["rate_limits"]
+    question = item.get("question")
+    embed_tokens = 0
+    input_tokens = 0
+    output_tokens = 0
+    try:
+        logger.debug(f"Processing question {idx+1}: {question}")
+
+        # Generate embeddings
+        query_metadata, query_embedding, prefetched_results = _embed_question(question, prefetched, components, experimentalConfig)
+            
+        query_results=None
+        guardrail_input_assessment = None
+        guardrail_output_assessment = None
+        guardrail_context_assessment = None
+        guardrail_id = None
+        guardrail_blocked = None
+
+        answer_metadata = {}
+        answer = ""
+
+        # Retrieval query embed is not provided by knowledge base
+        embed_tokens = int(query_metadata.get("inputTokens", 0) if query_embedding else 0)
+
+        #Apply Guardrails
+        if experimentalConfig.enable_guardrails:
+            logger.info("Applying guardrails")
+            guardrail_id = components['guardrails']['id']
+            guardrail_blocked = 'NONE'
+            query_results = None
+
+            # Apply INPUT guardrails
+            if experimentalConfig.enable_prompt_guardrails:
+                with limits["guardrails"]:
                     blocked, modified_question, guardrail_input_assessment = apply_guardrail_check(
                         components,
                         guardrail_id,
@@ -232,33 +403,19 @@ def process_questions(
                         source='INPUT',
                         log_prefix="Question"
                     )
-                    if blocked:
-                        answer = modified_question
-                        guardrail_blocked = 'INPUT'
-
-                # Apply CONTEXT guardrails if not already blocked
-                if experimentalConfig.enable_context_guardrails and guardrail_blocked == 'NONE':
-                    if experimentalConfig.knowledge_base:
-                        # Search for relevant context once
-                        if isinstance(components["vector_database"], OpenSearchVectorDatabase):
-                            query_results = components["vector_database"].search(
-                                experimentalConfig.index_id, query_embedding, experimentalConfig.knn_num
-                            )
-                        elif isinstance(components["vector_database"], KnowledgeBaseVectorDatabase):
-                            query_results = components["vector_database"].search(
-                                question, experimentalConfig.kb_data, experimentalConfig.knn_num
-                            )
-
-                        if experimentalConfig.chunking_strategy.lower() == 'hierarchical':
-                            query_results = __duplicate_removal_for_heirarchical_config(query_results)
-
-                        if experimentalConfig.rerank_model_id and experimentalConfig.rerank_model_id.lower() != 'none':
-                            #Rerank the query results
-                            query_results = __rerank_query_result(query_results, question, experimentalConfig, idx)
-
-
-                    if query_results:
-                        context = ' '.join(record['text'] for record in query_results)
+                if blocked:
+                    answer = modified_question
+                    guardrail_blocked = 'INPUT'
+
+            # Apply CONTEXT guardrails if not already blocked
+            if experimentalConfig.enable_context_guardrails and guardrail_blocked == 'NONE':
+                if experimentalConfig.knowledge_base:
+                    # Search for relevant context once
+                    query_results = _retrieve_context(question, query_embedding, components, experimentalConfig, idx, prefetched_results)
+
+                if query_results:
+                    context = ' '.join(record['text'] for record in query_results)
+                    with limits["guardrails"]:
                         blocked, modified_context, guardrail_context_assessment = apply_guardrail_check(
                             components,
                             guardrail_id,
@@ -266,46 +423,24 @@ def process_questions(
                             source='INPUT',
                             log_prefix="Context"
                         )
-                        if blocked:
-                            answer = modified_context
-                            guardrail_blocked = 'CONTEXT'
-
-                # Generate and check answer if not blocked
-                if guardrail_blocked == 'NONE':
-                    # Fetch context if not already done
-                    if query_results is None:
-                        if experimentalConfig.knowledge_base:
-                            if isinstance(components["vector_database"], OpenSearchVectorDatabase):
-                                query_results = components["vector_database"].search(
-                                    experimentalConfig.index_id, query_embedding, experimentalConfig.knn_num
-                            )
-                            elif isinstance(components["vector_database"], KnowledgeBaseVectorDatabase):
-                                query_results = components["vector_database"].search(
-                                    question, experimentalConfig.kb_data, experimentalConfig.knn_num
-                                )
-                            if experimentalConfig.chunking_strategy.lower() == 'hierarchical':
-                                query_results = __duplicate_removal_for_heirarchical_config(query_results)
-                            if experimentalConfig.rerank_model_id and experimentalConfig.rerank_model_id.lower() != 'none':
-                                #Rerank the query results
-                                query_results = __rerank_query_result(query_results, question, experimentalConfig, idx)
-
-                   # Generate answer
-                    if experimentalConfig.knowledge_base:
-                        answer_metadata, answer = components["inference_processor"].generate_text(
-                        user_query=question,
-                        context=query_results,
-                        default_prompt=config.inference_system_prompt,
-                    )
-                    else:
-                        answer_metadata, answer = components["inference_processor"].generate_text(
-                            user_query=question,
-                            default_prompt=config.inference_system_prompt,
-                        )
-                    retrieval_input_tokens += int(answer_metadata["inputTokens"])
-                    retrieval_output_tokens += int(answer_metadata["outputTokens"])
+                    if blocked:
+                        answer = modified_context
+                        guardrail_blocked = 'CONTEXT'
+
+            # Generate and check answer if not blocked
+            if guardrail_blocked == 'NONE':
+                # Fetch context if not already done
+                if query_results is None and experimentalConfig.knowledge_base:
+                    query_results = _retrieve_context(question, query_embedding, components, experimentalConfig, idx, prefetched_results)
 
-                    # Apply OUTPUT guardrails if enabled
-                    if experimentalConfig.enable_response_guardrails:
+                # Generate answer
+                answer_metadata, answer = _generate_answer(question, query_results, components, config, experimentalConfig)
+                input_tokens = int(answer_metadata["inputTokens"])
+                output_tokens = int(answer_metadata["outputTokens"])
+
+                # Apply OUTPUT guardrails if enabled
+                if experimentalConfig.enable_response_guardrails:
+                    with limits["guardrails"]:
                         blocked, modified_answer, guardrail_output_assessment = apply_guardrail_check(
                             components,
                             guardrail_id,
@@ -313,98 +448,192 @@ def process_questions(
                             source='OUTPUT',
                             log_prefix="Answer"
                         )
-                        if blocked:
-                            answer = modified_answer
-                            guardrail_blocked = 'OUTPUT'
-            else:
-                if experimentalConfig.knowledge_base:
-                    # Search for relevant context
-                    if isinstance(components["vector_database"], OpenSearchVectorDatabase):
-                        query_results = components["vector_database"].search(
-                            experimentalConfig.index_id, query_embedding, experimentalConfig.knn_num
-                        )
-                    elif isinstance(components["vector_database"], KnowledgeBaseVectorDatabase):
-                        query_results = components["vector_database"].search(
-                            question, experimentalConfig.kb_data, experimentalConfig.knn_num
-                        )
-
-                    if experimentalConfig.chunking_strategy.lower() == 'hierarchical':
-                        query_results = __duplicate_removal_for_heirarchical_config(query_results)
+                    if blocked:
+                        answer = modified_answer
+                        guardrail_blocked = 'OUTPUT'
+        else:
+            if experimentalConfig.knowledge_base:
+                # Search for relevant context
+                query_results = _retrieve_context(question, query_embedding, components, experimentalConfig, idx, prefetched_results)
 
-                    if experimentalConfig.rerank_model_id and experimentalConfig.rerank_model_id.lower() != 'none':
-                        #Rerank the query results
-                        query_results = __rerank_query_result(query_results, question, experimentalConfig, idx)
+            # Generate answer
+            answer_metadata, answer = _generate_answer(question, query_results, components, config, experimentalConfig)
+            input_tokens = int(answer_metadata["inputTokens"])
+            output_tokens = int(answer_metadata["outputTokens"])
 
-                # Generate answer
-                if experimentalConfig.knowledge_base:
-                    answer_metadata, answer = components["inference_processor"].generate_text(
-                        user_query=question,
-                        context=query_results,
-                        default_prompt=config.inference_system_prompt,
-                    )
-                else:
-                    answer_metadata, answer = components["inference_processor"].generate_text(
-                        user_query=question,
-                        default_prompt=config.inference_system_prompt
-                    )
-                retrieval_input_tokens += int(answer_metadata["inputTokens"])
-                retrieval_output_tokens += int(answer_metadata["outputTokens"])
+        reference_contexts = (
+            [record["text"] for record in query_results] if query_results else []
+        )
 
-            reference_contexts = (
-                [record["text"] for record in query_results] if query_results else []
+        if experimentalConfig.enable_guardrails:
+            metrics = _create_metrics(
+                experimental_config=experimentalConfig,
+                question=question,
+                answer=answer,
+                gt_answer=item['answer'],
+                reference_contexts=reference_contexts,
+                guardrail_input_assessment=guardrail_input_assessment,
+                guardrail_context_assessment=guardrail_context_assessment,
+                guardrail_output_assessment=guardrail_output_assessment,
+                guardrail_id=guardrail_id,
+                guardrail_blocked=guardrail_blocked,
+                query_metadata=query_metadata,
+                answer_metadata=answer_metadata,
             )
-
-            if experimentalConfig.enable_guardrails:
-                metrics = _create_metrics(
-                    experimental_config=experimentalConfig,
-                    question=question,
-                    answer=answer,
-                    gt_answer=item['answer'],
-                    reference_contexts=reference_contexts,
-                    guardrail_input_assessment=guardrail_input_assessment,
-                    guardrail_context_assessment=guardrail_context_assessment,
-                    guardrail_output_assessment=guardrail_output_assessment,
-                    guardrail_id=guardrail_id,
-                    guardrail_blocked=guardrail_blocked,
-                    query_metadata=query_metadata,
-                    answer_metadata=answer_metadata,
-                )
-            else:
-                #  Update the metrics here to store the DynamoDb Table
-                metrics = _create_metrics(
-                    experimental_config=experimentalConfig,
-                    question=question,
-                    answer=answer,
-                    gt_answer=item["answer"],
-                    reference_contexts=reference_contexts,
-                    query_metadata=query_metadata,
-                    answer_metadata=answer_metadata,
-                )
-
-            batch_items.append(metrics.to_dynamo_item())
-        except Exception as e:
-            logger.error(f"Error processing question {idx+1}: {str(e)}")
-            metrics = metrics = _create_metrics(
+        else:
+            #  Update the metrics here to store the DynamoDb Table
+            metrics = _create_metrics(
                 experimental_config=experimentalConfig,
                 question=question,
-                answer="",
+                answer=answer,
                 gt_answer=item["answer"],
-                reference_contexts=[],
-                query_metadata={},
-                answer_metadata={},
+                reference_contexts=reference_contexts,
+                query_metadata=query_metadata,
+                answer_metadata=answer_metadata,
             )
-            batch_items.append(metrics.to_dynamo_item())
-    
-        # Write batch if size reaches threshold
-        if len(batch_items) >= 25:
-            write_batch_to_dynamodb(batch_items, components["metrics_dynamodb"])
-            batch_items = []
-
-    # Write remaining items
-    if batch_items:
-        write_batch_to_dynamodb(batch_items, components["metrics_dynamodb"])
-    logger.info(f"Experiment {experimentalConfig.experiment_id} Retrieval Tokens : \n Query Embed Tokens : {retrieval_query_embed_tokens} \n Input Tokens : {retrieval_input_tokens} \n Output Tokens : {retrieval_output_tokens}")
-    return (retrieval_query_embed_tokens, retrieval_input_tokens, retrieval_output_tokens)
+
+        return metrics.to_dynamo_item(), (embed_tokens, input_tokens, output_tokens)
+    except Exception as e:
+        logger.error(f"Error processing question {idx+1}: {str(e)}")
+        # Tokens already spent on this question are still accounted for
+        return _failed_question_item(item, experimentalConfig), (embed_tokens, input_tokens, output_tokens)
+
+def _embed_question(question: str, prefetched: Optional[Dict[str, Any]], components: Dict[str, Any],
+                    experimentalConfig: ExperimentalConfig) -> Tuple[Dict[str, Any], Optional[List[float]], Optional[List[Dict[str, Any]]]]:
+    """Return the question's query metadata, embedding and, from block retrieval, its prefetched results."""
+    if experimentalConfig.bedrock_knowledge_base or not experimentalConfig.knowledge_base:
+        return {'inputTokens': '0', 'latencyMs': '0'}, None, None
+    if prefetched is not None:
+        return prefetched["query_metadata"], prefetched["query_embedding"], prefetched["query_results"]
+    logger.info("Generating embeddings for the question using provided embedder")
+    with components["rate_limits"]["embedding"]:
+        query_metadata, query_embedding = components["embed_processor"].embed_text(question)
+    return query_metadata, query_embedding, None
+
+def _failed_question_item(item: Dict, experimentalConfig: ExperimentalConfig) -> Dict:
+    """Metrics item recorded for a question that could not be answered."""
+    metrics = _create_metrics(
+        experimental_config=experimentalConfig,
+        question=item.get("question"),
+        answer="",
+        gt_answer=item.get("answer"),
+        reference_contexts=[],
+        query_metadata={},
+        answer_metadata={},
+    )
+    return metrics.to_dynamo_item()
+
+async def _aprocess_question(
+    idx: int,
+    item: Dict,
+    prefetched: Optional[Dict[str, Any]] = None,
+    *,
+    components: Dict[str, Any],
+    config: Config,
+    experimentalConfig: ExperimentalConfig,
+) -> Tuple[Dict, Tuple[int, int, int]]:
+    """
+    Coroutine version of `_process_question`.
+
+    Embedding and search run on worker threads, and the answer is generated with the inferencer's
+    `agenerate_text`, so a question waiting on the model does not hold a thread. Questions with
+    guardrails enabled run `_process_question` on a worker thread.
+    """
+    if experimentalConfig.enable_guardrails:
+        return await asyncio.to_thread(_process_question, idx, item, prefetched,
+                                       components=components, config=config, experimentalConfig=experimentalConfig)
+
+    question = item.get("question")
+    embed_tokens = 0
+    input_tokens = 0
+    output_tokens = 0
+    try:
+        logger.debug(f"Processing question {idx+1}: {question}")
+        query_metadata, query_embedding, prefetched_results = await asyncio.to_thread(
+            _embed_question, question, prefetched, components, experimentalConfig
+        )
+        # Retrieval query embed is not provided by knowledge base
+        embed_tokens = int(query_metadata.get("inputTokens", 0) if query_embedding else 0)
+
+        query_results = None
+        if experimentalConfig.knowledge_base:
+            query_results = await asyncio.to_thread(
+                _retrieve_context, question, query_embedding, components, experimentalConfig, idx, prefetched_results
+            )
+
+        answer_metadata, answer = await _agenerate_answer(question, query_results, components, config, experimentalConfig)
+        input_tokens = int(answer_metadata["inputTokens"])
+        output_tokens = int(answer_metadata["outputTokens"])
+
+        metrics = _create_metrics(
+            experimental_config=experimentalConfig,
+            question=question,
+            answer=answer,
+            gt_answer=item["answer"],
+            reference_contexts=[record["text"] for record in query_results] if query_results else [],
+            query_metadata=query_metadata,
+            answer_metadata=answer_metadata,
+        )
+        return metrics.to_dynamo_item(), (embed_tokens, input_tokens, output_tokens)
+    except Exception as e:
+        logger.error(f"Error processing question {idx+1}: {str(e)}")
+        return _failed_question_item(item, experimentalConfig), (embed_tokens, input_tokens, output_tokens)
+
+def _retrieve_context(question: str, query_embedding: Optional[List[float]], components: Dict[str, Any],
+                      experimentalConfig: ExperimentalConfig, idx: int,
+                      prefetched_results: Optional[List[Dict[str, Any]]] = None) -> Optional[List[Dict[str, Any]]]:
+    """
+    Search the knowledge base for the question, de-duplicating hierarchical chunks and reranking if configured.
+
+    Results already fetched by block retrieval are returned as they are.
+    """
+    if prefetched_results is not None:
+        # Block retrieval has already de-duplicated and reranked these hits
+        return prefetched_results
+
+    limits = components["rate_limits"]
+    query_results = None
+    if isinstance(components["vector_database"], OpenSearchVectorDatabase):
+        with limits["opensearch"]:
+            query_results = components["vector_database"].search(
+                experimentalConfig.index_id, query_embedding, experimentalConfig.knn_num
+            )
+    elif isinstance(components["vector_database"], KnowledgeBaseVectorDatabase):
+        with limits["opensearch"]:
+            query_results = components["vector_database"].search(
+                question, experimentalConfig.kb_data, experimentalConfig.knn_num
+            )
+
+    if experimentalConfig.chunking_strategy.lower() == 'hierarchical':
+        query_results = __duplicate_removal_for_heirarchical_config(query_results)
+
+    if components.get("reranker") is not None:
+        #Rerank the query results, the reranker applies the rerank rate limit itself
+        query_results = __rerank_query_result(components["reranker"], query_results, question, experimentalConfig, idx)
+    return query_results
+
+def _generate_answer(question: str, query_results: Optional[List[Dict[str, Any]]], components: Dict[str, Any],
+                     config: Config, experimentalConfig: ExperimentalConfig) -> Tuple[Dict[str, Any], str]:
+    with components["rate_limits"]["inference"]:
+        if experimentalConfig.knowledge_base:
+            return components["inference_processor"].generate_text(
+                user_query=question,
+                context=query_results,
+                default_prompt=config.inference_system_prompt,
+            )
+        return components["inference_processor"].generate_text(
+            user_query=question,
+            default_prompt=config.inference_system_prompt
+        )
+
+async def _agenerate_answer(question: str, query_results: Optional[List[Dict[str, Any]]], components: Dict[str, Any],
+                            config: Config, experimentalConfig: ExperimentalConfig) -> Tuple[Dict[str, Any], str]:
+    async with components["rate_limits"]["inference"]:
+        return await components["inference_processor"].agenerate_text(
+            user_query=question,
+            context=query_results if experimentalConfig.knowledge_base else None,
+            default_prompt=config.inference_system_prompt,
+        )
 
 def __duplicate_removal_for_heirarchical_config(query_results):
     overall_documents = []
@@ -419,10 +648,9 @@ def __duplicate_removal_for_heirarchical_config(query_results):
 
     return overall_documents
 
-def __rerank_query_result(query_results, question, experimentalConfig, index):
+def __rerank_query_result(reranker, query_results, question, experimentalConfig, index):
     logger.info(f"Into reranking for experiment {experimentalConfig.experiment_id} for question {index+1}")
     start_time = time.time()
-    reranker = DocumentReranker(region=experimentalConfig.aws_region, rerank_model_id=experimentalConfig.rerank_model_id)  
     result = reranker.rerank_documents(question, query_results)
     end_time = time.time()
     logger.info(f"Reranking for question {index+1} took {end_time - start_time:.2f} seconds") 
@@ -459,10 +687,10 @@ def _create_metrics(
         guardrail_blocked=guardrail_blocked
     )
 
-def write_batch_to_dynamodb(batch_items: List[Dict], dynamodb: DynamoDBOperations) -> None:
-    """Write a batch of items to DynamoDB."""
-    logger.info(f"Writing batch of {len(batch_items)} items to DynamoDB")
-    dynamodb.batch_write(batch_items)
+def _metrics_writer(components: Dict[str, Any], config: Config) -> DynamoDBBatchWriter:
+    """Background writer of question metrics, flushed and closed when its `with` block ends."""
+    return components["metrics_dynamodb"].batch_writer(workers=config.dynamodb_writer_threads,
+                                                       flush_interval=config.dynamodb_writer_flush_seconds)
     
 class RetrievalError(Exception):
     """Custom exception for retrieval process errors."""
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The services run from the repository root, so the tests import modules the same way
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
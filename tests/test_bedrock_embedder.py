@@ -0,0 +1,104 @@
+import io
+import json
+from types import SimpleNamespace
+
+import botocore.exceptions
+import pytest
+
+from baseclasses import base_classes
+from core.embedding.bedrock.bedrock_embedder import BedrockEmbedder
+from core.embedding.embedding_engine import EmbeddingEngine
+from util import boto3_utils
+
+
+class RecordingLimiter:
+    def __init__(self):
+        self.calls = []
+
+    def acquire(self, tokens=0):
+        self.calls.append(('acquire', tokens))
+
+    def on_throttle(self):
+        self.calls.append(('throttle',))
+
+    def on_success(self):
+        self.calls.append(('success',))
+
+    def record_usage(self, estimated, actual):
+        self.calls.append(('usage', actual))
+
+
+class FakeBedrockRuntime:
+    def __init__(self, throttles=0):
+        self.throttles = throttles
+        self.bodies = []
+        self.meta = SimpleNamespace(service_model=SimpleNamespace(service_name='bedrock-runtime'), region_name='us-east-1')
+
+    def invoke_model(self, modelId, contentType, accept, body):
+        if self.throttles:
+            self.throttles -= 1
+            raise botocore.exceptions.ClientError({'Error': {'Code': 'ThrottlingException', 'Message': 'slow down'}}, 'InvokeModel')
+        texts = json.loads(body)['texts']
+        self.bodies.append(texts)
+        return {
+            'body': io.BytesIO(json.dumps({'embeddings': [[float(len(text))] for text in texts]}).encode()),
+            'ResponseMetadata': {'HTTPHeaders': {
+                'x-amzn-bedrock-input-token-count': str(3 * len(texts)),
+                'x-amzn-bedrock-invocation-latency': '10'
+            }}
+        }
+
+
+class BatchEmbedder(BedrockEmbedder):
+    max_batch_size = 4
+
+    def prepare_payload(self, text, dimensions, normalize):
+        return {'texts': [text]}
+
+    def prepare_batch_payload(self, texts, dimensions, normalize):
+        return {'texts': texts}
+
+    def extract_embedding(self, response):
+        return response['embeddings'][0]
+
+    def extract_embeddings(self, response):
+        return response['embeddings']
+
+
+def _embedder(client):
+    embedder = object.__new__(BatchEmbedder)
+    embedder.model_id = 'cohere.embed-english-v3'
+    embedder.client = client
+    return embedder
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    limiter = RecordingLimiter()
+    monkeypatch.setattr(boto3_utils, 'get_model_rate_limiter', lambda model_id, region: limiter)
+    monkeypatch.setattr(base_classes.time, 'sleep', lambda seconds: None)
+    return limiter
+
+
+def test_embed_batch_is_paced_and_retried_through_the_retry_handler(limiter):
+    client = FakeBedrockRuntime(throttles=2)
+
+    metadata, embeddings = _embedder(client).embed_batch(['a', 'bb', 'ccc'])
+
+    assert embeddings == [[1.0], [2.0], [3.0]]
+    assert metadata == {'inputTokens': 9, 'latencyMs': 10}
+    assert client.bodies == [['a', 'bb', 'ccc']]
+    assert [call[0] for call in limiter.calls] == ['acquire', 'throttle', 'acquire', 'throttle', 'acquire', 'success', 'usage']
+    assert limiter.calls[-1] == ('usage', 9)
+
+
+def test_engine_leaves_throttle_retries_to_the_embedder(limiter):
+    client = FakeBedrockRuntime(throttles=1)
+    engine = EmbeddingEngine(_embedder(client), max_workers=2, batch_size=2)
+
+    results = engine.embed(['a', 'bb', 'ccc'], dimensions=1)
+
+    assert [embedding for _, embedding in results] == [[1.0], [2.0], [3.0]]
+    assert sorted(client.bodies) == [['a', 'bb'], ['ccc']]
+    assert [call[0] for call in limiter.calls].count('acquire') == 3
+    assert engine.limiter.limit == 2
@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+
+from util import boto3_clients
+
+
+class FakeClientContext:
+    def __init__(self, events):
+        self.events = events
+
+    async def __aenter__(self):
+        self.events.append('open')
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.events.append('close')
+
+
+@pytest.fixture
+def events(monkeypatch):
+    pytest.importorskip('aiobotocore')
+    events = []
+    session = type('FakeSession', (), {'create_client': lambda self, *args, **kwargs: FakeClientContext(events)})()
+    monkeypatch.setattr('aiobotocore.session.get_session', lambda: session)
+    return events
+
+
+def test_async_clients_are_shared_per_loop_and_closed_with_it(events):
+    async def run():
+        first = await boto3_clients.get_async_client('bedrock-runtime', region_name='us-east-1')
+        second = await boto3_clients.get_async_client('bedrock-runtime', region_name='us-east-1')
+        assert first is second
+        await boto3_clients.get_async_client('sagemaker-runtime', region_name='us-east-1')
+        await boto3_clients.close_async_clients()
+
+    asyncio.run(run())
+    assert events == ['open', 'open', 'close', 'close']
+
+
+def test_a_new_client_is_created_after_closing(events):
+    async def run():
+        first = await boto3_clients.get_async_client('bedrock-runtime', region_name='us-east-1')
+        await boto3_clients.close_async_clients()
+        second = await boto3_clients.get_async_client('bedrock-runtime', region_name='us-east-1')
+        await boto3_clients.close_async_clients()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first is not second
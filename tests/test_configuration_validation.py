@@ -0,0 +1,92 @@
+import itertools
+import random
+from decimal import Decimal
+
+import pytest
+
+from app.configuration_validation import iter_valid_combinations
+
+
+def legacy_is_valid_combination(config, data):
+    """The filter generate_all_combinations applied to every materialized combination before the sweep became lazy."""
+    regions = ["us-east-1", "us-west-2"]
+    if config['bedrock_knowledge_base'] or not config['knowledge_base']:
+        return True
+    if config["region"] not in regions:
+        return False
+    if config["n_shot_prompts"] > 0 and data["n_shot_prompt_guide"] is None:
+        return False
+    if config['embedding']["service"] == "bedrock" and config["embedding"]["model"] == "amazon.titan-embed-image-v1":
+        if config['vector_dimension'] != 1024 and config['vector_dimension'] != 384 and config['vector_dimension'] != 256:
+            return False
+    if config['embedding']["service"] == "bedrock" and config["embedding"]["model"] == "amazon.titan-embed-text-v2:0":
+        if config['vector_dimension'] != 1024 and config['vector_dimension'] != 512 and config['vector_dimension'] != 256:
+            return False
+    if config['embedding']["service"] == "bedrock" and config["embedding"]["model"] == "amazon.titan-embed-text-v1":
+        if config['vector_dimension'] != 1536:
+            return False
+    if config['embedding']["service"] == "bedrock" and config["embedding"]["model"] in ("cohere.embed-english-v3", "cohere.embed-multilingual-v3"):
+        if config['vector_dimension'] != 1024:
+            return False
+    if config['embedding']["service"] == "sagemaker" and config["embedding"]["model"] in ("huggingface-sentencesimilarity-bge-large-en-v1-5", "huggingface-sentencesimilarity-bge-m3"):
+        if config['vector_dimension'] != 1024:
+            return False
+    if config['embedding']["service"] == "sagemaker" and config["embedding"]["model"] == "huggingface-textembedding-gte-qwen2-7b-instruct":
+        if config['vector_dimension'] != 3584:
+            return False
+    valid_values = {Decimal('0.5'), Decimal('0.3'), Decimal('0.7'), Decimal('0'), Decimal('0.1')}
+    if config['temp_retrieval_llm'] not in valid_values:
+        return False
+    if config['knn_num'] != 3 and config['knn_num'] != 5 and config['knn_num'] != 10 and config['knn_num'] != 15:
+        return False
+    if config.get('chunking_strategy', None) == "hierarchical":
+        if config.get("hierarchical_child_chunk_size") > config.get("hierarchical_parent_chunk_size"):
+            return False
+    return True
+
+
+def legacy_combinations(parameters, data):
+    keys = parameters.keys()
+    combinations = [dict(zip(keys, values)) for values in itertools.product(*parameters.values())]
+    return [combination for combination in combinations if legacy_is_valid_combination(combination, data)]
+
+
+PARAMETERS = {
+    "knowledge_base": [True, False],
+    "bedrock_knowledge_base": [False, True],
+    "region": ["us-east-1", "eu-west-1", "us-west-2"],
+    "embedding": [
+        {"service": "bedrock", "model": "amazon.titan-embed-text-v2:0"},
+        {"service": "bedrock", "model": "amazon.titan-embed-text-v1"},
+        {"service": "sagemaker", "model": "huggingface-sentencesimilarity-bge-m3"},
+        {"service": "sagemaker", "model": "custom-embedding-model"},
+    ],
+    "vector_dimension": [256, 1024, 1536],
+    "chunking_strategy": ["fixed", "hierarchical"],
+    "hierarchical_child_chunk_size": [128, 512],
+    "hierarchical_parent_chunk_size": [256],
+    "n_shot_prompts": [0, 2],
+    "temp_retrieval_llm": [Decimal('0'), Decimal('0.2'), Decimal('0.7')],
+    "knn_num": [3, 4, 10],
+}
+
+
+@pytest.mark.parametrize("data", [{"n_shot_prompt_guide": None}, {"n_shot_prompt_guide": {"examples": []}}])
+def test_matches_the_materialized_filter(data):
+    assert list(iter_valid_combinations(PARAMETERS, data)) == legacy_combinations(PARAMETERS, data)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_the_materialized_filter_in_any_parameter_order(seed):
+    keys = list(PARAMETERS)
+    random.Random(seed).shuffle(keys)
+    parameters = {key: PARAMETERS[key] for key in keys}
+    data = {"n_shot_prompt_guide": None}
+    assert list(iter_valid_combinations(parameters, data)) == legacy_combinations(parameters, data)
+
+
+def test_rules_on_parameters_that_are_not_swept_run_on_the_complete_combination():
+    parameters = {key: values for key, values in PARAMETERS.items() if not key.startswith("hierarchical")}
+    parameters["chunking_strategy"] = ["fixed"]
+    data = {"n_shot_prompt_guide": None}
+    assert list(iter_valid_combinations(parameters, data)) == legacy_combinations(parameters, data)
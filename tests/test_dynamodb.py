@@ -0,0 +1,112 @@
+import logging
+import threading
+from decimal import Decimal
+
+from core.dynamodb import DynamoDBOperations
+
+TABLE = 'experiment-question-metrics'
+
+
+class FakeScanClient:
+    """Low-level client serving each scan segment from scripted pages."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def scan(self, **params):
+        with self.lock:
+            self.requests.append(params)
+        pages = self.pages[params['Segment']]
+        page_no = int(params.get('ExclusiveStartKey', {}).get('page', {}).get('N', '0'))
+        response = {'Items': pages[page_no]}
+        if page_no + 1 < len(pages):
+            response['LastEvaluatedKey'] = {'page': {'N': str(page_no + 1)}}
+        return response
+
+
+class FakeTable:
+    """Table resource answering queries with scripted pages."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = []
+
+    def query(self, **params):
+        self.requests.append(dict(params))
+        page_no = params.get('ExclusiveStartKey', {}).get('page', 0)
+        response = {'Items': self.pages[page_no]}
+        if page_no + 1 < len(self.pages):
+            response['LastEvaluatedKey'] = {'page': page_no + 1}
+        return response
+
+
+def _operations(dynamodb_client=None, table=None):
+    operations = object.__new__(DynamoDBOperations)
+    operations.table_name = TABLE
+    operations.region = 'us-east-1'
+    operations.logger = logging.getLogger(__name__)
+    operations.dynamodb_client = dynamodb_client
+    operations.table = table
+    return operations
+
+
+def test_parallel_scan_merges_paginated_segments_in_order():
+    client = FakeScanClient({
+        0: [[{'id': {'S': 'a'}}], [{'id': {'S': 'b'}}]],
+        1: [[]],
+        2: [[{'id': {'S': 'c'}}], [], [{'id': {'S': 'd'}}]],
+    })
+
+    items = _operations(dynamodb_client=client).parallel_scan(3)
+
+    assert [item['id'] for item in items] == ['a', 'b', 'c', 'd']
+    assert sorted((request['Segment'], 'ExclusiveStartKey' in request) for request in client.requests) == [
+        (0, False), (0, True), (1, False), (2, False), (2, True), (2, True)]
+    assert all(request['TableName'] == TABLE and request['TotalSegments'] == 3 for request in client.requests)
+
+
+def test_parallel_scan_deserializes_items_and_serializes_filter_values():
+    client = FakeScanClient({0: [[{
+        'id': {'S': 'q1'},
+        'score': {'N': '0.5'},
+        'eval_metrics': {'M': {'faithfulness_score': {'N': '0.75'}, 'run': {'S': 'r1'}}},
+        'tags': {'L': [{'S': 'x'}, {'N': '2'}]},
+    }]], 1: [[]]})
+
+    items = _operations(dynamodb_client=client).parallel_scan(
+        2, filter_expression='#score > :min', expression_values={':min': 0.25},
+        expression_attribute_names={'#score': 'score'}, projection='id, score, eval_metrics, tags')
+
+    assert items == [{
+        'id': 'q1',
+        'score': Decimal('0.5'),
+        'eval_metrics': {'faithfulness_score': Decimal('0.75'), 'run': 'r1'},
+        'tags': ['x', Decimal('2')],
+    }]
+    request = client.requests[0]
+    assert request['ExpressionAttributeValues'] == {':min': {'N': '0.25'}}
+    assert request['ExpressionAttributeNames'] == {'#score': 'score'}
+    assert request['ProjectionExpression'] == 'id, score, eval_metrics, tags'
+
+
+def test_query_by_index_aliases_key_and_projected_attributes():
+    table = FakeTable([[{'name': 'first', 'status': 'done'}], [{'name': 'second', 'status': 'done'}]])
+
+    items = _operations(table=table).query_by_index(
+        'execution_id-index', {'execution_id': 'e1', 'status': 'done'}, projection=['name', 'status'],
+        filter_expression='#size > :size', expression_values={':size': 1.5}, expression_attribute_names={'#size': 'size'})
+
+    assert [item['name'] for item in items] == ['first', 'second']
+    first, second = table.requests
+    assert first == {
+        'IndexName': 'execution_id-index',
+        'KeyConditionExpression': '#key0 = :key0 AND #key1 = :key1',
+        'ProjectionExpression': '#attr0, #attr1',
+        'FilterExpression': '#size > :size',
+        'ExpressionAttributeNames': {'#size': 'size', '#key0': 'execution_id', '#key1': 'status',
+                                     '#attr0': 'name', '#attr1': 'status'},
+        'ExpressionAttributeValues': {':size': Decimal('1.5'), ':key0': 'e1', ':key1': 'done'},
+    }
+    assert second['ExclusiveStartKey'] == {'page': 1}
@@ -0,0 +1,113 @@
+import threading
+import time
+
+import pytest
+
+from core import dynamodb_batch_writer
+from core.dynamodb_batch_writer import DynamoDBBatchWriter, UnprocessedItemsError
+
+TABLE = 'experiment-question-metrics'
+
+
+class FakeDynamoDB:
+    """Records BatchWriteItem requests, answering each with the next scripted response."""
+
+    def __init__(self, responses=None):
+        self.requests = []
+        self.responses = list(responses or [])
+        self.lock = threading.Lock()
+
+    def batch_write_item(self, RequestItems):
+        with self.lock:
+            self.requests.append([request['PutRequest']['Item'] for request in RequestItems[TABLE]])
+            response = self.responses.pop(0) if self.responses else {}
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def item(i):
+    return {'id': {'S': str(i)}}
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(dynamodb_batch_writer, 'jittered_backoff', lambda attempt: 0)
+
+
+def test_items_are_sent_in_batches_of_25():
+    client = FakeDynamoDB()
+    with DynamoDBBatchWriter(TABLE, workers=1, flush_interval=60, client=client) as writer:
+        writer.put_many([item(i) for i in range(60)])
+    assert [len(batch) for batch in client.requests] == [25, 25, 10]
+    assert [entry for batch in client.requests for entry in batch] == [item(i) for i in range(60)]
+    assert writer.written == 60
+
+
+def test_partial_batch_is_sent_after_flush_interval():
+    client = FakeDynamoDB()
+    writer = DynamoDBBatchWriter(TABLE, workers=1, flush_interval=0.05, client=client)
+    try:
+        writer.put_many([item(i) for i in range(3)])
+        deadline = time.monotonic() + 5
+        while not client.requests and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert client.requests == [[item(0), item(1), item(2)]]
+    finally:
+        writer.close()
+
+
+def test_unprocessed_items_are_retried():
+    unprocessed = {'UnprocessedItems': {TABLE: [{'PutRequest': {'Item': item(1)}}, {'PutRequest': {'Item': item(2)}}]}}
+    still_unprocessed = {'UnprocessedItems': {TABLE: [{'PutRequest': {'Item': item(2)}}]}}
+    client = FakeDynamoDB([unprocessed, still_unprocessed])
+    with DynamoDBBatchWriter(TABLE, workers=1, flush_interval=0.01, client=client) as writer:
+        writer.put_many([item(i) for i in range(3)])
+        writer.flush()
+    assert client.requests == [[item(0), item(1), item(2)], [item(1), item(2)], [item(2)]]
+    assert (writer.written, writer.unprocessed) == (3, 0)
+
+
+def test_items_left_unprocessed_after_max_retries_are_raised_on_close():
+    unprocessed = {'UnprocessedItems': {TABLE: [{'PutRequest': {'Item': item(0)}}]}}
+    client = FakeDynamoDB([unprocessed] * 3)
+    with pytest.raises(UnprocessedItemsError) as error:
+        with DynamoDBBatchWriter(TABLE, workers=1, flush_interval=0.01, max_retries=2, client=client) as writer:
+            writer.put(item(0))
+    assert len(client.requests) == 3
+    assert error.value.items == [item(0)]
+    assert (writer.written, writer.unprocessed, writer.failed_items) == (0, 1, [item(0)])
+
+
+def test_items_left_unprocessed_can_be_retried_after_flush_raises():
+    unprocessed = {'UnprocessedItems': {TABLE: [{'PutRequest': {'Item': item(1)}}]}}
+    client = FakeDynamoDB([unprocessed] * 2)
+    with DynamoDBBatchWriter(TABLE, workers=1, flush_interval=0.01, max_retries=1, client=client) as writer:
+        writer.put_many([item(0), item(1)])
+        with pytest.raises(UnprocessedItemsError):
+            writer.flush()
+        writer.retry_failed()
+        writer.flush()
+    assert client.requests == [[item(0), item(1)], [item(1)], [item(1)]]
+    assert (writer.written, writer.unprocessed) == (2, 0)
+
+
+def test_failed_write_is_raised_on_put_flush_and_close():
+    client = FakeDynamoDB([ValueError('ProvisionedThroughputExceeded')])
+    writer = DynamoDBBatchWriter(TABLE, workers=1, flush_interval=0.01, client=client)
+    writer.put(item(0))
+    with pytest.raises(RuntimeError, match='ProvisionedThroughputExceeded'):
+        writer.flush()
+    with pytest.raises(RuntimeError, match=TABLE):
+        writer.put(item(1))
+    with pytest.raises(RuntimeError, match='ProvisionedThroughputExceeded'):
+        writer.close()
+    with pytest.raises(RuntimeError, match='closed'):
+        writer.put(item(2))
+
+
+def test_plain_items_are_serialized():
+    client = FakeDynamoDB()
+    with DynamoDBBatchWriter(TABLE, workers=1, serialize_items=True, client=client) as writer:
+        writer.put({'id': 'q1', 'score': 0.5, 'tags': ['a']})
+    assert client.requests == [[{'id': {'S': 'q1'}, 'score': {'N': '0.5'}, 'tags': {'L': [{'S': 'a'}]}}]]
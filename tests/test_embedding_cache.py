@@ -0,0 +1,116 @@
+import io
+import itertools
+
+import pytest
+from botocore.exceptions import ClientError
+
+from core.embedding import embedding_cache
+from core.embedding.embedding_cache import EmbeddingCache
+
+
+def _client_error(code):
+    return ClientError({'Error': {'Code': code, 'Message': code}}, 'S3')
+
+
+class _Body(io.BytesIO):
+    def iter_chunks(self, chunk_size):
+        return iter(lambda: self.read(chunk_size), b'')
+
+
+class FakeS3:
+    """One object store honouring the If-Match / If-None-Match conditions the cache sends."""
+
+    def __init__(self):
+        self.objects = {}
+        self._etags = itertools.count(1)
+        self.before_put = None
+
+    def get_object(self, Bucket, Key, IfNoneMatch=None):
+        if Key not in self.objects:
+            raise _client_error('NoSuchKey')
+        data, etag = self.objects[Key]
+        if IfNoneMatch == etag:
+            raise _client_error('304')
+        return {'Body': _Body(data), 'ETag': etag}
+
+    def put_object(self, Bucket, Key, Body, IfMatch=None, IfNoneMatch=None):
+        if self.before_put:
+            hook, self.before_put = self.before_put, None
+            hook()
+        current = self.objects.get(Key)
+        if IfNoneMatch == '*' and current is not None:
+            raise _client_error('PreconditionFailed')
+        if IfMatch is not None and (current is None or current[1] != IfMatch):
+            raise _client_error('PreconditionFailed')
+        etag = f'"{next(self._etags)}"'
+        self.objects[Key] = (Body.read(), etag)
+        return {'ETag': etag}
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    fake = FakeS3()
+    monkeypatch.setattr(embedding_cache, 'get_client', lambda *args, **kwargs: fake)
+    return fake
+
+
+def _cache(tmp_path, name):
+    return EmbeddingCache('model', 2, True, cache_dir=str(tmp_path / name), s3_bucket='bucket', s3_prefix='cache')
+
+
+def test_get_many_reports_hits_and_misses(tmp_path):
+    cache = EmbeddingCache('model', 2, True, cache_dir=str(tmp_path))
+    cache.put_many(['a'], [[1.0, 2.0]])
+    assert cache.get_many(['a', 'b']) == [[1.0, 2.0], None]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_concurrent_tasks_keep_each_others_entries(tmp_path, s3):
+    # Both tasks start from the same (empty) snapshot, as parallel experiments of one execution do
+    first, second = _cache(tmp_path, 'first'), _cache(tmp_path, 'second')
+    first.put('a', [1.0, 0.0])
+    second.put('b', [0.0, 1.0])
+
+    first.close()
+    second.close()
+
+    third = _cache(tmp_path, 'third')
+    assert third.get_many(['a', 'b']) == [[1.0, 0.0], [0.0, 1.0]]
+
+
+def test_upload_racing_another_task_merges_again(tmp_path, s3):
+    first, second = _cache(tmp_path, 'first'), _cache(tmp_path, 'second')
+    first.put('a', [1.0, 0.0])
+    second.put('b', [0.0, 1.0])
+    # The second task publishes between the first task's merge and its conditional put
+    s3.before_put = second.persist
+
+    first.persist()
+
+    assert first.get_many(['a', 'b']) == [[1.0, 0.0], [0.0, 1.0]]
+    assert _cache(tmp_path, 'third').get_many(['a', 'b']) == [[1.0, 0.0], [0.0, 1.0]]
+
+
+def test_start_up_merges_the_s3_copy_into_the_local_cache(tmp_path, s3):
+    published = _cache(tmp_path, 'published')
+    published.put('a', [1.0, 0.0])
+    published.close()
+    local = EmbeddingCache('model', 2, True, cache_dir=str(tmp_path / 'local'))
+    local.put('b', [0.0, 1.0])
+    local.close()
+
+    restarted = _cache(tmp_path, 'local')
+
+    assert restarted.get_many(['a', 'b']) == [[1.0, 0.0], [0.0, 1.0]]
+
+
+def test_interrupted_download_keeps_the_local_cache(tmp_path, s3):
+    local = EmbeddingCache('model', 2, True, cache_dir=str(tmp_path))
+    local.put('b', [0.0, 1.0])
+    local.close()
+    s3.objects['cache/' + local.namespace + '.sqlite'] = (b'SQLite format 3\x00 truncated', '"1"')
+
+    restarted = _cache(tmp_path, '')
+
+    assert restarted.get('b') == [0.0, 1.0]
+    assert not (tmp_path / f'{local.namespace}.sqlite.remote').exists()
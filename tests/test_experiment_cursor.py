@@ -0,0 +1,40 @@
+import base64
+import json
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+
+from app.routes.experiment import _decode_cursor, _encode_cursor
+
+LAST_EVALUATED_KEY = {"id": "q-0042", "execution_id": "exec-1", "experiment_id": "exp-1"}
+
+
+def test_cursor_round_trips_the_last_evaluated_key():
+    cursor = _encode_cursor(LAST_EVALUATED_KEY)
+    assert "=" not in cursor
+    assert _decode_cursor(cursor, "exec-1", "exp-1") == LAST_EVALUATED_KEY
+
+
+def test_cursor_of_a_key_with_numbers_decodes():
+    key = {**LAST_EVALUATED_KEY, "question_no": Decimal("7")}
+    assert _decode_cursor(_encode_cursor(key), "exec-1", "exp-1")["question_no"] == "7"
+
+
+@pytest.mark.parametrize("execution_id, experiment_id", [("exec-2", "exp-1"), ("exec-1", "exp-2")])
+def test_cursor_of_another_experiment_is_rejected(execution_id, experiment_id):
+    with pytest.raises(HTTPException) as error:
+        _decode_cursor(_encode_cursor(LAST_EVALUATED_KEY), execution_id, experiment_id)
+    assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor!",
+    base64.urlsafe_b64encode(b"{truncated").decode("ascii"),
+    base64.urlsafe_b64encode(json.dumps(["exec-1", "exp-1"]).encode("utf-8")).decode("ascii"),
+    base64.urlsafe_b64encode(b"\xff\xfe").decode("ascii"),
+])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        _decode_cursor(cursor, "exec-1", "exp-1")
+    assert error.value.status_code == 400
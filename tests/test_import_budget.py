@@ -0,0 +1,62 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Heavy packages that must only be imported once a task or request needs them
+DEFERRED_MODULES = ('sagemaker', 'ragas', 'langchain', 'pandas')
+PDF_MODULES = ('fitz', 'PyPDF2')
+
+# Entry module -> (packages it must not import, import budget in seconds). The budgets are about
+# three times the import time on a developer machine, leaving room for slower CI hosts.
+ENTRY_MODULES = {
+    # About 0.3 s
+    'core.processors': (DEFERRED_MODULES, 1.5),
+    # About 1.25 s, most of it flotorch_core which the routes need; the API neither indexes nor searches
+    'app.main': (DEFERRED_MODULES + PDF_MODULES + ('opensearchpy',), 3.5),
+    # About 1 s with the PDF extractors
+    'lambda_handlers.indexing_handler': (DEFERRED_MODULES, 3.0),
+    'lambda_handlers.retriever_handler': (DEFERRED_MODULES + PDF_MODULES, 2.5),
+    'lambda_handlers.evaluation_handler': (DEFERRED_MODULES + PDF_MODULES + ('opensearchpy',), 1.5),
+    'lambda_handlers.opensearch_handler': (DEFERRED_MODULES + PDF_MODULES, 2.5),
+}
+
+
+def _profile_import(module):
+    """Import `module` in a fresh interpreter, returning the modules it loaded and the summed -X importtime self times."""
+    script = f"import sys; import {module}; print(' '.join(sys.modules))"
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', script], cwd=REPO_ROOT,
+                            capture_output=True, text=True, timeout=120)
+    if result.returncode != 0 and 'ModuleNotFoundError' in result.stderr:
+        pytest.skip(f'{module} cannot be imported here: {result.stderr.strip().splitlines()[-1]}')
+    assert result.returncode == 0, result.stderr
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us = line[len('import time:'):].split('|')[0].strip()
+        if self_us.isdigit():
+            total_us += int(self_us)
+    return set(result.stdout.split()), total_us / 1e6
+
+
+@pytest.fixture(scope='module', params=sorted(ENTRY_MODULES))
+def entry_import(request):
+    module = request.param
+    return module, _profile_import(module)
+
+
+def test_entry_modules_do_not_import_heavy_packages(entry_import):
+    module, (modules, _) = entry_import
+    deferred, _ = ENTRY_MODULES[module]
+    loaded = {name for name in modules for package in deferred if name == package or name.startswith(f'{package}.')}
+    assert not loaded, f'{module} imported {sorted(loaded)}'
+
+
+def test_entry_modules_import_within_budget(entry_import):
+    module, (_, seconds) = entry_import
+    _, budget = ENTRY_MODULES[module]
+    assert seconds < budget, f'{module} took {seconds:.2f}s to import'
@@ -0,0 +1,79 @@
+import pytest
+from botocore.exceptions import ClientError
+
+from core.index_registry import BuildLease, IndexLeaseLost
+from core.opensearch_vectorstore import OpenSearchVectorDatabase
+
+
+class FakeRegistry:
+    lease_seconds = 900
+
+    def __init__(self):
+        self.owner = 'experiment-1'
+        self.renewals = 0
+
+    def renew(self, index_id, owner):
+        if owner != self.owner:
+            raise ClientError({'Error': {'Code': 'ConditionalCheckFailedException', 'Message': ''}}, 'UpdateItem')
+        self.renewals += 1
+
+
+class FakeClient:
+    def __init__(self):
+        self.requests = 0
+
+    def bulk(self, body):
+        self.requests += 1
+        return {'errors': False, 'items': []}
+
+
+def _vector_database(client):
+    vector_database = object.__new__(OpenSearchVectorDatabase)
+    vector_database.client = client
+    return vector_database
+
+
+def test_check_renews_only_when_the_last_renewal_is_old(monkeypatch):
+    registry = FakeRegistry()
+    lease = BuildLease(registry, 'index', 'experiment-1')
+    now = [1000.0]
+    monkeypatch.setattr('core.index_registry.time.monotonic', lambda: now[0])
+
+    lease.check()
+    lease.check()
+    assert registry.renewals == 1
+
+    now[0] += registry.lease_seconds / 3
+    lease.check()
+    assert registry.renewals == 2
+
+
+def test_check_raises_once_the_lease_was_taken_over():
+    registry = FakeRegistry()
+    lease = BuildLease(registry, 'index', 'experiment-1')
+    registry.owner = 'experiment-2'
+
+    with pytest.raises(IndexLeaseLost):
+        lease.check()
+    assert lease.lost
+    with pytest.raises(IndexLeaseLost):
+        lease.check()
+
+
+def test_bulk_load_stops_writing_when_the_lease_is_lost():
+    client = FakeClient()
+    registry = FakeRegistry()
+    lease = BuildLease(registry, 'index', 'experiment-1')
+
+    def documents():
+        for i in range(10):
+            if i == 4:
+                # Another task claims the index while this builder is still producing documents
+                registry.owner = 'experiment-2'
+                lease._renewed_at = None
+            yield {'text': str(i)}
+
+    with pytest.raises(IndexLeaseLost):
+        _vector_database(client).bulk_index_documents('index', documents(), max_batch_docs=2, workers=1,
+                                                      before_request=lease.check)
+    assert client.requests <= 2
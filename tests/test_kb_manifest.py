@@ -0,0 +1,50 @@
+import pytest
+
+from core.kb_manifest import KnowledgeBaseManifest
+
+
+@pytest.fixture
+def manifest():
+    manifest = KnowledgeBaseManifest('bucket', 'manifests/kb.json')
+    manifest.record('kb/same.pdf', '"a"', 100, ['same-0', 'same-1'])
+    manifest.record('kb/edited.pdf', '"b"', 200, ['edited-0'])
+    manifest.record('kb/resized.pdf', '"c"', 300, ['resized-0'])
+    manifest.record('kb/deleted.pdf', '"d"', 400, ['deleted-0', 'deleted-1', 'deleted-2'])
+    return manifest
+
+
+def test_diff_groups_objects_by_what_indexing_has_to_do(manifest):
+    diff = manifest.diff({
+        'kb/same.pdf': {'etag': '"a"', 'size': 100},
+        'kb/edited.pdf': {'etag': '"b2"', 'size': 200},
+        'kb/resized.pdf': {'etag': '"c"', 'size': 301},
+        'kb/new.pdf': {'etag': '"e"', 'size': 500},
+    })
+    assert diff.added == ['kb/new.pdf']
+    assert diff.changed == ['kb/edited.pdf', 'kb/resized.pdf']
+    assert diff.removed == ['kb/deleted.pdf']
+    assert diff.unchanged == ['kb/same.pdf']
+    assert diff.to_index == ['kb/new.pdf', 'kb/edited.pdf', 'kb/resized.pdf']
+    assert diff.to_delete == ['kb/edited.pdf', 'kb/resized.pdf', 'kb/deleted.pdf']
+    assert str(diff) == '1 added, 2 changed, 1 removed, 1 unchanged'
+
+
+def test_diff_of_an_empty_manifest_adds_everything():
+    diff = KnowledgeBaseManifest('bucket', 'manifests/kb.json').diff({'kb/a.pdf': {'etag': '"a"', 'size': 1}})
+    assert diff.added == ['kb/a.pdf']
+    assert diff.changed == diff.removed == diff.unchanged == []
+
+
+def test_diff_of_an_emptied_bucket_removes_everything(manifest):
+    diff = manifest.diff({})
+    assert diff.removed == ['kb/same.pdf', 'kb/edited.pdf', 'kb/resized.pdf', 'kb/deleted.pdf']
+    assert diff.to_index == []
+
+
+def test_record_and_forget_update_the_chunk_count(manifest):
+    assert manifest.chunk_count == 7
+    manifest.record('kb/edited.pdf', '"b2"', 200, ['edited-0', 'edited-1'])
+    manifest.forget('kb/deleted.pdf')
+    manifest.forget('kb/unknown.pdf')
+    assert manifest.chunk_count == 5
+    assert manifest.diff({'kb/edited.pdf': {'etag': '"b2"', 'size': 200}}).unchanged == ['kb/edited.pdf']
@@ -0,0 +1,67 @@
+from core.opensearch_vectorstore import OpenSearchVectorDatabase
+
+
+class FakeIndices:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def get_settings(self, index, name):
+        return {index: {'settings': {'index': {'number_of_replicas': '1'}}}}
+
+    def put_settings(self, index, body):
+        self.calls.append(('put_settings', body['index'].get('number_of_replicas')))
+
+    def refresh(self, index, request_timeout=None):
+        self.calls.append(('refresh',))
+
+
+class FakeCluster:
+    def __init__(self, calls, status):
+        self.calls = calls
+        self.status = status
+
+    def health(self, index, wait_for_status=None, timeout=None, request_timeout=None):
+        if wait_for_status:
+            self.calls.append(('wait_for', wait_for_status))
+        return {'status': self.status, 'timed_out': False}
+
+
+class FakeTransport:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def perform_request(self, method, url, timeout=None):
+        self.calls.append(('warmup',))
+        return {'_shards': {'total': 2, 'successful': 2, 'failed': 0}}
+
+
+class FakeClient:
+    def __init__(self, status):
+        self.calls = []
+        self.indices = FakeIndices(self.calls)
+        self.cluster = FakeCluster(self.calls, status)
+        self.transport = FakeTransport(self.calls)
+
+
+def _vector_database(client):
+    vector_database = object.__new__(OpenSearchVectorDatabase)
+    vector_database.client = client
+    vector_database.is_serverless = False
+    return vector_database
+
+
+def test_bulk_load_warms_up_after_the_replicas_are_allocated():
+    client = FakeClient('green')
+    with _vector_database(client).bulk_load('index'):
+        client.calls.append(('ingest',))
+
+    assert client.calls == [('put_settings', 0), ('ingest',), ('put_settings', '1'), ('refresh',),
+                            ('wait_for', 'green'), ('warmup',)]
+
+
+def test_bulk_load_does_not_wait_for_replicas_that_were_never_allocated():
+    client = FakeClient('yellow')
+    with _vector_database(client).bulk_load('index'):
+        pass
+
+    assert ('wait_for', 'yellow') in client.calls
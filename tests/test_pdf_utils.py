@@ -0,0 +1,117 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+fitz = pytest.importorskip('fitz')
+
+from util import pdf_utils
+
+
+def make_pdf(label, pages):
+    doc = fitz.open()
+    for page_no in range(pages):
+        doc.new_page().insert_text((72, 72), f"{label} page {page_no}")
+    content = doc.tobytes()
+    doc.close()
+    return content
+
+
+class RecordingExecutor(ThreadPoolExecutor):
+    """Runs the extraction tasks on threads and records what each one was sent."""
+
+    def __init__(self, max_workers, mp_context=None):
+        super().__init__(max_workers=max_workers)
+        self.mp_context = mp_context
+        self.functions = []
+        self.sources = []
+        self.inflight_bytes = 0
+        self.max_inflight_bytes = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn, source, *args):
+        size = len(source) if isinstance(source, bytes) else 0
+        with self._lock:
+            self.functions.append(fn)
+            self.sources.append(source)
+            self.inflight_bytes += size
+            self.max_inflight_bytes = max(self.max_inflight_bytes, self.inflight_bytes)
+        future = super().submit(fn, source, *args)
+        future.add_done_callback(lambda _: self._done(size))
+        return future
+
+    def _done(self, size):
+        with self._lock:
+            self.inflight_bytes -= size
+
+
+@pytest.fixture
+def executors(monkeypatch):
+    created = []
+
+    def factory(max_workers, mp_context=None):
+        created.append(RecordingExecutor(max_workers, mp_context))
+        return created[-1]
+
+    monkeypatch.setattr(pdf_utils, 'ProcessPoolExecutor', factory)
+    return created
+
+
+def test_small_documents_are_one_task_and_large_ones_are_spilled_to_disk(executors):
+    small, large = make_pdf('small', 3), make_pdf('large', 12)
+    documents = [('small.pdf', small), ('large.pdf', large)]
+    results = dict(pdf_utils.iter_pdf_documents_from_bytes(documents, max_workers=2, pages_per_task=4,
+                                                          spill_bytes=len(small)))
+
+    assert results['small.pdf'] == pdf_utils.extract_page_range(small, 0, None)
+    assert results['large.pdf'] == pdf_utils.extract_page_range(large, 0, None)
+    sources = executors[0].sources
+    assert sources[0] == small
+    spilled = sources[1:]
+    assert len(spilled) == 3 and len(set(spilled)) == 1 and isinstance(spilled[0], str)
+    assert not os.path.exists(spilled[0])
+
+
+def test_pages_are_counted_by_the_first_task_of_each_document(executors, tmp_path, monkeypatch):
+    paths = []
+    for label, pages in (('long', 10), ('short', 2)):
+        path = tmp_path / f'{label}.pdf'
+        path.write_bytes(make_pdf(label, pages))
+        paths.append(str(path))
+    counted_on = []
+
+    def count_pages(source):
+        counted_on.append(threading.current_thread())
+        return pdf_utils._count_pages_pymupdf(source)
+
+    monkeypatch.setitem(pdf_utils.PDF_BACKENDS, 'pymupdf', (pdf_utils._extract_pages_pymupdf, count_pages))
+
+    results = dict(pdf_utils.iter_pdf_documents(paths, max_workers=1, pages_per_task=4))
+
+    assert len(counted_on) == 2 and threading.main_thread() not in counted_on
+    assert results == {path: pdf_utils.extract_page_range(path, 0, None) for path in paths}
+    executor = executors[0]
+    assert executor.mp_context.get_start_method() == 'spawn'
+    assert executor.functions.count(pdf_utils.extract_leading_pages) == 2
+    assert executor.functions.count(pdf_utils.extract_page_range) == 2
+
+
+def test_inflight_content_is_bounded(executors):
+    documents = [(f'doc{i}.pdf', make_pdf(f'doc{i}', 2)) for i in range(8)]
+    budget = 2 * max(len(content) for _, content in documents)
+    results = list(pdf_utils.iter_pdf_documents_from_bytes(documents, max_workers=4, max_inflight_bytes=budget))
+
+    assert sorted(name for name, _ in results) == [name for name, _ in documents]
+    assert 0 < executors[0].max_inflight_bytes <= budget
+
+
+def test_spilled_files_are_removed_when_extraction_fails(executors, monkeypatch):
+    created = []
+    spill = pdf_utils._spill
+    monkeypatch.setattr(pdf_utils, '_spill', lambda source: created.append(spill(source)) or created[-1])
+    documents = [('broken.pdf', b'%PDF-1.4 not really a pdf' * 10)]
+
+    with pytest.raises(Exception):
+        list(pdf_utils.iter_pdf_documents_from_bytes(documents, max_workers=1, spill_bytes=1))
+    assert created and not any(os.path.exists(path) for path in created)
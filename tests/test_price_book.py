@@ -0,0 +1,84 @@
+import importlib.util
+import io
+import sys
+
+import boto3
+from botocore.exceptions import ClientError
+
+from util import price_book
+from util.price_book import ModelPrice, PriceBook
+
+SHEET = "model,Region,input_price,output_price\nanthropic.claude-v2,us-east-1,0.008,0.024\namazon.titan-embed-text-v1,us-east-1,0.0001,\n"
+UPDATED_SHEET = "model,Region,input_price,output_price\nanthropic.claude-v2,us-east-1,0.006,0.018\n"
+
+
+class FakeS3:
+    def __init__(self, content, etag='"v1"'):
+        self.content = content
+        self.etag = etag
+        self.requests = []
+        self.unavailable = False
+
+    def get_object(self, **request):
+        self.requests.append(request)
+        if self.unavailable:
+            raise ClientError({'Error': {'Code': 'InternalError'}}, 'GetObject')
+        if request.get('IfNoneMatch') == self.etag:
+            raise ClientError({'Error': {'Code': '304', 'Message': 'Not Modified'}}, 'GetObject')
+        return {'Body': io.BytesIO(self.content.encode('utf-8')), 'ETag': self.etag}
+
+
+def test_unchanged_sheet_is_revalidated_not_downloaded():
+    s3 = FakeS3(SHEET)
+    book = PriceBook('bucket', 'prices.csv', s3_client=s3)
+    assert book.get('anthropic.claude-v2', 'us-east-1') == ModelPrice(0.008, 0.024)
+    assert book.get('amazon.titan-embed-text-v1', 'us-east-1') == ModelPrice(0.0001, None)
+
+    assert book.refresh() is False
+    assert s3.requests[-1] == {'Bucket': 'bucket', 'Key': 'prices.csv', 'IfNoneMatch': '"v1"'}
+    assert book.get('anthropic.claude-v2', 'us-east-1') == ModelPrice(0.008, 0.024)
+
+    s3.content, s3.etag = UPDATED_SHEET, '"v2"'
+    assert book.refresh() is True
+    assert book.etag == '"v2"'
+    assert book.get('anthropic.claude-v2', 'us-east-1') == ModelPrice(0.006, 0.018)
+    assert book.get('amazon.titan-embed-text-v1', 'us-east-1') is None
+
+
+def test_snapshot_serves_a_cold_start_when_s3_is_unreachable(tmp_path):
+    PriceBook('bucket', 'prices.csv', snapshot_dir=str(tmp_path), s3_client=FakeS3(SHEET)).refresh()
+
+    s3 = FakeS3(SHEET)
+    s3.unavailable = True
+    book = PriceBook('bucket', 'prices.csv', snapshot_dir=str(tmp_path), s3_client=s3)
+    assert book.get('anthropic.claude-v2', 'us-east-1') == ModelPrice(0.008, 0.024)
+    assert len(book) == 2
+    # The snapshot's ETag is sent, so a reachable S3 would answer 304 instead of the full sheet
+    assert s3.requests == [{'Bucket': 'bucket', 'Key': 'prices.csv', 'IfNoneMatch': '"v1"'}]
+
+
+def test_failed_refresh_keeps_the_loaded_prices():
+    s3 = FakeS3(SHEET)
+    book = PriceBook('bucket', 'prices.csv', refresh_seconds=0, s3_client=s3)
+    assert len(book) == 2
+    s3.unavailable = True
+    assert book.get('anthropic.claude-v2', 'us-east-1') == ModelPrice(0.008, 0.024)
+    assert len(s3.requests) == 2
+
+
+def test_no_sheet_and_no_snapshot_leaves_the_book_empty(tmp_path):
+    s3 = FakeS3(SHEET)
+    s3.unavailable = True
+    book = PriceBook('bucket', 'prices.csv', snapshot_dir=str(tmp_path), s3_client=s3)
+    assert book.get('anthropic.claude-v2', 'us-east-1') is None
+    assert len(book) == 0
+
+
+def test_module_loads_on_its_own_as_in_the_cost_compute_image(monkeypatch):
+    # The lambda image has the module next to its handler and no util package
+    monkeypatch.setitem(sys.modules, 'util.boto3_clients', None)
+    spec = importlib.util.spec_from_file_location('price_book', price_book.__file__)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    assert module.get_client is boto3.client
@@ -0,0 +1,99 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('numpy')
+
+from core.eval.ragas.ragas_eval import RagasEvaluator
+
+
+class FakeTable:
+    def __init__(self, items=None):
+        self.items = items or []
+        self.updates = []
+
+    def query_all(self, *args, **kwargs):
+        return [dict(item) for item in self.items]
+
+    def put_item(self, *args, **kwargs):
+        raise AssertionError('questions must be updated, not replaced')
+
+    def update_item(self, **kwargs):
+        self.updates.append(kwargs)
+
+
+class FakeMetrics:
+    def to_dict(self):
+        return {'rouge_score': 0.5}
+
+
+class ScoringEvaluator(RagasEvaluator):
+    def _initialize_dynamodb(self):
+        pass
+
+    def _initialize_scorers(self):
+        pass
+
+    def get_questions(self, experiment_id):
+        return []
+
+    def evaluate_batch(self, metrics_records):
+        self.scored.extend(record.id for record in metrics_records)
+        return [FakeMetrics() for _ in metrics_records]
+
+
+def question(question_id, **attributes):
+    return {'id': question_id, 'execution_id': 'exec-1', 'experiment_id': 'exp-1', 'question': 'q', 'gt_answer': 'a',
+            'reference_contexts': [], 'query_metadata': {}, 'answer_metadata': {}, **attributes}
+
+
+def make_evaluator(items, **overrides):
+    config = {'eval_batch_size': 10, 'dynamodb_writer_threads': 1, 'eval_resume': False, 'eval_run_id': '',
+              'experiment_question_metrics_experimentid_index': 'experiment_id-index', **overrides}
+    evaluator = ScoringEvaluator(SimpleNamespace(**config), None)
+    evaluator.metrics_db, evaluator.experiment_db = FakeTable(items), FakeTable()
+    evaluator.scored = []
+    return evaluator
+
+
+SCORED = {'M': {'rouge_score': 0.9}}
+ITEMS = [question('q1', eval_metrics=SCORED, eval_run_id='run-1'), question('q2', eval_metrics=SCORED), question('q3')]
+
+
+def test_rerun_scores_every_question_by_default():
+    evaluator = make_evaluator(ITEMS)
+    evaluator.evaluate('exp-1')
+    assert evaluator.scored == ['q1', 'q2', 'q3']
+
+
+def test_retry_of_the_same_run_skips_only_questions_it_scored():
+    evaluator = make_evaluator(ITEMS, eval_resume=True, eval_run_id='run-1')
+    evaluator.evaluate('exp-1')
+    assert evaluator.scored == ['q2', 'q3']
+    updates = sorted(evaluator.metrics_db.updates, key=lambda update: update['key']['id'])
+    assert updates == [
+        {'key': {'id': question_id}, 'update_expression': 'SET eval_metrics = :eval, eval_run_id = :run_id',
+         'expression_values': {':eval': {'M': {'rouge_score': 0.5}}, ':run_id': 'run-1'}}
+        for question_id in ('q2', 'q3')
+    ]
+
+
+def test_only_the_metrics_are_written_without_a_run_id():
+    evaluator = make_evaluator([question('q1', answer='kept')])
+    evaluator.evaluate('exp-1')
+    assert evaluator.metrics_db.updates == [
+        {'key': {'id': 'q1'}, 'update_expression': 'SET eval_metrics = :eval',
+         'expression_values': {':eval': {'M': {'rouge_score': 0.5}}}}
+    ]
+
+
+def test_evaluate_batch_is_abstract():
+    class Incomplete(RagasEvaluator):
+        def _initialize_scorers(self):
+            pass
+
+        def get_questions(self, experiment_id):
+            return []
+
+    with pytest.raises(TypeError, match='evaluate_batch'):
+        Incomplete(SimpleNamespace(), None)
@@ -0,0 +1,108 @@
+import logging
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from util import rate_limiter
+from util.rate_limiter import AdaptiveRateLimiter, get_model_rate_limiter
+
+
+class FakePaginator:
+    def __init__(self, quotas):
+        self.quotas = quotas
+
+    def paginate(self, ServiceCode):
+        assert ServiceCode == 'bedrock'
+        return [{'Quotas': self.quotas}]
+
+
+class FakeServiceQuotas:
+    def __init__(self, defaults, applied):
+        self.pages = {'list_aws_default_service_quotas': defaults, 'list_service_quotas': applied}
+
+    def get_paginator(self, operation):
+        return FakePaginator(self.pages[operation])
+
+
+class FakeBedrock:
+    def list_foundation_models(self):
+        return {'modelSummaries': [
+            {'modelId': 'anthropic.claude-3-haiku-20240307-v1:0', 'providerName': 'Anthropic', 'modelName': 'Claude 3 Haiku'},
+            {'modelId': 'amazon.titan-embed-text-v2:0', 'providerName': 'Amazon', 'modelName': 'Titan Text Embeddings V2'},
+        ]}
+
+
+def _quota(name, value):
+    return {'QuotaName': name, 'Value': value}
+
+
+@pytest.fixture
+def quotas(monkeypatch):
+    """Fresh limiter state with a quotas CSV and Service Quotas answers the test can set."""
+    monkeypatch.setattr(rate_limiter, '_model_limiters', {})
+    monkeypatch.setattr(rate_limiter, '_csv_quotas', None)
+    monkeypatch.setattr(rate_limiter, '_service_quotas', {})
+    state = SimpleNamespace(
+        config=SimpleNamespace(bedrock_quotas_csv_path='', bedrock_service_quotas=True, s3_bucket='bucket'),
+        csv=None,
+        defaults=[],
+        applied=[],
+    )
+    monkeypatch.setattr('config.config.get_config', lambda: state.config)
+    monkeypatch.setattr('util.s3util.S3Util', lambda: SimpleNamespace(read_csv_from_s3=lambda *args, **kwargs: state.csv))
+    clients = {'service-quotas': lambda: FakeServiceQuotas(state.defaults, state.applied), 'bedrock': FakeBedrock}
+    monkeypatch.setattr('util.boto3_clients.get_client', lambda service, region=None: clients[service]())
+    return state
+
+
+def test_quotas_csv_takes_precedence(quotas):
+    quotas.config.bedrock_quotas_csv_path = 'bedrock_quotas.csv'
+    quotas.csv = pd.DataFrame([
+        {'model': 'amazon.titan-embed-text-v2:0', 'region': '*', 'rpm': 2000, 'tpm': 300000},
+    ])
+    quotas.defaults = [_quota('On-demand model inference requests per minute for Amazon Titan Text Embeddings V2', 10)]
+
+    limiter = get_model_rate_limiter('amazon.titan-embed-text-v2:0', 'us-east-1')
+
+    assert (limiter.requests_per_minute, limiter.tokens_per_minute) == (2000, 300000)
+
+
+def test_service_quotas_match_model_names_and_prefer_applied_values(quotas):
+    quotas.defaults = [
+        _quota('On-demand model inference requests per minute for Anthropic Claude 3 Haiku', 1000),
+        _quota('On-demand model inference tokens per minute for Anthropic Claude 3 Haiku', 2000000),
+        _quota('Cross-region model inference requests per minute for Anthropic Claude 3 Haiku', 2000),
+    ]
+    quotas.applied = [_quota('On-demand model inference requests per minute for Anthropic Claude 3 Haiku', 1500)]
+
+    on_demand = get_model_rate_limiter('anthropic.claude-3-haiku-20240307-v1:0', 'us-east-1')
+    profile = get_model_rate_limiter('us.anthropic.claude-3-haiku-20240307-v1:0', 'us-east-1')
+
+    assert (on_demand.requests_per_minute, on_demand.tokens_per_minute) == (1500, 2000000)
+    assert (profile.requests_per_minute, profile.tokens_per_minute) == (2000, 0)
+
+
+def test_price_sheet_is_not_mistaken_for_quotas(quotas, caplog):
+    quotas.config.bedrock_quotas_csv_path = 'seed/bedrock_limits_small.csv'
+    quotas.csv = pd.DataFrame([{'model': 'anthropic.claude-3-haiku-20240307-v1:0', 'Region': 'us-east-1',
+                                'input_price': 0.00025, 'output_price': 0.00125}])
+    quotas.config.bedrock_service_quotas = False
+
+    with caplog.at_level(logging.ERROR):
+        limiter = get_model_rate_limiter('anthropic.claude-3-haiku-20240307-v1:0', 'us-east-1')
+
+    assert not limiter.limited
+    assert 'needs model, region and requests or tokens per minute columns' in caplog.text
+    assert 'No Bedrock quota known' in caplog.text
+
+
+def test_throttle_halves_the_rate_and_successes_restore_it():
+    limiter = AdaptiveRateLimiter(requests_per_minute=600, headroom=1.0, increase_step=0.25, cooldown=0)
+
+    limiter.on_throttle()
+    assert limiter.requests.rate == pytest.approx(5)
+
+    limiter.on_success()
+    limiter.on_success()
+    assert limiter.requests.rate == pytest.approx(10)
@@ -0,0 +1,71 @@
+import threading
+
+from app import runtime_cache
+from app.runtime_cache import RuntimeCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(runtime_cache.time, 'monotonic', clock)
+    cache = RuntimeCache(max_size=4, ttl_seconds=60)
+    cache.put('a', 1)
+    clock.now += 59
+    assert cache.get('a') == 1
+    clock.now += 1
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = RuntimeCache(max_size=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+
+
+def test_concurrent_misses_build_once():
+    cache = RuntimeCache()
+    builds = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def builder():
+        builds.append(threading.current_thread().name)
+        started.set()
+        release.wait(5)
+        return 'runtime'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_build('exp', builder))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    started.wait(5)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(builds) == 1
+    assert results == ['runtime'] * 8
+
+
+def test_none_is_not_cached_and_invalidate_drops_entries():
+    cache = RuntimeCache()
+    assert cache.get_or_build('missing', lambda: None) is None
+    assert cache.get_or_build('missing', lambda: 'found') == 'found'
+    cache.put('other', 'value')
+    cache.invalidate('missing')
+    assert cache.get('missing') is None
+    assert cache.get('other') == 'value'
+    cache.invalidate()
+    assert len(cache) == 0
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+bedrock_inferencer = pytest.importorskip('flotorch_core.inferencer.bedrock_inferencer')
+
+from app import streaming
+from app.streaming import _bedrock_request
+
+
+class RecordingClient:
+    def __init__(self):
+        self.requests = []
+
+    def converse(self, **request):
+        self.requests.append(request)
+        return {'output': {'message': {'content': [{'text': 'answer'}]}}, 'usage': {'inputTokens': 1, 'outputTokens': 1}}
+
+
+def _inferencer(model_id, **kwargs):
+    inferencer = bedrock_inferencer.BedrockInferencer(model_id, region='us-east-1', **kwargs)
+    inferencer.client = RecordingClient()
+    return inferencer
+
+
+@pytest.mark.parametrize('model_id, kwargs', [
+    ('anthropic.claude-3-haiku-20240307-v1:0', {}),
+    ('anthropic.claude-3-haiku-20240307-v1:0', {'max_tokens': 256, 'topP': 0.5, 'temperature': 0.1}),
+    ('amazon.titan-text-express-v1', {}),
+    ('mistral.mistral-7b-instruct-v0:2', {'n_shot_prompt_guide_obj': {'system_prompt': 'Be brief', 'user_prompt': 'Answer from the context'}}),
+])
+def test_streamed_request_matches_generate_text(model_id, kwargs):
+    inferencer = _inferencer(model_id, **kwargs)
+    context = [{'text': 'Bedrock is a managed service.'}]
+
+    inferencer.generate_text('What is Bedrock?', context)
+
+    assert _bedrock_request(inferencer, 'What is Bedrock?', context) == inferencer.client.requests[0]
+
+
+class BlockingEventStream:
+    """Yields one text delta, then blocks like a socket read until the stream is closed."""
+
+    def __init__(self):
+        self.closed = threading.Event()
+        self.finished = threading.Event()
+
+    def __iter__(self):
+        try:
+            yield {'contentBlockDelta': {'delta': {'text': 'Hello'}}}
+            self.closed.wait(5)
+            raise ValueError('read on a closed stream')
+        finally:
+            self.finished.set()
+
+    def close(self):
+        self.closed.set()
+
+
+def test_closing_the_stream_early_releases_the_reading_thread(monkeypatch):
+    stream = BlockingEventStream()
+    client = SimpleNamespace(converse_stream=lambda **request: {'stream': stream})
+
+    async def no_async_client(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(streaming, 'get_async_client', no_async_client)
+    monkeypatch.setattr(streaming, 'get_client', lambda *args, **kwargs: client)
+    inferencer = SimpleNamespace(
+        client=SimpleNamespace(meta=SimpleNamespace(service_model=SimpleNamespace(service_name='bedrock-runtime'), region_name='us-east-1')),
+        model_id='anthropic.claude-3-haiku-20240307-v1:0',
+        temperature=0.1,
+        generate_prompt=lambda query, use_context, context: (None, [{'role': 'user', 'content': [{'text': query}]}])
+    )
+
+    async def consume_first_delta():
+        generation = streaming.stream_generation(inferencer, 'Hi', None)
+        first = await generation.__anext__()
+        # The client disconnects while the thread waits on the next event
+        await generation.aclose()
+        return first
+
+    assert asyncio.run(consume_first_delta()) == ('delta', 'Hello')
+    assert stream.closed.is_set()
+    assert stream.finished.wait(5)
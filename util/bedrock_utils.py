@@ -1,7 +1,7 @@
-import boto3
 from config.config import Config
 import logging
 import functools
+from util.boto3_clients import get_client
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -10,7 +10,7 @@ class KnowledgeBaseUtils():
     def __init__(self, region):
         """Initialize KnowledgeBaseUtils with config and bedrock-agent client"""
         self.config = Config.load_config()
-        self.client = boto3.client("bedrock-agent", region_name=region)
+        self.client = get_client("bedrock-agent", region_name=region)
 
     def list_knowledge_bases(self):
         """
@@ -0,0 +1,148 @@
+import asyncio
+import os
+import threading
+import weakref
+import logging
+from contextlib import AsyncExitStack
+from typing import Any, Dict, Optional, Tuple
+
+import boto3
+from botocore.config import Config as BotoConfig
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+DEFAULT_MAX_POOL_CONNECTIONS = int(os.getenv('boto3_max_pool_connections', '50'))
+DEFAULT_MAX_ATTEMPTS = int(os.getenv('boto3_max_attempts', '5'))
+
+_lock = threading.Lock()
+_sessions: Dict[Optional[str], boto3.Session] = {}
+_clients: Dict[Tuple[str, Optional[str], str], Any] = {}
+_resources: Dict[Tuple[str, Optional[str], str], Any] = {}
+
+
+def _client_config(config_overrides: Dict[str, Any]) -> BotoConfig:
+    """Default client configuration: a large keep-alive connection pool and adaptive retries."""
+    config = BotoConfig(
+        max_pool_connections=DEFAULT_MAX_POOL_CONNECTIONS,
+        tcp_keepalive=True,
+        retries={'max_attempts': DEFAULT_MAX_ATTEMPTS, 'mode': 'adaptive'}
+    )
+    if config_overrides:
+        config = config.merge(BotoConfig(**config_overrides))
+    return config
+
+
+def _key(service_name: str, region_name: Optional[str], config_overrides: Dict[str, Any]) -> Tuple[str, Optional[str], str]:
+    return service_name, region_name, repr(sorted(config_overrides.items()))
+
+
+def get_session(region_name: Optional[str] = None) -> boto3.Session:
+    """Return the process-wide boto3 session for a region, so credentials are resolved once."""
+    with _lock:
+        session = _sessions.get(region_name)
+        if session is None:
+            session = boto3.Session(region_name=region_name)
+            _sessions[region_name] = session
+        return session
+
+
+def get_client(service_name: str, region_name: Optional[str] = None, **config_overrides: Any) -> Any:
+    """
+    Return a shared boto3 client for (service, region, config).
+
+    Clients are thread-safe and created once per process. Keyword arguments override the
+    default botocore Config, e.g. `max_pool_connections=8` or `signature_version='s3v4'`.
+    """
+    key = _key(service_name, region_name, config_overrides)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    session = get_session(region_name)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            # Session.client is not thread-safe, so clients are created under the lock
+            client = session.client(service_name, config=_client_config(config_overrides))
+            _clients[key] = client
+            logger.debug(f"Created shared {service_name} client for region {region_name or 'default'}")
+        return client
+
+
+def get_resource(service_name: str, region_name: Optional[str] = None, **config_overrides: Any) -> Any:
+    """Return a shared boto3 resource for (service, region, config), built like `get_client`."""
+    key = _key(service_name, region_name, config_overrides)
+    resource = _resources.get(key)
+    if resource is not None:
+        return resource
+    session = get_session(region_name)
+    with _lock:
+        resource = _resources.get(key)
+        if resource is None:
+            resource = session.resource(service_name, config=_client_config(config_overrides))
+            _resources[key] = resource
+        return resource
+
+
+# aiobotocore clients are bound to the event loop that created them: loop -> {key: client}
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, Optional[str], str], Any]]" = weakref.WeakKeyDictionary()
+_async_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = weakref.WeakKeyDictionary()
+# The clients of a loop are entered on its exit stack, so `close_async_clients` closes them all
+_async_exit_stacks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncExitStack]" = weakref.WeakKeyDictionary()
+
+
+async def get_async_client(service_name: str, region_name: Optional[str] = None, **config_overrides: Any) -> Optional[Any]:
+    """
+    Return a shared aiobotocore client for (service, region, config) on the running event loop.
+
+    Returns None when aiobotocore is not installed, so callers can fall back to the blocking
+    client on a worker thread. Clients stay open until `close_async_clients` is awaited on
+    their event loop, which whoever runs the loop does before it finishes.
+    """
+    try:
+        from aiobotocore.session import get_session as get_aio_session
+    except ImportError:
+        return None
+
+    loop = asyncio.get_running_loop()
+    key = _key(service_name, region_name, config_overrides)
+    clients = _async_clients.setdefault(loop, {})
+    client = clients.get(key)
+    if client is not None:
+        return client
+    lock = _async_locks.setdefault(loop, asyncio.Lock())
+    async with lock:
+        client = clients.get(key)
+        if client is None:
+            stack = _async_exit_stacks.setdefault(loop, AsyncExitStack())
+            client = await stack.enter_async_context(get_aio_session().create_client(
+                service_name, region_name=region_name or get_session().region_name,
+                config=_client_config(config_overrides)
+            ))
+            clients[key] = client
+        return client
+
+
+async def close_async_clients() -> None:
+    """Close the aiobotocore clients created on the running event loop, releasing their connection pools."""
+    loop = asyncio.get_running_loop()
+    _async_clients.pop(loop, None)
+    _async_locks.pop(loop, None)
+    stack = _async_exit_stacks.pop(loop, None)
+    if stack is not None:
+        await stack.aclose()
+
+
+def _reset_after_fork() -> None:
+    """Forked workers must not share the parent's connection pools."""
+    global _lock
+    _lock = threading.Lock()
+    _sessions.clear()
+    _clients.clear()
+    _resources.clear()
+    _async_clients.clear()
+    _async_locks.clear()
+    _async_exit_stacks.clear()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
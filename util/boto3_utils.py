@@ -1,14 +1,15 @@
-from typing import Dict
+from typing import Any, Dict, Optional, Tuple
 import time 
 import logging
 import botocore
 from baseclasses.base_classes import BotoRetryHandler, RetryParams
+from util.rate_limiter import AdaptiveRateLimiter, estimate_tokens, get_model_rate_limiter
 
 logger = logging.getLogger()
 logging.basicConfig(level=logging.INFO)
 
 class BedRockRetryHander(BotoRetryHandler):
-    """Retry handler for Bedrock service."""
+    """Retry handler for Bedrock service, pacing calls through the model's shared RPM/TPM limiter."""
     @property
     def retry_params(self) -> RetryParams:
         return RetryParams(
@@ -23,4 +24,43 @@ class BedRockRetryHander(BotoRetryHandler):
             "ThrottlingException",
             "ServiceQuotaExceededException",
             "ModelTimeoutException"
-        }
\ No newline at end of file
+        }
+
+    def rate_limiter(self, instance: Any) -> Optional[AdaptiveRateLimiter]:
+        model_id = getattr(instance, 'model_id', None)
+        client = getattr(instance, 'client', None)
+        if not model_id or client is None:
+            return None
+        if client.meta.service_model.service_name != 'bedrock-runtime':
+            # e.g. SageMaker embedders running through the embedding engine
+            return None
+        return get_model_rate_limiter(model_id, client.meta.region_name)
+
+    def estimate_tokens(self, args: Tuple, kwargs: Dict[str, Any]) -> int:
+        return estimate_tokens(args, kwargs)
+
+    def actual_tokens(self, result: Any) -> Optional[int]:
+        # Embedders and inferencers return (metadata, value) with Bedrock token counts in the metadata
+        if isinstance(result, tuple) and result and isinstance(result[0], dict):
+            metadata = result[0]
+            if 'inputTokens' in metadata:
+                return int(metadata.get('inputTokens', 0)) + int(metadata.get('outputTokens', 0))
+        return None
+
+
+class SageMakerRetryHandler(BotoRetryHandler):
+    """Retry handler for SageMaker endpoint invocations."""
+    @property
+    def retry_params(self) -> RetryParams:
+        return RetryParams(
+            max_retries=5,
+            retry_delay=2,
+            backoff_factor=2
+        )
+
+    @property
+    def retryable_errors(self):
+        return {
+            "ThrottlingException",
+            "ModelNotReadyException"
+        }
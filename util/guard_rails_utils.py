@@ -1,6 +1,6 @@
-import boto3
 from typing import Dict, List
 import logging
+from util.boto3_clients import get_client
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -11,7 +11,7 @@ class GuardRailsUtils:
         "Static method to fetch AWS Bedrock guardrails."
 
         try:
-            client = boto3.client('bedrock', region_name=region)
+            client = get_client('bedrock', region_name=region)
 
             logger.info("Fetching guardrails.")            
             response = client.list_guardrails()
@@ -0,0 +1,15 @@
+import importlib
+from typing import Any, Union
+
+
+def load_class(target: Union[type, str]) -> Any:
+    """
+    Return `target`, importing it first when it is given as a "package.module:ClassName" path.
+
+    Factories register heavy providers (SageMaker, RAGAS) by path so that their dependencies are
+    only imported when a provider is actually created, not whenever the factory is imported.
+    """
+    if not isinstance(target, str):
+        return target
+    module_name, _, attribute = target.partition(':')
+    return getattr(importlib.import_module(module_name), attribute)
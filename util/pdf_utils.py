@@ -1,20 +1,32 @@
 import os
+import tempfile
+import multiprocessing
 from PyPDF2 import PdfReader
 import logging
-from io import StringIO
+from io import BytesIO, StringIO
 import fitz 
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+DEFAULT_PDF_BACKEND = "pymupdf"
+FALLBACK_PDF_BACKEND = "pypdf2"
+DEFAULT_PAGES_PER_TASK = 200
+# In-memory PDFs larger than this are extracted from a temporary file instead of being sent to every page range task
+DEFAULT_SPILL_BYTES = 32 * 1024 * 1024
+DEFAULT_MAX_INFLIGHT_BYTES = 256 * 1024 * 1024
+
+# A PDF given by its local path or by its content
+PdfSource = Union[str, bytes]
+
 def extract_text_from_pdf(file_path: str) -> str:
     """Extract text from a PDF file."""
     try:
         logger.info(f"Extracting text from PDF: {file_path}")
-        reader = PdfReader(file_path)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() or ""
+        text = _extract_pages_pypdf2(file_path)
         logger.info("Text extraction from PDF successful.")
         return text
     except Exception as e:
@@ -25,29 +37,244 @@ def extract_text_from_pdf_pymudf(file_path: str) -> str:
     """Extract text from a PDF file."""
     try:
         logger.info(f"Extracting text from PDF: {file_path}")
-        doc = fitz.open(file_path)
-        text_buffer = StringIO()
-        for page in doc:
-            page_text = page.get_text() or ""
-            text_buffer.write(page_text)
-
+        text = _extract_pages_pymupdf(file_path)
         logger.info("Text extraction from PDF successful.")
-        text = text_buffer.getvalue()
-        text_buffer.close()
         return text
     except Exception as e:
         logger.error(f"Failed to extract text from PDF: {e}")
         raise
-    
-def process_pdf_from_folder(file_path: str) -> str:
+
+def _pypdf2_reader(source: PdfSource) -> PdfReader:
+    return PdfReader(BytesIO(source) if isinstance(source, bytes) else source)
+
+def _open_pymupdf(source: PdfSource):
+    return fitz.open(stream=source, filetype="pdf") if isinstance(source, bytes) else fitz.open(source)
+
+def _extract_pages_pypdf2(file_path: PdfSource, start: int = 0, end: Optional[int] = None) -> str:
+    reader = _pypdf2_reader(file_path)
+    pages = reader.pages[start:end]
+    return "".join(page.extract_text() or "" for page in pages)
+
+def _extract_pages_pymupdf(file_path: PdfSource, start: int = 0, end: Optional[int] = None) -> str:
+    with _open_pymupdf(file_path) as doc:
+        end = doc.page_count if end is None else min(end, doc.page_count)
+        text_buffer = StringIO()
+        for page_no in range(start, end):
+            text_buffer.write(doc[page_no].get_text() or "")
+        return text_buffer.getvalue()
+
+def _count_pages_pypdf2(file_path: PdfSource) -> int:
+    return len(_pypdf2_reader(file_path).pages)
+
+def _count_pages_pymupdf(file_path: PdfSource) -> int:
+    with _open_pymupdf(file_path) as doc:
+        return doc.page_count
+
+# Extractor backends: name -> (page range extractor, page counter)
+PDF_BACKENDS: Dict[str, Tuple[Callable[[PdfSource, int, Optional[int]], str], Callable[[PdfSource], int]]] = {
+    "pymupdf": (_extract_pages_pymupdf, _count_pages_pymupdf),
+    "pypdf2": (_extract_pages_pypdf2, _count_pages_pypdf2),
+}
+
+def _get_backend(backend: str) -> Tuple[Callable[[PdfSource, int, Optional[int]], str], Callable[[PdfSource], int]]:
+    name = backend.lower()
+    if name not in PDF_BACKENDS:
+        raise ValueError(f"Unknown PDF extractor backend: {backend}. Supported backends: {list(PDF_BACKENDS)}")
+    return PDF_BACKENDS[name]
+
+def extract_page_range(file_path: PdfSource, start: int, end: Optional[int], backend: str = DEFAULT_PDF_BACKEND,
+                       name: Optional[str] = None) -> str:
+    """
+    Extract text from pages [start, end) of a PDF, given by path or content, with the given backend.
+
+    Falls back to PyPDF2 when the selected backend cannot read the file. Runs in pool worker processes.
+    """
+    extract, _ = _get_backend(backend)
+    try:
+        return extract(file_path, start, end)
+    except Exception as e:
+        if backend.lower() == FALLBACK_PDF_BACKEND:
+            raise
+        logger.warning(f"{backend} failed on {name or file_path} pages {start}-{end}: {e}, falling back to {FALLBACK_PDF_BACKEND}")
+        fallback, _ = _get_backend(FALLBACK_PDF_BACKEND)
+        return fallback(file_path, start, end)
+
+def extract_leading_pages(file_path: PdfSource, pages_per_task: int, backend: str = DEFAULT_PDF_BACKEND,
+                          name: Optional[str] = None) -> Tuple[int, str]:
+    """
+    Count the pages of a PDF and extract its first `pages_per_task` pages, returning (page count, text).
+
+    A PDF of at most `pages_per_task` pages, or whose pages cannot be counted, is extracted whole and
+    reported with a page count of 0. Runs in pool worker processes.
+    """
+    _, count_pages = _get_backend(backend)
+    try:
+        page_count = count_pages(file_path)
+    except Exception as e:
+        logger.warning(f"Could not count pages of {name or file_path} with {backend}: {e}, extracting it as a single task")
+        page_count = 0
+    if page_count <= pages_per_task:
+        return 0, extract_page_range(file_path, 0, None, backend, name)
+    return page_count, extract_page_range(file_path, 0, pages_per_task, backend, name)
+
+def iter_pdf_text_from_folder(file_path: str, backend: str = DEFAULT_PDF_BACKEND, max_workers: Optional[int] = None,
+                              pages_per_task: int = DEFAULT_PAGES_PER_TASK) -> Iterator[str]:
+    """
+    Extract text from all files in a folder on a process pool, yielding each document as soon as it completes.
+
+    Large PDFs are split into page ranges of `pages_per_task` pages that are extracted in parallel and
+    re-assembled in page order. The task extracting the first range also counts the pages, so the
+    remaining ranges are queued once it completes. At most twice `max_workers` tasks are in flight, so a slow consumer
+    holds back extraction instead of buffering the whole knowledge base.
+
+    Args:
+        file_path (str): Folder containing the PDF files.
+        backend (str): Extractor backend, "pymupdf" (default) or "pypdf2".
+        max_workers (Optional[int]): Number of worker processes, defaults to the number of CPUs.
+        pages_per_task (int): Maximum number of pages extracted by a single task.
+
+    Yields:
+        str: The text of one document.
+    """
+    files = [os.path.join(file_path, file) for file in sorted(os.listdir(file_path))]
+    for _, text in iter_pdf_documents(files, backend=backend, max_workers=max_workers, pages_per_task=pages_per_task):
+        yield text
+
+def iter_pdf_documents(files: List[str], backend: str = DEFAULT_PDF_BACKEND, max_workers: Optional[int] = None,
+                       pages_per_task: int = DEFAULT_PAGES_PER_TASK) -> Iterator[Tuple[str, str]]:
+    """
+    Extract text from the given PDF files like `iter_pdf_text_from_folder`, yielding (file path, text) pairs.
+    """
+    return _iter_documents(((pdf_path, pdf_path) for pdf_path in files), backend, max_workers, pages_per_task)
+
+def iter_pdf_documents_from_bytes(documents: Iterable[Tuple[str, bytes]], backend: str = DEFAULT_PDF_BACKEND,
+                                  max_workers: Optional[int] = None, pages_per_task: int = DEFAULT_PAGES_PER_TASK,
+                                  spill_bytes: int = DEFAULT_SPILL_BYTES,
+                                  max_inflight_bytes: int = DEFAULT_MAX_INFLIGHT_BYTES) -> Iterator[Tuple[str, str]]:
+    """
+    Extract text from (name, PDF content) pairs, e.g. objects streamed from S3, yielding (name, text) pairs.
+
+    The documents are pulled lazily, as extraction tasks free up. A document of at most `spill_bytes`
+    is extracted by a single task, so its content is sent to one worker once. A larger one is written
+    to a temporary file that its page range tasks open by path, and removed once it is extracted. At
+    most `max_inflight_bytes` of document content is queued to the workers at a time.
+    """
+    return _iter_documents(documents, backend, max_workers, pages_per_task, spill_bytes, max_inflight_bytes)
+
+def _spill(source: bytes) -> str:
+    fd, path = tempfile.mkstemp(prefix='kb_', suffix='.pdf')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(source)
+    return path
+
+def _iter_documents(documents: Iterable[Tuple[str, PdfSource]], backend: str, max_workers: Optional[int],
+                    pages_per_task: int, spill_bytes: Optional[int] = None,
+                    max_inflight_bytes: Optional[int] = None) -> Iterator[Tuple[str, str]]:
+    _get_backend(backend)
+    max_workers = max_workers or os.cpu_count() or 1
+    pages_per_task = max(1, pages_per_task)
+    # doc_no -> temporary file holding the content of a large document
+    spilled: Dict[int, str] = {}
+
+    def _tasks():
+        for doc_no, (pdf_path, source) in enumerate(documents):
+            if isinstance(source, bytes) and spill_bytes is not None:
+                if len(source) <= spill_bytes:
+                    yield doc_no, pdf_path, source, 0, 0, None
+                    continue
+                source = spilled[doc_no] = _spill(source)
+            # Part 0 counts the pages in the worker, the other ranges are queued when it completes
+            yield doc_no, pdf_path, source, 0, None, None
+
+    def _task_bytes(task) -> int:
+        source = task[2]
+        return len(source) if isinstance(source, bytes) else 0
+
+    parts: Dict[int, Dict[int, str]] = {}
+    # doc_no -> number of parts, known once its first part is extracted
+    total_parts: Dict[int, int] = {}
+    file_count = 0
+    tasks = _tasks()
+    next_task = None
+    # Page ranges of split documents, submitted ahead of new documents
+    ranges = deque()
+    inflight_bytes = 0
+    try:
+        # The pool is created on the pipeline's prefetch threads, forking there could copy a lock held by another thread
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            pending = {}
+
+            def _submit_next() -> bool:
+                nonlocal next_task, inflight_bytes
+                if ranges:
+                    task = ranges.popleft()
+                else:
+                    if next_task is None:
+                        next_task = next(tasks, None)
+                        if next_task is None:
+                            return False
+                    # Every task pickles its own copy of in-memory content, a single oversized task may still run alone
+                    if pending and max_inflight_bytes is not None and inflight_bytes + _task_bytes(next_task) > max_inflight_bytes:
+                        return False
+                    task, next_task = next_task, None
+                doc_no, pdf_path, source, part_no, start, end = task
+                size = _task_bytes(task)
+                if start is None:
+                    future = executor.submit(extract_leading_pages, source, pages_per_task, backend, pdf_path)
+                else:
+                    future = executor.submit(extract_page_range, source, start, end, backend, pdf_path)
+                pending[future] = (doc_no, pdf_path, source, part_no, start is None, size)
+                inflight_bytes += size
+                return True
+
+            while len(pending) < max_workers * 2 and _submit_next():
+                pass
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    doc_no, pdf_path, source, part_no, leading, size = pending.pop(future)
+                    inflight_bytes -= size
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.error(f"Failed to extract text from PDF {pdf_path}: {e}")
+                        raise
+                    if leading:
+                        page_count, text = result
+                        starts = range(pages_per_task, page_count, pages_per_task)
+                        total_parts[doc_no] = 1 + len(starts)
+                        ranges.extend((doc_no, pdf_path, source, part, start, min(start + pages_per_task, page_count))
+                                      for part, start in enumerate(starts, 1))
+                    else:
+                        text = result
+                        total_parts.setdefault(doc_no, 1)
+                    doc_parts = parts.setdefault(doc_no, {})
+                    doc_parts[part_no] = text
+                    if len(doc_parts) == total_parts[doc_no]:
+                        del parts[doc_no]
+                        count = total_parts.pop(doc_no)
+                        if doc_no in spilled:
+                            os.remove(spilled.pop(doc_no))
+                        file_count += 1
+                        logger.info(f"Extracted text from PDF: {pdf_path}")
+                        yield pdf_path, "".join(doc_parts[i] for i in range(count))
+                while len(pending) < max_workers * 2 and _submit_next():
+                    pass
+    finally:
+        tasks.close()
+        for path in spilled.values():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    logger.info(f"Extracted text from all files. Number of files: {file_count}")
+
+def process_pdf_from_folder(file_path: str, backend: str = DEFAULT_PDF_BACKEND, max_workers: Optional[int] = None) -> List[str]:
     "Extract text from all files in a folder"
     try:
-        text_data = []
-        for file in os.listdir(file_path):
-            file_text = extract_text_from_pdf(os.path.join(file_path, file))
-            text_data.append(file_text)
-        logger.info(f"Extracted text from all files. Number of files: {len(text_data)}")
-        return text_data
+        return list(iter_pdf_text_from_folder(file_path, backend=backend, max_workers=max_workers))
     except Exception as e:
         logger.error(f"Failed to extract text from PDF: {e}")
-        raise
\ No newline at end of file
+        raise
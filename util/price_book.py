@@ -0,0 +1,184 @@
+import csv
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+import logging
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+try:
+    from util.boto3_clients import get_client
+except ImportError:
+    # The cost compute lambda image copies this module on its own, without the rest of util
+    from boto3 import client as get_client
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+class ModelPrice(NamedTuple):
+    input_price: float
+    output_price: Optional[float]
+
+
+class PriceBook:
+    """
+    Bedrock price sheet indexed by (model, region).
+
+    The sheet is read from S3 once and re-validated at most every `refresh_seconds` with a
+    conditional GET on its ETag, so an unchanged sheet is never downloaded again. Each version is
+    written to a local snapshot. On a cold start the snapshot's ETag turns the first load into a
+    bodiless revalidation when the sheet is unchanged, and the snapshot keeps lookups working if
+    S3 is unreachable. Lookups are thread-safe and never wait for a refresh once prices are loaded.
+    """
+
+    def __init__(self, bucket: str, key: str, snapshot_dir: Optional[str] = None, refresh_seconds: float = 300,
+                 s3_client=None):
+        self.bucket = bucket
+        self.key = key
+        self.refresh_seconds = refresh_seconds
+        self.s3_client = s3_client
+        self.snapshot_path = None
+        if snapshot_dir:
+            digest = hashlib.sha1(f"{bucket}/{key}".encode('utf-8')).hexdigest()
+            self.snapshot_path = os.path.join(snapshot_dir, f"price_book_{digest}.json")
+        self.etag: Optional[str] = None
+        self._prices: Optional[Dict[Tuple[str, str], ModelPrice]] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, model: str, region: str) -> Optional[ModelPrice]:
+        """Return the prices of a model in a region, or None if the sheet does not list it."""
+        self._refresh_if_stale()
+        return self._prices.get((model, region)) if self._prices else None
+
+    def __len__(self) -> int:
+        self._refresh_if_stale()
+        return len(self._prices or {})
+
+    def _refresh_if_stale(self) -> None:
+        if self._prices is not None and time.monotonic() - self._checked_at < self.refresh_seconds:
+            return
+        if self._prices is None:
+            with self._lock:
+                if self._prices is None:
+                    self._load_snapshot()
+                    self._refresh()
+        # Readers keep using the loaded prices while one thread revalidates them
+        elif self._lock.acquire(blocking=False):
+            try:
+                self._refresh()
+            finally:
+                self._lock.release()
+
+    def refresh(self) -> bool:
+        """Revalidate the sheet against S3 now, returning True if a new version was loaded."""
+        with self._lock:
+            return self._refresh()
+
+    def _refresh(self) -> bool:
+        self._checked_at = time.monotonic()
+        if not self.bucket or not self.key:
+            self._prices = self._prices or {}
+            return False
+        if self.s3_client is None:
+            self.s3_client = get_client('s3')
+        request = {'Bucket': self.bucket, 'Key': self.key}
+        if self.etag and self._prices is not None:
+            request['IfNoneMatch'] = self.etag
+        try:
+            response = self.s3_client.get_object(**request)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('304', 'NotModified'):
+                return False
+            return self._keep_current(e)
+        except Exception as e:
+            return self._keep_current(e)
+
+        self._prices = self._parse(response['Body'].read().decode('utf-8'))
+        self.etag = response.get('ETag')
+        logger.info(f"Loaded prices of {len(self._prices)} models from s3://{self.bucket}/{self.key}")
+        self._save_snapshot()
+        return True
+
+    def _keep_current(self, error: Exception) -> bool:
+        if self._prices is None:
+            logger.error(f"Failed to read prices from s3://{self.bucket}/{self.key} and no snapshot is available: {error}")
+            self._prices = {}
+        else:
+            logger.warning(f"Failed to refresh prices from s3://{self.bucket}/{self.key}, keeping the loaded version: {error}")
+        return False
+
+    @staticmethod
+    def _parse(content: str) -> Dict[Tuple[str, str], ModelPrice]:
+        prices = {}
+        for row in csv.DictReader(io.StringIO(content)):
+            key = (row.get('model'), row.get('Region'))
+            # The first row of a duplicated (model, region) wins
+            if key in prices:
+                continue
+            input_price = _to_float(row.get('input_price'))
+            if input_price is None:
+                continue
+            prices[key] = ModelPrice(input_price, _to_float(row.get('output_price')))
+        return prices
+
+    def _load_snapshot(self) -> None:
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return
+        try:
+            with open(self.snapshot_path, 'r') as f:
+                snapshot = json.load(f)
+            self._prices = {(model, region): ModelPrice(input_price, output_price)
+                            for model, region, input_price, output_price in snapshot['prices']}
+            self.etag = snapshot.get('etag')
+            logger.info(f"Loaded prices of {len(self._prices)} models from snapshot {self.snapshot_path}")
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable price snapshot {self.snapshot_path}: {e}")
+
+    def _save_snapshot(self) -> None:
+        if not self.snapshot_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+            temp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w') as f:
+                json.dump({
+                    'etag': self.etag,
+                    'prices': [[model, region, *price] for (model, region), price in self._prices.items()]
+                }, f)
+            os.replace(temp_path, self.snapshot_path)
+        except OSError as e:
+            logger.warning(f"Failed to write price snapshot {self.snapshot_path}: {e}")
+
+
+def _to_float(value) -> Optional[float]:
+    if value is None or str(value).strip() == '':
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+_price_book: Optional[PriceBook] = None
+_price_book_lock = threading.Lock()
+
+
+def get_price_book() -> PriceBook:
+    """Return the process-wide price book of the Bedrock price sheet configured for this deployment."""
+    global _price_book
+    if _price_book is None:
+        with _price_book_lock:
+            if _price_book is None:
+                _price_book = PriceBook(
+                    bucket=os.getenv('s3_bucket', ''),
+                    key=os.getenv('bedrock_limit_csv', ''),
+                    snapshot_dir=os.getenv('price_book_snapshot_dir', '/tmp/price_book'),
+                    refresh_seconds=float(os.getenv('price_book_refresh_seconds', '300'))
+                )
+    return _price_book
@@ -0,0 +1,321 @@
+import asyncio
+import re
+import threading
+import time
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket allowing `rate` requests per second.
+
+    A rate of 0 or less disables limiting. Can be used as a context manager, or an async
+    context manager in coroutines, around a call.
+    """
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = float(rate or 0)
+        self.capacity = float(burst or max(1, int(self.rate)))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float = 1) -> None:
+        """
+        Take `amount` tokens, waiting until they are available.
+
+        An amount larger than the bucket is let through once the bucket is full and leaves it in
+        debt, so the long-run rate still holds for requests bigger than one second's allowance.
+        """
+        while True:
+            wait_time = self._reserve(amount)
+            if wait_time <= 0:
+                return
+            time.sleep(wait_time)
+
+    async def aacquire(self, amount: float = 1) -> None:
+        """Like `acquire`, but waits without blocking the event loop."""
+        while True:
+            wait_time = self._reserve(amount)
+            if wait_time <= 0:
+                return
+            await asyncio.sleep(wait_time)
+
+    def _reserve(self, amount: float) -> float:
+        """Take the tokens if available and return 0, otherwise return how long to wait for them."""
+        if self.rate <= 0:
+            return 0
+        with self._lock:
+            self._refill()
+            needed = min(amount, self.capacity)
+            if self._tokens >= needed:
+                self._tokens -= amount
+                return 0
+            return (needed - self._tokens) / self.rate
+
+    def adjust(self, amount: float) -> None:
+        """Give back (positive) or charge (negative) tokens after the fact."""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+    def set_rate(self, rate: float) -> None:
+        """Change the refill rate, keeping the bucket size."""
+        with self._lock:
+            self._refill()
+            self.rate = float(rate or 0)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if self.rate > 0:
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def __enter__(self) -> "RateLimiter":
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        return None
+
+    async def __aenter__(self) -> "RateLimiter":
+        await self.aacquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        return None
+
+
+class ServiceRateLimits:
+    """Named rate limiters, one per downstream service. Unknown services are not limited."""
+
+    def __init__(self, rates: Dict[str, float]):
+        self.limiters = {service: RateLimiter(rate) for service, rate in rates.items()}
+        self._unlimited = RateLimiter(0)
+
+    def __getitem__(self, service: str) -> RateLimiter:
+        return self.limiters.get(service, self._unlimited)
+
+
+class AdaptiveRateLimiter:
+    """
+    Shared requests-per-minute and tokens-per-minute limiter for one model.
+
+    Callers acquire one request and an estimate of its tokens before every call, then report the
+    actual usage and whether the call was throttled. Throttles halve the allowed rate (at most once
+    per `cooldown` seconds, so a burst of concurrent throttles counts once) and every success adds
+    `increase_step` of the quota back (AIMD), so throughput settles just under the quota instead of
+    every caller backing off and surging together. A quota of 0 leaves that dimension unlimited.
+    """
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0, headroom: float = 0.9,
+                 min_fraction: float = 0.05, increase_step: float = 0.01, cooldown: float = 1.0):
+        self.requests_per_minute = float(requests_per_minute or 0)
+        self.tokens_per_minute = float(tokens_per_minute or 0)
+        self.headroom = headroom
+        self.min_fraction = min_fraction
+        self.increase_step = increase_step
+        self.cooldown = cooldown
+        self.fraction = 1.0
+        self.requests = RateLimiter(self.requests_per_minute * headroom / 60)
+        self.tokens = RateLimiter(self.tokens_per_minute * headroom / 60)
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def limited(self) -> bool:
+        return self.requests_per_minute > 0 or self.tokens_per_minute > 0
+
+    def acquire(self, estimated_tokens: int = 0) -> None:
+        self.requests.acquire()
+        if estimated_tokens > 0:
+            self.tokens.acquire(estimated_tokens)
+
+    async def aacquire(self, estimated_tokens: int = 0) -> None:
+        await self.requests.aacquire()
+        if estimated_tokens > 0:
+            await self.tokens.aacquire(estimated_tokens)
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Charge (or refund) the difference between the estimated and the actual token count."""
+        if actual_tokens != estimated_tokens:
+            self.tokens.adjust(estimated_tokens - actual_tokens)
+
+    def on_success(self) -> None:
+        if not self.limited or self.fraction >= 1.0:
+            return
+        with self._lock:
+            self._set_fraction(min(1.0, self.fraction + self.increase_step))
+
+    def on_throttle(self) -> None:
+        if not self.limited:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_decrease < self.cooldown:
+                return
+            self._last_decrease = now
+            self._set_fraction(max(self.min_fraction, self.fraction / 2))
+            logger.info(f"Throttled, reducing rate to {self.fraction:.0%} of quota "
+                        f"({self.requests.rate * 60:.0f} requests/min, {self.tokens.rate * 60:.0f} tokens/min)")
+
+    def _set_fraction(self, fraction: float) -> None:
+        self.fraction = fraction
+        self.requests.set_rate(self.requests_per_minute * self.headroom * fraction / 60)
+        self.tokens.set_rate(self.tokens_per_minute * self.headroom * fraction / 60)
+
+
+_model_limiters: Dict[Tuple[str, Optional[str]], AdaptiveRateLimiter] = {}
+_csv_quotas: Optional[Dict[Tuple[str, str], Tuple[float, float]]] = None
+_service_quotas: Dict[Optional[str], Dict[Tuple[str, str], Tuple[float, float]]] = {}
+_model_limiters_lock = threading.Lock()
+
+# Column names accepted for the quotas in the Bedrock quotas CSV
+_RPM_COLUMNS = ('requests_per_minute', 'rpm', 'max_rpm', 'requests_per_min')
+_TPM_COLUMNS = ('tokens_per_minute', 'tpm', 'max_tpm', 'tokens_per_min')
+
+# Cross-region inference profiles prefix the model id with a geography, e.g. us.anthropic.claude-3-haiku-20240307-v1:0
+_PROFILE_PREFIXES = ('us.', 'eu.', 'apac.', 'us-gov.')
+
+# Bedrock quota names, e.g. "On-demand model inference tokens per minute for Anthropic Claude 3 Haiku"
+_QUOTA_NAME = re.compile(r'^(on-demand|cross-region) .*?\b(requests|tokens) per minute for (.+)$', re.IGNORECASE)
+
+
+def _load_csv_quotas() -> Dict[Tuple[str, str], Tuple[float, float]]:
+    """
+    Read (model, region) -> (requests/min, tokens/min) from the Bedrock quotas CSV.
+
+    The CSV lives at `bedrock_quotas_csv_path` in the data bucket, with the columns model, region,
+    requests_per_minute and tokens_per_minute (see docs/bedrock-quotas.md). A region of * applies
+    to every region. This is not the Bedrock price sheet at `bedrock_limit_csv_path`.
+    """
+    from config.config import get_config
+    from util.s3util import S3Util
+
+    config = get_config()
+    if not config.bedrock_quotas_csv_path:
+        return {}
+    try:
+        df = S3Util().read_csv_from_s3(config.bedrock_quotas_csv_path, config.s3_bucket, as_dataframe=True)
+    except Exception as e:
+        logger.error(f"Could not load the Bedrock quotas CSV {config.bedrock_quotas_csv_path}: {e}")
+        return {}
+
+    columns = {column.strip().lower(): column for column in df.columns}
+    rpm_column = next((columns[name] for name in _RPM_COLUMNS if name in columns), None)
+    tpm_column = next((columns[name] for name in _TPM_COLUMNS if name in columns), None)
+    model_column, region_column = columns.get('model'), columns.get('region')
+    if not model_column or not region_column or not (rpm_column or tpm_column):
+        logger.error(f"Bedrock quotas CSV {config.bedrock_quotas_csv_path} needs model, region and requests or tokens per minute columns")
+        return {}
+
+    quotas = {}
+    for row in df.to_dict('records'):
+        rpm = float(row[rpm_column] or 0) if rpm_column else 0
+        tpm = float(row[tpm_column] or 0) if tpm_column else 0
+        quotas[(str(row[model_column]).strip(), str(row[region_column]).strip())] = (rpm, tpm)
+    logger.info(f"Loaded Bedrock quotas for {len(quotas)} models from {config.bedrock_quotas_csv_path}")
+    return quotas
+
+
+def _load_service_quotas(region: Optional[str]) -> Dict[Tuple[str, str], Tuple[float, float]]:
+    """
+    Read (scope, model id) -> (requests/min, tokens/min) for a region from the Service Quotas API.
+
+    Bedrock quotas are named after the provider and model name, so they are matched to model ids
+    through ListFoundationModels. The scope is "on-demand" or "cross-region" (inference profiles).
+    Applied values replace the defaults, and where several quotas name the same model and
+    dimension (InvokeModel and model inference) the lowest one counts.
+    """
+    from util.boto3_clients import get_client
+
+    def _read(operation: str) -> Dict[Tuple[str, str, str], float]:
+        values: Dict[Tuple[str, str, str], float] = {}
+        paginator = get_client('service-quotas', region).get_paginator(operation)
+        for page in paginator.paginate(ServiceCode='bedrock'):
+            for quota in page.get('Quotas', []):
+                match = _QUOTA_NAME.match(quota.get('QuotaName', ''))
+                if match and quota.get('Value') is not None:
+                    key = (match.group(1).lower(), match.group(2).lower(), match.group(3).strip().lower())
+                    values[key] = min(values.get(key, float('inf')), float(quota['Value']))
+        return values
+
+    values = {**_read('list_aws_default_service_quotas'), **_read('list_service_quotas')}
+    quotas = {}
+    for model in get_client('bedrock', region).list_foundation_models().get('modelSummaries', []):
+        name = f"{model.get('providerName', '')} {model.get('modelName', '')}".strip().lower()
+        for scope in ('on-demand', 'cross-region'):
+            rpm, tpm = values.get((scope, 'requests', name), 0), values.get((scope, 'tokens', name), 0)
+            if rpm or tpm:
+                quotas[(scope, model['modelId'])] = (rpm, tpm)
+    logger.info(f"Loaded Bedrock quotas for {len(quotas)} models in {region} from Service Quotas")
+    return quotas
+
+
+def _find_quota(model_id: str, region: Optional[str]) -> Optional[Tuple[float, float]]:
+    """Quota of a model, from the quotas CSV first and the Service Quotas API second."""
+    from config.config import get_config
+
+    global _csv_quotas
+    if _csv_quotas is None:
+        _csv_quotas = _load_csv_quotas()
+    quota = _csv_quotas.get((model_id, region)) or _csv_quotas.get((model_id, '*'))
+    if quota is not None or not get_config().bedrock_service_quotas:
+        return quota
+
+    if region not in _service_quotas:
+        try:
+            _service_quotas[region] = _load_service_quotas(region)
+        except Exception as e:
+            logger.error(f"Could not read Bedrock quotas for {region} from Service Quotas: {e}")
+            _service_quotas[region] = {}
+    if model_id.startswith(_PROFILE_PREFIXES):
+        return _service_quotas[region].get(('cross-region', model_id.split('.', 1)[1]))
+    return _service_quotas[region].get(('on-demand', model_id))
+
+
+def get_model_rate_limiter(model_id: str, region: Optional[str] = None) -> AdaptiveRateLimiter:
+    """
+    Return the process-wide limiter for a Bedrock model, seeded with its requests and tokens per minute quota.
+
+    Quotas come from the Bedrock quotas CSV at `bedrock_quotas_csv_path`, then from the Service
+    Quotas API unless `bedrock_service_quotas` is off. A model without a known quota gets an
+    unlimited limiter, which is logged as an error.
+    """
+    key = (model_id, region)
+    limiter = _model_limiters.get(key)
+    if limiter is not None:
+        return limiter
+    with _model_limiters_lock:
+        limiter = _model_limiters.get(key)
+        if limiter is None:
+            rpm, tpm = _find_quota(model_id, region) or (0, 0)
+            limiter = AdaptiveRateLimiter(requests_per_minute=rpm, tokens_per_minute=tpm)
+            _model_limiters[key] = limiter
+            if limiter.limited:
+                logger.info(f"Rate limiting {model_id} in {region} to {rpm:.0f} requests/min and {tpm:.0f} tokens/min")
+            else:
+                logger.error(f"No Bedrock quota known for {model_id} in {region}, its calls are not rate limited. "
+                             f"Add it to the Bedrock quotas CSV (bedrock_quotas_csv)")
+        return limiter
+
+
+def estimate_tokens(*values: Any) -> int:
+    """Rough token estimate of the text in strings, lists and dicts (about four characters per token)."""
+    def _chars(value: Any, depth: int = 0) -> int:
+        if isinstance(value, str):
+            return len(value)
+        if depth > 6:
+            return 0
+        if isinstance(value, dict):
+            return sum(_chars(item, depth + 1) for item in value.values())
+        if isinstance(value, (list, tuple)):
+            return sum(_chars(item, depth + 1) for item in value)
+        return 0
+    return sum(_chars(value) for value in values) // 4
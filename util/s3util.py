@@ -1,14 +1,17 @@
 import os
 import json
+import hashlib
 import logging
-import boto3
 import io
 from botocore.exceptions import ClientError
 from urllib.parse import urlparse
 import csv
-import pandas as pd
-from typing import Optional, List, Dict
-from functools import lru_cache
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Optional, Iterable, Iterator, List, Dict, Tuple
+from boto3.s3.transfer import TransferConfig
+from util.boto3_clients import get_client
+
+MB = 1024 * 1024
 
 
 class S3Util:
@@ -16,7 +19,7 @@ class S3Util:
     
     def __init__(self):
         """Initialize S3 client."""
-        self.s3_client = boto3.client('s3')
+        self.s3_client = get_client('s3')
         self.logger = logging.getLogger(__name__)
 
     def read_json_from_s3(self, s3_path: str) -> Optional[Dict]:
@@ -74,7 +77,6 @@ class S3Util:
             )
             raise
 
-    @lru_cache(maxsize=100)
     def read_csv_from_s3(self, object_key: str, bucket_name: str, as_dataframe: bool = False) -> Optional[object]:
         """
         Read CSV data from S3 and convert it to a list of dictionaries or a pandas DataFrame.
@@ -103,7 +105,8 @@ class S3Util:
             file_content = response['Body'].read().decode('utf-8')
 
             if as_dataframe:
-                # Parse content into a pandas DataFrame
+                # Parse content into a pandas DataFrame, pandas is only imported by callers that want one
+                import pandas as pd
                 csv_data = pd.read_csv(io.StringIO(file_content))
             else:
                 # Parse content into a list of dictionaries
@@ -231,7 +234,8 @@ class S3Util:
             raise
         
         
-    def download_directory_from_s3(self, s3_path: str, local_path:str = '/tmp/downloaded_folder') -> str:
+    def download_directory_from_s3(self, s3_path: str, local_path:str = '/tmp/downloaded_folder', max_workers: int = 8,
+                                   multipart_threshold_mb: int = 16) -> str:
         "Download all files using an s3 path to a folder and return the local path"
         try:
             parse_url = urlparse(s3_path)
@@ -244,29 +248,15 @@ class S3Util:
             if os.path.exists(local_path):
                 self.logger.info(f"Directory {local_path} already exists. Skipping creation.")
             os.makedirs(local_path, exist_ok=True)
-                
-            files = self.s3_client.list_objects_v2(Bucket=bucket, Prefix=key)
-            
+
+            objects = self.list_pdf_objects(s3_path)
+
             # Check if there are any files in the folder
-            if 'Contents' not in files or all(file['Key'].endswith('/') for file in files['Contents']):
+            if not objects:
                 self.logger.info("No files found in the specified S3 folder.")
                 return local_path
-            
-            for file in files['Contents']:
-                s3_key = file['Key']
-                file_size = file['Size']
-                
-                # Skip the folder itself and any zero size folders
-                if s3_key.endswith('/') or file_size == 0:
-                    continue
-                
-                # Check if the file is a pdf
-                if s3_key.lower().endswith('.pdf'):
-                        
-                    local_file_path = os.path.join(local_path, s3_key)
-                    os.makedirs(os.path.dirname(local_file_path), exist_ok=True)
-                    self.logger.info(f"Downloading file {s3_key} to directory: {local_file_path}")
-                    self.s3_client.download_file(Bucket=bucket, Key=s3_key, Filename=local_file_path)
+
+            self.download_objects(bucket, sorted(objects), local_path, max_workers=max_workers, multipart_threshold_mb=multipart_threshold_mb)
             local_path = os.path.join(local_path, key)
             self.logger.info(f"Downloaded all files in the folder from S3: bucket: {bucket}, key={key}")
             return local_path
@@ -275,6 +265,110 @@ class S3Util:
             self.logger.error(f"Failed to download file from S3: {e}")
             raise
 
+    def list_pdf_objects(self, s3_path: str) -> Dict[str, Dict]:
+        """
+        List the non-empty PDF files under an S3 prefix, following every page of the listing.
+
+        Args:
+            s3_path (str): S3 path of the folder, e.g. s3://bucket/kb/
+
+        Returns:
+            Dict[str, Dict]: Object key -> {'etag': ..., 'size': ...}
+        """
+        parse_url = urlparse(s3_path)
+        bucket = parse_url.netloc
+        key = parse_url.path.lstrip('/')
+
+        objects = {}
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=bucket, Prefix=key):
+            for file in page.get('Contents', []):
+                # Skip the folder itself and any zero size folders
+                if file['Key'].lower().endswith('.pdf') and file['Size'] > 0:
+                    objects[file['Key']] = {'etag': file['ETag'], 'size': file['Size']}
+        return objects
+
+    def download_objects(self, bucket: str, keys: List[str], local_path: str, max_workers: int = 8,
+                         multipart_threshold_mb: int = 16) -> Dict[str, str]:
+        """
+        Download objects of a bucket concurrently under a local folder, keeping their key as relative path.
+
+        Objects larger than `multipart_threshold_mb` are fetched in parallel ranged parts.
+
+        Returns:
+            Dict[str, str]: Object key -> local file path
+        """
+        transfer_config = self._transfer_config(multipart_threshold_mb)
+
+        def _download(s3_key: str) -> str:
+            local_file_path = os.path.join(local_path, s3_key)
+            os.makedirs(os.path.dirname(local_file_path), exist_ok=True)
+            self.logger.info(f"Downloading file {s3_key} to directory: {local_file_path}")
+            self.s3_client.download_file(Bucket=bucket, Key=s3_key, Filename=local_file_path, Config=transfer_config)
+            return local_file_path
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            local_paths = executor.map(_download, keys)
+            return dict(zip(keys, local_paths))
+
+    def iter_object_bodies(self, bucket: str, keys: Iterable[str], max_workers: int = 8,
+                           multipart_threshold_mb: int = 16) -> Iterator[Tuple[str, bytes]]:
+        """
+        Read objects of a bucket into memory concurrently, yielding (key, body) pairs as each download completes.
+
+        Nothing is written to local disk. At most `max_workers` bodies are downloading or waiting to be
+        consumed at a time, so a slow consumer bounds the memory held.
+        """
+        transfer_config = self._transfer_config(multipart_threshold_mb)
+
+        def _read(s3_key: str) -> bytes:
+            buffer = io.BytesIO()
+            self.s3_client.download_fileobj(Bucket=bucket, Key=s3_key, Fileobj=buffer, Config=transfer_config)
+            return buffer.getvalue()
+
+        keys = iter(keys)
+        max_workers = max(1, max_workers)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = {}
+            for s3_key in keys:
+                pending[executor.submit(_read, s3_key)] = s3_key
+                if len(pending) >= max_workers:
+                    break
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    s3_key = pending.pop(future)
+                    yield s3_key, future.result()
+                    next_key = next(keys, None)
+                    if next_key is not None:
+                        pending[executor.submit(_read, next_key)] = next_key
+
+    @staticmethod
+    def _transfer_config(multipart_threshold_mb: int) -> TransferConfig:
+        threshold = max(5, multipart_threshold_mb) * MB
+        return TransferConfig(multipart_threshold=threshold, multipart_chunksize=threshold, max_concurrency=4)
+
+    def fingerprint_s3_prefix(self, s3_path: str) -> str:
+        """
+        Compute a fingerprint of the PDF files under an S3 prefix.
+
+        The fingerprint is a SHA-256 over each object's key, ETag and size, so it changes
+        whenever a file is added, removed or replaced.
+
+        Args:
+            s3_path (str): S3 path of the folder, e.g. s3://bucket/kb/
+
+        Returns:
+            str: Hex digest identifying the current contents of the folder
+        """
+        entries = [f"{key}|{obj['etag']}|{obj['size']}" for key, obj in self.list_pdf_objects(s3_path).items()]
+
+        digest = hashlib.sha256()
+        for entry in sorted(entries):
+            digest.update(entry.encode('utf-8'))
+            digest.update(b'\n')
+        return digest.hexdigest()
+
     def write_json_to_s3(self, object_key:str, bucket: str, json_data):
         """
         Write JSON data to an S3 bucket.
@@ -0,0 +1,65 @@
+import itertools
+import queue
+import threading
+import logging
+from typing import Iterable, Iterator, List, TypeVar
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+T = TypeVar("T")
+
+_END_OF_STREAM = object()
+
+
+def batched(iterable: Iterable[T], size: int) -> Iterator[List[T]]:
+    """Yield lists of up to `size` items from `iterable` without materializing it."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def bounded_prefetch(iterable: Iterable[T], maxsize: int) -> Iterator[T]:
+    """
+    Consume `iterable` on a background thread, buffering at most `maxsize` items.
+
+    The producer blocks when the buffer is full, which gives backpressure between
+    pipeline stages. Errors raised by the producer are re-raised in the consumer,
+    and the producer stops as soon as the consumer closes the generator.
+    """
+    buffer = queue.Queue(maxsize=max(1, maxsize))
+    stop = threading.Event()
+
+    def _put(entry) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce():
+        try:
+            for item in iterable:
+                if not _put((None, item)):
+                    return
+            _put((None, _END_OF_STREAM))
+        except BaseException as e:
+            _put((e, None))
+
+    producer = threading.Thread(target=_produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            error, item = buffer.get()
+            if error is not None:
+                raise error
+            if item is _END_OF_STREAM:
+                return
+            yield item
+    finally:
+        stop.set()